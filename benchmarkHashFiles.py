@@ -0,0 +1,196 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+import sys
+import os
+from config import initLogger
+import logging
+from benchmarkUtils import BENCHMARK_STAGES, DEFAULT_TOLERANCE, generateSyntheticTree, runBenchmark, saveBaseline, loadBaseline, compareWithBaseline, printBenchmarkResults
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(prog='benchmarkHashFiles', allow_abbrev=False, description="benchmark the check of an hash file on a synthetic tree, comparing the results with a baseline")
+    arg_parser.add_argument(
+            "-f",               # short parameter name
+            "--folder",         # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='folder',   # displayed name (in help messages)
+            help="Option to select the folder of the synthetic tree, kept and reused by the next benchmarks with the same tree; a temporary folder if not selected."
+        )
+    arg_parser.add_argument(
+            "--files",          # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=100000,
+            action="store",     # store the value in memory
+            metavar='files',    # displayed name (in help messages)
+            help="Option to select the number of files of the synthetic tree."
+        )
+    arg_parser.add_argument(
+            "--depth",          # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=3,
+            action="store",     # store the value in memory
+            metavar='depth',    # displayed name (in help messages)
+            help="Option to select the depth of the folders holding the files."
+        )
+    arg_parser.add_argument(
+            "--fan-out",        # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=10,
+            action="store",     # store the value in memory
+            metavar='folders',  # displayed name (in help messages)
+            help="Option to select the number of subfolders of each folder."
+        )
+    arg_parser.add_argument(
+            "--missing-ratio",  # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0.01,
+            action="store",     # store the value in memory
+            metavar='ratio',    # displayed name (in help messages)
+            help="Option to select the ratio of the files listed in the hash file and missing in the tree."
+        )
+    arg_parser.add_argument(
+            "--extra-ratio",    # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0.01,
+            action="store",     # store the value in memory
+            metavar='ratio',    # displayed name (in help messages)
+            help="Option to select the ratio of the files in the tree and missing in the hash file."
+        )
+    arg_parser.add_argument(
+            "--file-size",      # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='bytes',    # displayed name (in help messages)
+            help="Option to select the size of each file, in bytes."
+        )
+    arg_parser.add_argument(
+            "-s",               # short parameter name
+            "--stages",         # long parameter name
+            required=False,
+            default=BENCHMARK_STAGES,
+            nargs='+',          # one or more values
+            choices=BENCHMARK_STAGES,
+            action="store",     # store the value in memory
+            help="Option to select the stages to benchmark, all the stages if not selected."
+        )
+    arg_parser.add_argument(
+            "-r",               # short parameter name
+            "--repeat",         # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=3,
+            action="store",     # store the value in memory
+            metavar='runs',     # displayed name (in help messages)
+            help="Option to select the number of runs of each stage, keeping the best time."
+        )
+    arg_parser.add_argument(
+            "-w",               # short parameter name
+            "--workers",        # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=os.cpu_count() or 1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of workers hashing the files."
+        )
+    arg_parser.add_argument(
+            "-b",               # short parameter name
+            "--baseline",       # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='baseline', # displayed name (in help messages)
+            help="Option to select a baseline JSON file to compare the results with; the benchmark fails if a stage regresses."
+        )
+    arg_parser.add_argument(
+            "--save-baseline",  # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='baseline', # displayed name (in help messages)
+            help="Option to save the results in a baseline JSON file."
+        )
+    arg_parser.add_argument(
+            "--tolerance",      # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=DEFAULT_TOLERANCE,
+            action="store",     # store the value in memory
+            metavar='ratio',    # displayed name (in help messages)
+            help="Option to select the relative increase of time or of peak RSS over the baseline reported as a regression."
+        )
+    parsed_args = arg_parser.parse_args()
+
+    initLogger()
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    parameters : dict[str, Any] = {"files": parsed_args.files, "depth": parsed_args.depth, "fanOut": parsed_args.fan_out, "missingRatio": parsed_args.missing_ratio, "extraRatio": parsed_args.extra_ratio, "fileSize": parsed_args.file_size}
+
+    baseline : dict[str, Any] | None = None
+    error : Exception | None = None
+
+    if parsed_args.baseline is not None:
+        baseline, error = loadBaseline(parsed_args.baseline)
+
+        if error is not None:
+            logger.error(f"Error loading the baseline {parsed_args.baseline}: {error}")
+            sys.exit(1)
+
+        # the results of different trees can't be compared
+        if baseline["parameters"] != parameters:
+            logger.error(f"The baseline {parsed_args.baseline} was measured on a different synthetic tree: {baseline['parameters']}")
+            sys.exit(1)
+
+    temporaryFolder : TemporaryDirectory[str] | None = TemporaryDirectory() if parsed_args.folder is None else None
+    rootFolder : Path = parsed_args.folder if temporaryFolder is None else Path(temporaryFolder.name)
+
+    try:
+        hashFile : Path | None
+        hashFile, error = generateSyntheticTree(rootFolder, parsed_args.files, parsed_args.depth, parsed_args.fan_out, parsed_args.missing_ratio, parsed_args.extra_ratio, parsed_args.file_size)
+
+        if hashFile is None or error is not None:
+            logger.error(f"Error generating the synthetic tree in {rootFolder}: {error}")
+            sys.exit(1)
+
+        results : dict[str, dict[str, float]]
+        results, error = runBenchmark(hashFile, parsed_args.repeat, parsed_args.workers, parsed_args.stages)
+
+        if error is not None:
+            logger.error(f"Error running the benchmark: {error}")
+            sys.exit(1)
+    finally:
+        if temporaryFolder is not None:
+            temporaryFolder.cleanup()
+
+    printBenchmarkResults(results, baseline)
+
+    if parsed_args.save_baseline is not None:
+        error = saveBaseline(parsed_args.save_baseline, parameters, results)
+
+        if error is not None:
+            logger.error(f"Error saving the baseline {parsed_args.save_baseline}: {error}")
+            sys.exit(1)
+
+    if baseline is not None:
+        regressions : list[str] = compareWithBaseline(results, baseline, parsed_args.tolerance)
+
+        regression : str
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        if len(regressions) > 0:
+            sys.exit(1)
@@ -0,0 +1,19 @@
+#!/bin/bash
+
+# PYTHONDONTWRITEBYTECODE=1 -> don't create the folder __pycache__ running python3
+# mypy --cache-dir=/dev/null -> don't create the folder __mypy_cache__ running mypy
+
+# the synthetic tree is kept in this folder and reused by the next benchmarks
+FOLDER_TO_CHECK="$HOME/benchmark/synthetic/"
+BASELINE="/usr/src/myapp/benchmarkBaseline.json"
+
+mkdir -p "$FOLDER_TO_CHECK"
+
+# the first run saves the baseline, the next runs are compared with it
+if [ -f "benchmarkBaseline.json" ]; then
+    BASELINE_OPTION="--baseline $BASELINE"
+else
+    BASELINE_OPTION="--save-baseline $BASELINE"
+fi
+
+docker run -it --rm --name benchmarkHashFiles -v "$PWD":/usr/src/myapp -v "$FOLDER_TO_CHECK":"$FOLDER_TO_CHECK" -e PYTHONDONTWRITEBYTECODE=1 -w /usr/src/myapp python:3.10-slim /bin/bash -c "python /usr/src/myapp/benchmarkHashFiles.py --folder $FOLDER_TO_CHECK --files 100000 $BASELINE_OPTION"
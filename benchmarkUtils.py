@@ -0,0 +1,394 @@
+from config import initLogger
+from pathlib import Path
+from os import strerror
+from typing import Any, Callable, Iterator
+from hashfileUtils import loadHashFile, writeHashFile, splitHashFileItemsByFolder, splitHashFileRowsByFolder, checkDifferencesBetweenTrees, checkDifferencesBetweenRelativeTrees, iterSortedDifferences
+from fileUtils import loadFileTree, loadRelativeFileTree, searchHashFiles
+from digestUtils import verifyHashFile
+from statsUtils import peakRss
+import json
+import time
+import errno
+import hashlib
+import platform
+import logging
+
+# name of the hash file listing the files of a synthetic tree, in its root folder
+SYNTHETIC_HASH_FILE : str = "synthetic.md5"
+
+# name of the file storing the parameters of a synthetic tree, in its root folder, so that the tree can be reused by the next benchmarks
+SYNTHETIC_PARAMETERS_FILE : str = "synthetic.json"
+
+# stages of the benchmark, in the order they are run
+BENCHMARK_STAGES : list[str] = [
+    "loadHashFile",
+    "splitHashFileItemsByFolder",
+    "splitHashFileRowsByFolder",
+    "loadFileTree",
+    "loadRelativeFileTree",
+    "searchHashFiles",
+    "checkDifferencesBetweenTrees",
+    "checkDifferencesBetweenRelativeTrees",
+    "iterSortedDifferences",
+    "verifyHashFile",
+]
+
+# relative increase of the time or of the peak RSS of a stage, over the baseline, reported as a regression
+DEFAULT_TOLERANCE : float = 0.2
+
+# increases of the time, in seconds, and of the peak RSS, in bytes, never reported as a regression, since they are in the noise of the measure
+MIN_REGRESSION_SECONDS : float = 0.01
+MIN_REGRESSION_RSS : int = 4 * 1024 * 1024
+
+def syntheticFilePath(index: int, depth: int, fanOut: int) -> str:
+    """
+    Return the relative path of a file of a synthetic tree
+
+    The files are spread round robin on the folders at the given depth, each folder having fanOut subfolders; with depth 0 all the files are in the root folder.
+    """
+    parts : list[str] = []
+    folderIndex : int = index % (fanOut ** depth) if depth > 0 else 0
+    level : int
+    for level in range(depth):
+        parts.append(f"d{folderIndex % fanOut:03d}")
+        folderIndex = folderIndex // fanOut
+    parts.append(f"file{index:09d}.dat")
+    return "/".join(parts)
+
+
+def syntheticFileContent(index: int, fileSize: int) -> bytes:
+    """
+    Return the content of a file of a synthetic tree, different for each file unless fileSize is too small
+    """
+    pattern : bytes = f"{index}\n".encode("ascii")
+    return (pattern * (fileSize // len(pattern) + 1))[:fileSize]
+
+
+def generateSyntheticTree(rootFolder: Path, files: int, depth: int = 3, fanOut: int = 10, missingRatio: float = 0.01, extraRatio: float = 0.01, fileSize: int = 0) -> tuple[Path | None, Exception | None]:
+    """
+    Generate a synthetic tree of files and the hash file listing them, to benchmark the scan and the check of large trees
+
+    The hash file SYNTHETIC_HASH_FILE, in the root folder, lists all the files of the tree but:
+      a file of every 1/extraRatio is created but NOT listed in the hash file
+      a file of every 1/missingRatio is listed in the hash file but NOT created
+    so that the check finds differences in both directions.
+    The parameters of the tree are stored in SYNTHETIC_PARAMETERS_FILE: when the root folder already has a tree generated with the same parameters, the tree is reused;
+    otherwise the root folder must be empty.
+
+    Parameters
+    ----------
+    rootFolder : Path
+        The root folder of the tree, created if it doesn't exist
+    files : int
+        The number of files of the tree, including the files missing
+    depth : int
+        The depth of the folders holding the files
+    fanOut : int
+        The number of subfolders of each folder
+    missingRatio : float
+        The ratio of the files listed in the hash file and missing in the tree
+    extraRatio : float
+        The ratio of the files in the tree and missing in the hash file
+    fileSize : int
+        The size, in bytes, of each file
+
+    Returns
+    -------
+    tuple[Path | None, Exception | None]:
+        The hash file of the tree, None in case of error
+        Exception | None :
+            ValueError if a parameter is out of its range or the root folder isn't empty
+            OSError in case of IO error writing the tree
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    error : Exception | None = None
+
+    if files < 0 or depth < 0 or fanOut < 1 or fileSize < 0 or not 0 <= missingRatio < 1 or not 0 <= extraRatio < 1:
+        error = ValueError(f"synthetic tree parameters out of range: files={files}, depth={depth}, fanOut={fanOut}, missingRatio={missingRatio}, extraRatio={extraRatio}, fileSize={fileSize}")
+        logger.error(f"Can't generate a synthetic tree: {error}")
+        return None, error
+
+    hashFile : Path = rootFolder.joinpath(SYNTHETIC_HASH_FILE)
+    parametersFile : Path = rootFolder.joinpath(SYNTHETIC_PARAMETERS_FILE)
+    parameters : dict[str, Any] = {"files": files, "depth": depth, "fanOut": fanOut, "missingRatio": missingRatio, "extraRatio": extraRatio, "fileSize": fileSize}
+
+    # one file of every missingStep (or extraStep) is missing; 0 for none
+    missingStep : int = round(1 / missingRatio) if missingRatio > 0 else 0
+    extraStep : int = round(1 / extraRatio) if extraRatio > 0 else 0
+
+    def isMissing(index: int) -> bool:
+        return missingStep > 0 and index % missingStep == 0
+
+    def isExtra(index: int) -> bool:
+        # the extra files are shifted, so that no file is both missing and extra
+        return extraStep > 0 and index % extraStep == extraStep // 2 and not isMissing(index)
+
+    def iterRows() -> Iterator[tuple[str, str]]:
+        index : int
+        for index in range(files):
+            if not isExtra(index):
+                yield syntheticFilePath(index, depth, fanOut), hashlib.md5(syntheticFileContent(index, fileSize)).hexdigest()
+
+    try:
+        if hashFile.is_file() and parametersFile.is_file() and json.loads(parametersFile.read_text()) == parameters:
+            logger.info(f"reusing the synthetic tree in {rootFolder}")
+            return hashFile, error
+
+        # the files of another tree would be found as differences
+        if rootFolder.is_dir() and any(rootFolder.iterdir()):
+            raise ValueError(f"expected an empty folder, or a folder with a synthetic tree with the same parameters: {rootFolder}")
+
+        logger.info(f"generating a synthetic tree of {files} files in {rootFolder}")
+        rootFolder.mkdir(parents=True, exist_ok=True)
+
+        createdFolders : set[Path] = set()
+        index : int
+        for index in range(files):
+            if isMissing(index):
+                continue
+            filepath : Path = rootFolder.joinpath(syntheticFilePath(index, depth, fanOut))
+            if filepath.parent not in createdFolders:
+                filepath.parent.mkdir(parents=True, exist_ok=True)
+                createdFolders.add(filepath.parent)
+            filepath.write_bytes(syntheticFileContent(index, fileSize))
+
+        error = writeHashFile(hashFile, iterRows())
+        if error is not None:
+            return None, error
+
+        parametersFile.write_text(json.dumps(parameters))
+    except (OSError, ValueError) as ex:
+        error = ex
+        logger.exception(f"Error generating the synthetic tree in {rootFolder}: {error}")
+        return None, error
+
+    return hashFile, error
+
+
+def runBenchmark(hashFile: Path, repeat: int = 1, workers: int = 1, stages: list[str] | None = None) -> tuple[dict[str, dict[str, float]], Exception | None]:
+    """
+    Run the stages of the check of an hash file and measure each one
+
+    Each stage is run repeat times and its best time is kept, since the slower runs are slowed down by the rest of the system.
+    The peak RSS of a stage is the peak RSS of the process at the end of the stage: it includes the memory of the previous stages,
+    so it's compared only with the peak RSS of the same stage in another run.
+
+    Parameters
+    ----------
+    hashFile : Path
+        The hash file to check, with the tree to scan in its folder (see generateSyntheticTree)
+    repeat : int
+        The number of runs of each stage
+    workers : int
+        The number of threads hashing the files in the verifyHashFile stage
+    stages : list[str] | None
+        The stages to run (see BENCHMARK_STAGES), None for all the stages
+
+    Returns
+    -------
+    tuple[dict[str, dict[str, float]], Exception | None]:
+        The stages run, each one bound to its best time, in seconds, as "seconds", and to its peak RSS, in bytes, as "peak_rss"
+        Exception | None :
+            FileNotFoundError if the hash file is None or is not a valid file
+            ValueError if the number of runs is less than 1 or a stage doesn't exist
+            OSError in case of IO error running a stage
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    results : dict[str, dict[str, float]] = {}
+    error : Exception | None = None
+
+    if hashFile is None or not hashFile.is_file():
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), hashFile)
+        logger.error(f"file doesn't exists: {hashFile}")
+        return results, error
+
+    if stages is None:
+        stages = BENCHMARK_STAGES
+
+    if repeat < 1 or any(stage not in BENCHMARK_STAGES for stage in stages):
+        error = ValueError(f"expected at least a run of existing stages: repeat={repeat}, stages={stages}")
+        logger.error(f"Can't run the benchmark: {error}")
+        return results, error
+
+    rootFolder : Path = hashFile.parent
+
+    # the trees produced by a stage and checked by the following stages, loaded when a stage needs them
+    trees : dict[str, Any] = {}
+
+    def tree(stage: str) -> Any:
+        if stage not in trees:
+            trees[stage] = stageFunctions[stage]()[0]
+        return trees[stage]
+
+    def countSortedDifferences() -> tuple[int, Exception | None]:
+        return sum(1 for difference in iterSortedDifferences(hashFile)), None
+
+    stageFunctions : dict[str, Callable[[], tuple[Any, ...]]] = {
+        "loadHashFile": lambda: loadHashFile(hashFile),
+        "splitHashFileItemsByFolder": lambda: splitHashFileItemsByFolder(hashFile),
+        "splitHashFileRowsByFolder": lambda: splitHashFileRowsByFolder(hashFile),
+        "loadFileTree": lambda: loadFileTree(rootFolder),
+        "loadRelativeFileTree": lambda: loadRelativeFileTree(rootFolder),
+        "searchHashFiles": lambda: searchHashFiles(rootFolder),
+        "checkDifferencesBetweenTrees": lambda: checkDifferencesBetweenTrees(tree("splitHashFileItemsByFolder"), tree("loadFileTree")),
+        "checkDifferencesBetweenRelativeTrees": lambda: checkDifferencesBetweenRelativeTrees(tree("splitHashFileRowsByFolder"), tree("loadRelativeFileTree")),
+        "iterSortedDifferences": countSortedDifferences,
+        "verifyHashFile": lambda: verifyHashFile(hashFile, workers),
+    }
+
+    try:
+        stage : str
+        for stage in stages:
+            logger.debug(f"running stage {stage}")
+            # the trees checked by the stage are loaded before it's measured
+            if stage == "checkDifferencesBetweenTrees":
+                tree("splitHashFileItemsByFolder")
+                tree("loadFileTree")
+            elif stage == "checkDifferencesBetweenRelativeTrees":
+                tree("splitHashFileRowsByFolder")
+                tree("loadRelativeFileTree")
+
+            bestTime : float = float("inf")
+            run : int
+            for run in range(repeat):
+                start : float = time.perf_counter()
+                output : tuple[Any, ...] = stageFunctions[stage]()
+                bestTime = min(bestTime, time.perf_counter() - start)
+
+                if output[-1] is not None:
+                    error = output[-1]
+                    logger.error(f"Error running stage {stage}: {error}")
+                    return results, error
+
+            results[stage] = {"seconds": bestTime, "peak_rss": peakRss()}
+            logger.debug(f"stage {stage}: {bestTime:.3f} s, peak RSS {results[stage]['peak_rss']} bytes")
+    except OSError as ex:
+        error = ex
+        logger.exception(f"Error running the benchmark of {hashFile}: {error}")
+
+    return results, error
+
+
+def saveBaseline(filename: Path, parameters: dict[str, Any], results: dict[str, dict[str, float]]) -> Exception | None:
+    """
+    Save the results of a benchmark as a baseline, a JSON file with the parameters of the synthetic tree, the Python version and the results of the stages
+
+    Returns
+    -------
+    Exception | None :
+        OSError in case of IO error writing the file
+        None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    error : Exception | None = None
+
+    try:
+        filename.write_text(json.dumps({"parameters": parameters, "python": platform.python_version(), "stages": results}, indent=2))
+    except OSError as ex:
+        error = ex
+        logger.exception(f"Error writing the baseline {filename}: {error}")
+
+    return error
+
+
+def loadBaseline(filename: Path) -> tuple[dict[str, Any], Exception | None]:
+    """
+    Load a baseline saved by saveBaseline
+
+    Returns
+    -------
+    tuple[dict[str, Any], Exception | None]:
+        The baseline, with the keys parameters, python and stages
+        Exception | None :
+            FileNotFoundError if the filename is None or is not a valid file
+            ValueError if the file isn't a valid baseline
+            OSError in case of IO error loading the file
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    baseline : dict[str, Any] = {}
+    error : Exception | None = None
+
+    if filename is None or not filename.is_file():
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), filename)
+        logger.error(f"file doesn't exists: {filename}")
+        return baseline, error
+
+    try:
+        baseline = json.loads(filename.read_text())
+        if not isinstance(baseline, dict) or not isinstance(baseline.get("parameters"), dict) or not isinstance(baseline.get("stages"), dict):
+            raise ValueError(f"expected a baseline with parameters and stages: {filename}")
+    except (OSError, ValueError) as ex:
+        error = ex
+        baseline = {}
+        logger.exception(f"Error loading the baseline {filename}: {error}")
+
+    return baseline, error
+
+
+def compareWithBaseline(results: dict[str, dict[str, float]], baseline: dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Compare the results of a benchmark with a baseline, measured on a synthetic tree with the same parameters
+
+    A stage regresses when its time, or its peak RSS, is over the one of the baseline by more than the tolerance (and by more than the noise of the measure).
+    The stages missing in the baseline aren't compared.
+
+    Parameters
+    ----------
+    results : dict[str, dict[str, float]]
+        The results of the benchmark (see runBenchmark)
+    baseline : dict[str, Any]
+        The baseline (see loadBaseline)
+    tolerance : float
+        The relative increase reported as a regression, i.e. 0.2 for 20%
+
+    Returns
+    -------
+    list[str]
+        The description of each regression, empty if no stage regresses
+    """
+
+    regressions : list[str] = []
+
+    stage : str
+    measures : dict[str, float]
+    for stage, measures in results.items():
+        baselineMeasures : dict[str, float] | None = baseline["stages"].get(stage)
+        if baselineMeasures is None:
+            continue
+
+        if measures["seconds"] > baselineMeasures["seconds"] * (1 + tolerance) + MIN_REGRESSION_SECONDS:
+            regressions.append(f"{stage}: {measures['seconds']:.3f} s, baseline {baselineMeasures['seconds']:.3f} s")
+        if measures["peak_rss"] > baselineMeasures["peak_rss"] * (1 + tolerance) + MIN_REGRESSION_RSS:
+            regressions.append(f"{stage}: peak RSS {measures['peak_rss'] / 2 ** 20:.1f} MiB, baseline {baselineMeasures['peak_rss'] / 2 ** 20:.1f} MiB")
+
+    return regressions
+
+
+def printBenchmarkResults(results: dict[str, dict[str, float]], baseline: dict[str, Any] | None = None) -> None:
+    """
+    Print the time and the peak RSS of each stage, and their change over the baseline
+    """
+
+    print(f"{'stage':<40} {'seconds':>10} {'peak RSS MiB':>14}")
+
+    stage : str
+    measures : dict[str, float]
+    for stage, measures in results.items():
+        line : str = f"{stage:<40} {measures['seconds']:>10.3f} {measures['peak_rss'] / 2 ** 20:>14.1f}"
+        baselineMeasures : dict[str, float] | None = baseline["stages"].get(stage) if baseline is not None else None
+        if baselineMeasures is not None and baselineMeasures["seconds"] > 0:
+            line = f"{line} {(measures['seconds'] / baselineMeasures['seconds'] - 1) * 100:>+8.1f}% time {(measures['peak_rss'] / baselineMeasures['peak_rss'] - 1) * 100:>+8.1f}% RSS"
+        print(line)
+
+    return None
@@ -0,0 +1,257 @@
+from config import initLogger
+from pathlib import Path
+from os import sep, stat_result
+import time
+import sqlite3
+import logging
+
+# separator of the names stored in a single column, it can't appear in a file name
+NAME_SEPARATOR : str = "/"
+
+# age, in seconds, after which a cached digest is computed again reading the file
+DEFAULT_REVERIFY_AGE : float = 30 * 24 * 60 * 60
+
+def openCache(cacheFile: Path) -> tuple[sqlite3.Connection | None, Exception | None]:
+    """
+    Open the persistent cache, creating it if it doesn't exist
+
+    The cache is a SQLite database storing the listing of each scanned folder, bound to the modification time and the inode of the folder.
+    A folder whose modification time and inode didn't change since the last scan has the same listing, so it doesn't need to be listed again.
+    The cache also stores the digest of each hashed file, bound to the device, the inode, the size and the modification time of the file,
+    and the last time each hash file was checked, to check first the hash files not checked for the longest time.
+
+    Parameters
+    ----------
+    cacheFile : Path
+        The SQLite file of the cache
+
+    Returns
+    -------
+    tuple[sqlite3.Connection | None, Exception | None]:
+        The connection to the cache, None in case of error
+        Exception | None :
+            ValueError if the cacheFile is None
+            sqlite3.Error in case of error opening or initializing the cache
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    cache : sqlite3.Connection | None = None
+    error : Exception | None = None
+
+    if cacheFile is None:
+        error = ValueError("cache file has an illegal value")
+        logger.error(f"Expected a cache file: {error}")
+        return cache, error
+
+    try:
+        logger.debug(f"opening cache {cacheFile}")
+        # the cache can be shared by the threads listing the folders, serializing the access with a lock
+        cache = sqlite3.connect(cacheFile, check_same_thread=False)
+        cache.execute("CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, files TEXT NOT NULL, subfolders TEXT NOT NULL)")
+        cache.execute("CREATE TABLE IF NOT EXISTS digests (device INTEGER NOT NULL, inode INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, algorithm TEXT NOT NULL, digest TEXT NOT NULL, verified_at REAL NOT NULL, PRIMARY KEY (device, inode, size, mtime_ns, algorithm))")
+        cache.execute("CREATE TABLE IF NOT EXISTS hash_files (path TEXT PRIMARY KEY, checked_at REAL NOT NULL)")
+        cache.commit()
+    except sqlite3.Error as ex:
+        error = ex
+        if cache is not None:
+            cache.close()
+        cache = None
+        logger.exception(f"Error opening cache {cacheFile}: {error}")
+
+    return cache, error
+
+
+def loadCachedFolder(cache: sqlite3.Connection, folder: str, mtimeNs: int, inode: int) -> tuple[list[str], list[str]] | None:
+    """
+    Load the listing of a folder from the cache
+
+    Parameters
+    ----------
+    cache : sqlite3.Connection
+        The cache opened by openCache
+    folder : str
+        The folder to load
+    mtimeNs : int
+        The current modification time of the folder, in nanoseconds
+    inode : int
+        The current inode of the folder
+
+    Returns
+    -------
+    tuple[list[str], list[str]] | None:
+        The names of the files and the names of the subfolders in the folder,
+        None if the folder isn't in the cache or it changed since it was cached
+    """
+
+    row : tuple[int, int, str, str] | None = cache.execute("SELECT mtime_ns, inode, files, subfolders FROM folders WHERE path = ?", (folder,)).fetchone()
+
+    if row is None or row[0] != mtimeNs or row[1] != inode:
+        return None
+
+    files : list[str] = row[2].split(NAME_SEPARATOR) if len(row[2]) > 0 else []
+    subfolders : list[str] = row[3].split(NAME_SEPARATOR) if len(row[3]) > 0 else []
+
+    return files, subfolders
+
+
+def storeCachedFolder(cache: sqlite3.Connection, folder: str, mtimeNs: int, inode: int, files: list[str], subfolders: list[str]) -> None:
+    """
+    Store the listing of a folder in the cache
+
+    A folder that can't be stored (i.e. a name that isn't valid UTF-8) is skipped, it will be listed again the next time
+
+    Parameters
+    ----------
+    cache : sqlite3.Connection
+        The cache opened by openCache
+    folder : str
+        The folder to store
+    mtimeNs : int
+        The modification time of the folder when it was listed, in nanoseconds
+    inode : int
+        The inode of the folder when it was listed
+    files : list[str]
+        The names of the files in the folder
+    subfolders : list[str]
+        The names of the subfolders in the folder
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    try:
+        cache.execute("INSERT OR REPLACE INTO folders (path, mtime_ns, inode, files, subfolders) VALUES (?, ?, ?, ?, ?)",
+                      (folder, mtimeNs, inode, NAME_SEPARATOR.join(files), NAME_SEPARATOR.join(subfolders)))
+    except (sqlite3.Error, UnicodeError) as ex:
+        logger.warning(f"skipping cache of folder {folder}: {ex}")
+
+    return None
+
+
+def pruneCachedFolders(cache: sqlite3.Connection, rootFolder: str, scannedFolders: set[str]) -> None:
+    """
+    Remove from the cache the folders under the root folder that weren't found by the last scan
+
+    Parameters
+    ----------
+    cache : sqlite3.Connection
+        The cache opened by openCache
+    rootFolder : str
+        The root folder of the last scan
+    scannedFolders : set[str]
+        The folders found by the last scan
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    prefix : str = rootFolder if rootFolder.endswith(sep) else rootFolder + sep
+    cachedFolders : list[str] = [row[0] for row in cache.execute("SELECT path FROM folders WHERE path = ? OR substr(path, 1, ?) = ?", (rootFolder, len(prefix), prefix))]
+    removedFolders : list[tuple[str]] = [(folder,) for folder in cachedFolders if folder not in scannedFolders]
+
+    if len(removedFolders) > 0:
+        logger.debug(f"removing {len(removedFolders)} folders from the cache")
+        cache.executemany("DELETE FROM folders WHERE path = ?", removedFolders)
+
+    return None
+
+
+def loadCachedDigest(cache: sqlite3.Connection, fileStat: stat_result, algorithm: str, reverifyAge: float = DEFAULT_REVERIFY_AGE) -> str | None:
+    """
+    Load the digest of a file from the cache
+
+    Parameters
+    ----------
+    cache : sqlite3.Connection
+        The cache opened by openCache
+    fileStat : stat_result
+        The current status of the file
+    algorithm : str
+        The name of the hash algorithm
+    reverifyAge : float
+        The age, in seconds, after which a cached digest is considered expired, so that the file is read again
+
+    Returns
+    -------
+    str | None:
+        The cached digest of the file,
+        None if the file isn't in the cache, it changed since it was cached or the cached digest is expired
+    """
+
+    row : tuple[str, float] | None = cache.execute("SELECT digest, verified_at FROM digests WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ? AND algorithm = ?",
+                                                   (fileStat.st_dev, fileStat.st_ino, fileStat.st_size, fileStat.st_mtime_ns, algorithm)).fetchone()
+
+    if row is None or time.time() - row[1] > reverifyAge:
+        return None
+
+    return row[0]
+
+
+def storeCachedDigest(cache: sqlite3.Connection, fileStat: stat_result, algorithm: str, digest: str) -> None:
+    """
+    Store the digest of a file in the cache
+
+    Parameters
+    ----------
+    cache : sqlite3.Connection
+        The cache opened by openCache
+    fileStat : stat_result
+        The status of the file when it was hashed
+    algorithm : str
+        The name of the hash algorithm
+    digest : str
+        The hexadecimal digest of the file
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    try:
+        cache.execute("INSERT OR REPLACE INTO digests (device, inode, size, mtime_ns, algorithm, digest, verified_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                      (fileStat.st_dev, fileStat.st_ino, fileStat.st_size, fileStat.st_mtime_ns, algorithm, digest, time.time()))
+    except sqlite3.Error as ex:
+        logger.warning(f"skipping cache of digest {digest}: {ex}")
+
+    return None
+
+
+def loadCheckedHashFiles(cache: sqlite3.Connection) -> dict[str, float]:
+    """
+    Load the last time each hash file was checked from the cache
+
+    Parameters
+    ----------
+    cache : sqlite3.Connection
+        The cache opened by openCache
+
+    Returns
+    -------
+    dict[str, float]:
+        The hash files, each one bound to the time, in seconds since the epoch, of its last check
+    """
+
+    path : str
+    checkedAt : float
+    return {path: checkedAt for path, checkedAt in cache.execute("SELECT path, checked_at FROM hash_files")}
+
+
+def storeCheckedHashFile(cache: sqlite3.Connection, hashFile: str) -> None:
+    """
+    Store in the cache that an hash file was checked now
+
+    Parameters
+    ----------
+    cache : sqlite3.Connection
+        The cache opened by openCache
+    hashFile : str
+        The hash file checked
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    try:
+        cache.execute("INSERT OR REPLACE INTO hash_files (path, checked_at) VALUES (?, ?)", (hashFile, time.time()))
+        cache.commit()
+    except sqlite3.Error as ex:
+        logger.warning(f"skipping cache of hash file {hashFile}: {ex}")
+
+    return None
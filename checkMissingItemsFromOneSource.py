@@ -2,9 +2,11 @@ from argparse import ArgumentParser
 from pathlib import Path
 import sys
 from config import initLogger
+from statsUtils import startInstrumentation
 import logging
-from fileUtils import loadFileTree
-from hashfileUtils import splitHashFileItemsByFolder, checkDifferencesBetweenTrees, printDifferencesBetweenTrees
+from fileUtils import loadRelativeFileTree, relativeTreeToPaths
+from hashfileUtils import splitHashFileRowsByFolder, checkDifferencesBetweenRelativeTrees, printDifferencesBetweenTrees, iterTreeDifferences, excludeHashFile
+from reportUtils import ReportWriter, REPORT_FORMATS, writeDifferences
 
 if __name__ == "__main__":
     arg_parser = ArgumentParser(prog='findMissingItemInHashFile', allow_abbrev=False, description="find missing items between the file rows and the file listed in the file folder")
@@ -17,15 +19,69 @@ if __name__ == "__main__":
             metavar='file',   # displayed name (in help messages)
             help="Option to select the folder where to search files."
         )
+    arg_parser.add_argument(
+            "--cache",          # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='cache',    # displayed name (in help messages)
+            help="Option to select a cache file, so that only the folders changed since the previous run are listed again."
+        )
+    arg_parser.add_argument(
+            "--scan-workers",   # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of folders listed at the same time, useful on network file systems."
+        )
+    arg_parser.add_argument(
+            "-o",               # short parameter name
+            "--output-format",  # long parameter name
+            required=False,
+            default='text',
+            choices=REPORT_FORMATS,
+            action="store",     # store the value in memory
+            help="Option to print the differences as text or to write them as JSON lines, CSV or NUL-separated fields."
+        )
+    arg_parser.add_argument(
+            "--stats",          # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to print on the standard error the wall and CPU time of each stage, the folders and the files listed per second, the bytes hashed and the peak memory."
+        )
+    arg_parser.add_argument(
+            "--profile",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='profile',  # displayed name (in help messages)
+            help="Option to profile the main thread with cProfile, dumping the statistics in a file readable by the pstats module."
+        )
+    arg_parser.add_argument(
+            "--metrics",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='metrics',  # displayed name (in help messages)
+            help="Option to write the statistics of the run, as with --stats, in a JSON file."
+        )
     parsed_args = arg_parser.parse_args()
     
     initLogger()
     
+    startInstrumentation(Path(__file__).stem, parsed_args.stats, parsed_args.profile, parsed_args.metrics)
+    
     logger : logging.Logger = logging.getLogger(__name__)
     
-    mapOfFileByFolder : dict[Path, set[Path]]
+    mapOfFileByFolder : dict[str, set[str]]
     error : Exception | None
-    mapOfFileByFolder, error = splitHashFileItemsByFolder(parsed_args.file)
+    mapOfFileByFolder, error = splitHashFileRowsByFolder(parsed_args.file)
     
     if error is not None:
         logger.error (f" error iterating folder {parsed_args.file} {error}")
@@ -35,8 +91,8 @@ if __name__ == "__main__":
         logger.error(f"Empty file {parsed_args.file}")
         sys.exit(1)
     
-    fileInFolders : dict[Path, set[Path]]
-    fileInFolders, error = loadFileTree(parsed_args.file.parent)
+    fileInFolders : dict[str, set[str]]
+    fileInFolders, error = loadRelativeFileTree(parsed_args.file.parent, parsed_args.cache, parsed_args.scan_workers)
     
     if error is not None:
         logger.error (f" error iterating folder {parsed_args.file.parent}: {error}")
@@ -46,13 +102,21 @@ if __name__ == "__main__":
         logger.error(f"No files found in folder {parsed_args.file.parent}")
         sys.exit(1)
     
-    missingInHashFileNotInDir : dict[Path, set[Path]]
-    missingInDirNotInHashFile : dict[Path, set[Path]]
-    missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenTrees(mapOfFileByFolder, fileInFolders)
-    
-    if error is not None:
-        logger.error(f"Error checking the difference between trees: {error}")
-        sys.exit(1)
+    # the hash file itself isn't a difference
+    mapOfFileByFolder, fileInFolders = excludeHashFile(parsed_args.file, mapOfFileByFolder, fileInFolders)
     
-    printDifferencesBetweenTrees(missingInHashFileNotInDir, missingInDirNotInHashFile)
-        
\ No newline at end of file
+    if parsed_args.output_format == "text":
+        missingInHashFileNotInDir : dict[str, set[str]]
+        missingInDirNotInHashFile : dict[str, set[str]]
+        missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenRelativeTrees(mapOfFileByFolder, fileInFolders)
+        
+        if error is not None:
+            logger.error(f"Error checking the difference between trees: {error}")
+            sys.exit(1)
+        
+        printDifferencesBetweenTrees(relativeTreeToPaths(parsed_args.file.parent, missingInHashFileNotInDir), relativeTreeToPaths(parsed_args.file.parent, missingInDirNotInHashFile))
+    else:
+        # the differences are written through a buffered report as soon as they are found
+        report : ReportWriter
+        with ReportWriter(parsed_args.output_format) as report:
+            writeDifferences(report, parsed_args.file, iterTreeDifferences(mapOfFileByFolder, fileInFolders))
@@ -1,11 +1,24 @@
 from argparse import ArgumentParser
 from pathlib import Path
 import sys
+import os
 from config import initLogger
+from statsUtils import startInstrumentation
+from throttleUtils import setThrottle, parseByteSize
+import sqlite3
 import logging
-from fileUtils import loadFileTree, searchHashFiles
-from hashfileUtils import splitHashFileItemsByFolder, checkDifferencesBetweenTrees, printDifferencesBetweenTrees
+from fileUtils import scanRelativeTree, sliceRelativeTree, relativeTreeToPaths, loadFolderList
+from hashfileUtils import checkHashFileRows, listHashFileDifferences, printDifferencesBetweenTrees, relativePathKey
+from digestUtils import verifyHashFile, printVerificationResults, sampleHashFiles
+from cacheUtils import DEFAULT_REVERIFY_AGE, openCache, loadCheckedHashFiles, storeCheckedHashFile
 from random import choice
+from typing import Any
+from reportUtils import ReportWriter, REPORT_FORMATS, writeDifferences, writeVerificationResults
+from contextlib import nullcontext, redirect_stdout
+from checkpointUtils import Checkpoint, openCheckpoint
+from io import StringIO
+import json
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 
 if __name__ == "__main__":
     arg_parser = ArgumentParser(prog='findMissingItemInHashFile', allow_abbrev=False, description="find missing items between the file rows and the file listed in the file folder")
@@ -13,74 +26,419 @@ if __name__ == "__main__":
             "-f",               # short parameter name
             "--file",         # long parameter name
             type=Path,          # argument type
-            required=True,
+            required=False,
+            default=[],
+            nargs='+',          # one or more root folders
             action="store",     # store the value in memory
             metavar='file',   # displayed name (in help messages)
-            help="Option to select the folder where to search files."
+            help="Option to select the folders where to search files."
+        )
+    arg_parser.add_argument(
+            "-r",               # short parameter name
+            "--roots-file",     # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='rootsFile',# displayed name (in help messages)
+            help="Option to select a text file listing the folders where to search files, one for each row."
+        )
+    arg_parser.add_argument(
+            "-j",               # short parameter name
+            "--jobs",           # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=1,
+            action="store",     # store the value in memory
+            metavar='jobs',     # displayed name (in help messages)
+            help="Option to select the number of processes checking the hash files at the same time."
         )
     arg_parser.add_argument(
             "-c",               # short parameter name
             "--check",           # long parameter name
             required=False,
             default='none',
-            choices=['all', 'random'],
+            choices=['all', 'random', 'sample'],
             nargs='?',          # only one item to choose
             action="store",     # store the value in memory
-            help="Option to check all hash files or only a random file."
+            help="Option to check all hash files, only a random file or a sample of the files not verified for the longest time (it needs --cache and --verify)."
+        )
+    arg_parser.add_argument(
+            "--sample-fraction",# long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='fraction', # displayed name (in help messages)
+            help="Option to select the fraction, between 0 and 1, of the hash files of each folder checked with --check sample."
+        )
+    arg_parser.add_argument(
+            "--sample-bytes",   # long parameter name
+            type=parseByteSize, # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='bytes',    # displayed name (in help messages)
+            help="Option to select the bytes of the files listed in the hash files of each folder checked with --check sample, with an optional suffix K, M, G (for example 500G)."
+        )
+    arg_parser.add_argument(
+            "-v",               # short parameter name
+            "--verify",         # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to verify the hash of each file listed in the hash file."
+        )
+    arg_parser.add_argument(
+            "-w",               # short parameter name
+            "--workers",        # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=os.cpu_count() or 1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of workers hashing the files."
+        )
+    arg_parser.add_argument(
+            "-p",               # short parameter name
+            "--pool",           # long parameter name
+            required=False,
+            default='thread',
+            choices=['thread', 'process'],
+            action="store",     # store the value in memory
+            help="Option to hash the files in a pool of threads or in a pool of processes."
+        )
+    arg_parser.add_argument(
+            "--cache",          # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='cache',    # displayed name (in help messages)
+            help="Option to select a cache file, so that only the folders and the files changed since the previous run are listed and hashed again."
+        )
+    arg_parser.add_argument(
+            "--reverify-days",  # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=DEFAULT_REVERIFY_AGE / (24 * 60 * 60),
+            action="store",     # store the value in memory
+            metavar='days',     # displayed name (in help messages)
+            help="Option to select the age, in days, after which a digest in the cache is verified again reading the file."
+        )
+    arg_parser.add_argument(
+            "--scan-workers",   # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of folders listed at the same time, useful on network file systems."
+        )
+    arg_parser.add_argument(
+            "-o",               # short parameter name
+            "--output-format",  # long parameter name
+            required=False,
+            default='text',
+            choices=REPORT_FORMATS,
+            action="store",     # store the value in memory
+            help="Option to print the differences as text or to write them as JSON lines, CSV or NUL-separated fields."
+        )
+    arg_parser.add_argument(
+            "--state",          # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='stateFile',# displayed name (in help messages)
+            help="Option to select a state file, where the hash files checked and the output of their check are saved while the check runs."
+        )
+    arg_parser.add_argument(
+            "--resume",         # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to resume an interrupted check from its state file, the hash files already checked are not checked again."
+        )
+    arg_parser.add_argument(
+            "--max-bytes-per-second",   # long parameter name
+            type=parseByteSize, # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='bytes',    # displayed name (in help messages)
+            help="Option to limit the bytes read per second, with an optional suffix K, M, G (for example 50M), 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-files-per-second",   # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='files',    # displayed name (in help messages)
+            help="Option to limit the files opened and the folders listed per second, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-open-files", # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='files',    # displayed name (in help messages)
+            help="Option to limit the files open and the folders listed at the same time, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-latency",    # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='ms',       # displayed name (in help messages)
+            help="Option to slow down the reads when their latency, in milliseconds, is over this limit, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--stats",          # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to print on the standard error the wall and CPU time of each stage, the folders and the files listed per second, the bytes hashed and the peak memory."
+        )
+    arg_parser.add_argument(
+            "--profile",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='profile',  # displayed name (in help messages)
+            help="Option to profile the main thread with cProfile, dumping the statistics in a file readable by the pstats module."
+        )
+    arg_parser.add_argument(
+            "--metrics",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='metrics',  # displayed name (in help messages)
+            help="Option to write the statistics of the run, as with --stats, in a JSON file."
         )
     parsed_args = arg_parser.parse_args()
     
     initLogger()
     
+    startInstrumentation(Path(__file__).stem, parsed_args.stats, parsed_args.profile, parsed_args.metrics)
+    
+    try:
+        setThrottle(parsed_args.max_bytes_per_second, parsed_args.max_files_per_second, parsed_args.max_open_files, parsed_args.max_latency / 1000)
+    except ValueError as ex:
+        arg_parser.error(f"invalid throttling limits: {ex}")
+    
     logger : logging.Logger = logging.getLogger(__name__)
     
-    missingHashFiles: set[Path]
-    existentHashFiles: set[Path]
+    rootFolders : list[Path] = list(parsed_args.file)
     error : Exception | None = None
-
-    missingHashFiles, existentHashFiles, error = searchHashFiles(parsed_args.file)
     
-    if error is not None:
-        sys.exit(1)
+    if parsed_args.roots_file is not None:
+        listedFolders : list[Path]
+        listedFolders, error = loadFolderList(parsed_args.roots_file)
+        
+        if error is not None:
+            logger.error(f"error loading the file: {parsed_args.roots_file}: {error}")
+            sys.exit(1)
+        
+        rootFolders.extend(listedFolders)
     
-    filenameInHashFileNotInDirSet : set[Path] = set()
-    filenameInDirNotInHashFileSet : set[Path] = set()
-    hashFilesToCheck : set[Path] = set()
+    if len(rootFolders) == 0:
+        arg_parser.error("expected at least a folder with --file or --roots-file")
     
-    if parsed_args.check == 'random' and len(existentHashFiles)>0:
-        randomFilename : Path = choice(list(existentHashFiles))
-        logger.debug(f"choosing file: {randomFilename}")
-        hashFilesToCheck.add(randomFilename)
-
-    if parsed_args.check == 'all':
-        logger.debug(f"choosing all files")
-        hashFilesToCheck = existentHashFiles
+    if parsed_args.jobs < 1:
+        arg_parser.error("expected at least one job")
     
-    mapOfFileByFolder : dict[Path, set[Path]]
+    if parsed_args.resume and parsed_args.state is None:
+        arg_parser.error("expected a state file with --resume")
     
-    hashFile : Path
-    for hashFile in hashFilesToCheck:
+    # the sample is chosen by the time of the last verification of each hash file, saved in the cache
+    sampleCache : sqlite3.Connection | None = None
+    checkedAt : dict[str, float] = dict()
+    
+    if parsed_args.check == 'sample':
+        if parsed_args.cache is None:
+            arg_parser.error("expected a cache file with --check sample")
+        if not parsed_args.verify:
+            arg_parser.error("expected --verify with --check sample, the sample is chosen by the time of the last verification")
+        if (parsed_args.sample_fraction > 0) == (parsed_args.sample_bytes > 0) or not 0 <= parsed_args.sample_fraction <= 1:
+            arg_parser.error("expected a fraction between 0 and 1 with --sample-fraction or a budget with --sample-bytes")
         
-        mapOfFileByFolder, error = splitHashFileItemsByFolder(hashFile)
+        sampleCache, error = openCache(parsed_args.cache)
         
-        if error is not None:
-            logger.error (f"error loading the file: {hashFile}: {error}")
+        if sampleCache is None:
+            logger.error(f"error opening the cache: {parsed_args.cache}: {error}")
             sys.exit(1)
         
-        fileInFolders : dict[Path, set[Path]]
-        fileInFolders, error = loadFileTree(hashFile.parent)
-        
-        if error is not None:
-            logger.error (f" error iterating folder {hashFile.parent}: {error}")
-            sys.exit(1)
-
-        missingInHashFileNotInDir : dict[Path, set[Path]]
-        missingInDirNotInHashFile : dict[Path, set[Path]]
-        missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenTrees(mapOfFileByFolder, fileInFolders)
+        checkedAt = loadCheckedHashFiles(sampleCache)
+    
+    # the hash files checked by an interrupted check are skipped, the output of their check is written again
+    checkpoint : Checkpoint | None = None
+    checkedOutputs : dict[str, bytes] = dict()
+    
+    if parsed_args.state is not None:
+        checkOptions : str = json.dumps({"roots": [str(rootFolder.resolve()) for rootFolder in rootFolders], "check": parsed_args.check, "verify": parsed_args.verify, "output": parsed_args.output_format})
+        checkpoint, error = openCheckpoint(parsed_args.state, checkOptions, parsed_args.resume)
         
-        if error is not None:
-            logger.error(f"Error checking the difference between trees: {error}")
+        if checkpoint is None:
+            logger.error(f"error opening the state file: {parsed_args.state}: {error}")
             sys.exit(1)
         
-        printDifferencesBetweenTrees(missingInHashFileNotInDir, missingInDirNotInHashFile)
-
+        checkedOutputs = checkpoint.load()
+        if parsed_args.resume:
+            logger.info(f"resuming the check, {len(checkedOutputs)} hash files already checked")
+    
+    # a hash file that can't be checked is reported, without stopping the check of the other hash files
+    failures : int = 0
+    
+    # with more jobs the hash files are checked by a pool of processes, otherwise by a single thread
+    executor : Executor
+    if parsed_args.jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=parsed_args.jobs)
+    else:
+        executor = ThreadPoolExecutor(max_workers=1)
+    
+    # the machine-readable formats are written through a buffered report, the text format is printed
+    report : ReportWriter | None = ReportWriter(parsed_args.output_format) if parsed_args.output_format != "text" else None
+    
+    with executor, report if report is not None else nullcontext():
+        rootFolder : Path
+        for rootFolder in rootFolders:
+            # the whole root folder is scanned once, each hash file is checked against a slice of this tree
+            # folders and files are relative strings, Path objects are built only to print the results
+            fileTree: dict[str, set[str]]
+            missingHashFiles: set[str]
+            existentHashFiles: set[str]
+            
+            fileTree, missingHashFiles, existentHashFiles, error = scanRelativeTree(rootFolder, parsed_args.cache, parsed_args.scan_workers)
+            
+            if error is not None:
+                logger.error(f"error iterating folder {rootFolder}: {error}")
+                failures = failures + 1
+                continue
+            
+            sortedFolders : list[str] = sorted(fileTree, key=relativePathKey)
+            
+            hashFilesToCheck : list[str] = []
+            
+            if parsed_args.check == 'random' and len(existentHashFiles)>0:
+                randomFilename : str = choice(sorted(existentHashFiles))
+                logger.debug(f"choosing file: {randomFilename}")
+                hashFilesToCheck.append(randomFilename)
+            
+            if parsed_args.check == 'all':
+                logger.debug(f"choosing all files")
+                hashFilesToCheck = sorted(existentHashFiles, key=relativePathKey)
+            
+            if parsed_args.check == 'sample':
+                relativeHashFiles : dict[Path, str] = {rootFolder.absolute().joinpath(relativeHashFile): relativeHashFile for relativeHashFile in existentHashFiles}
+                sampledHashFiles : list[Path]
+                sampledHashFiles, error = sampleHashFiles(list(relativeHashFiles), checkedAt, parsed_args.sample_fraction, parsed_args.sample_bytes)
+                hashFilesToCheck = sorted((relativeHashFiles[sampledHashFile] for sampledHashFile in sampledHashFiles), key=relativePathKey)
+            
+            # the checks are submitted all together and their results are printed in the order of the hash files
+            # the report needs the list of the differences, the text the trees of checkHashFileRows
+            pendingChecks : list[tuple[Path, str, Future[Any] | None]] = []
+            
+            # the checked hash files are keyed by their path in the resolved root, like the roots of the check options, so a check resumed from another directory finds them
+            resolvedRootFolder : Path = rootFolder.resolve()
+            
+            relativeHashFile : str
+            for relativeHashFile in hashFilesToCheck:
+                hashFile : Path = rootFolder.joinpath(relativeHashFile)
+                relativeFolder : str = relativeHashFile.rpartition("/")[0]
+                
+                checkpointKey : str = str(resolvedRootFolder.joinpath(relativeHashFile))
+                if checkpointKey in checkedOutputs:
+                    pendingChecks.append((hashFile, checkpointKey, None))
+                    continue
+                
+                fileInFolders : dict[str, set[str]]
+                fileInFolders, error = sliceRelativeTree(fileTree, sortedFolders, relativeFolder)
+                
+                if error is not None:
+                    logger.error (f" error iterating folder {hashFile.parent}: {error}")
+                    failures = failures + 1
+                    continue
+                
+                if report is None:
+                    pendingChecks.append((hashFile, checkpointKey, executor.submit(checkHashFileRows, hashFile, fileInFolders)))
+                else:
+                    pendingChecks.append((hashFile, checkpointKey, executor.submit(listHashFileDifferences, hashFile, fileInFolders)))
+            
+            pendingCheck : Future[Any] | None
+            for hashFile, checkpointKey, pendingCheck in pendingChecks:
+                # with a state file, the output of the check of each hash file is collected, saved and then written
+                output : StringIO | None = StringIO() if checkpoint is not None else None
+                hashFileReport : ReportWriter | None = report
+                if report is not None and output is not None:
+                    hashFileReport = ReportWriter(parsed_args.output_format, output, header=False)
+                
+                if pendingCheck is None:
+                    logger.debug(f"hash file already checked: {hashFile}")
+                    error = None
+                else:
+                    with redirect_stdout(output) if output is not None and report is None else nullcontext():
+                        if hashFileReport is None:
+                            print(f"Hash file: {hashFile}")
+                        
+                        result : tuple[Any, ...] = ()
+                        try:
+                            result = pendingCheck.result()
+                            error = result[-1]
+                        except Exception as ex:
+                            error = ex
+                        
+                        if error is not None:
+                            logger.error(f"Error checking the hash file {hashFile}: {error}")
+                            if hashFileReport is None:
+                                print(f"Error checking the hash file: {error}")
+                        elif hashFileReport is None:
+                            printDifferencesBetweenTrees(relativeTreeToPaths(hashFile.parent, result[0]), relativeTreeToPaths(hashFile.parent, result[1]))
+                        else:
+                            writeDifferences(hashFileReport, hashFile, result[0])
+                        
+                        if error is None and parsed_args.verify:
+                            okFiles : set[Path]
+                            mismatchedFiles : set[Path]
+                            unreadableFiles : set[Path]
+                            okFiles, mismatchedFiles, unreadableFiles, error = verifyHashFile(hashFile, parsed_args.workers, parsed_args.pool == 'process', parsed_args.cache, parsed_args.reverify_days * 24 * 60 * 60)
+                            
+                            if error is not None:
+                                logger.error(f"Error verifying the hash file {hashFile}: {error}")
+                                if hashFileReport is None:
+                                    print(f"Error verifying the hash file: {error}")
+                            elif hashFileReport is None:
+                                printVerificationResults(okFiles, mismatchedFiles, unreadableFiles)
+                            else:
+                                writeVerificationResults(hashFileReport, hashFile, mismatchedFiles, unreadableFiles)
+                
+                if error is not None:
+                    failures = failures + 1
+                elif sampleCache is not None and pendingCheck is not None:
+                    # the hash file is recorded only once its digests are verified (--check sample needs --verify)
+                    storeCheckedHashFile(sampleCache, str(hashFile.absolute()))
+                
+                if checkpoint is not None and output is not None:
+                    # a hash file with errors isn't saved, so it's checked again resuming the check
+                    outputBytes : bytes = checkedOutputs[checkpointKey] if pendingCheck is None else output.getvalue().encode("utf-8", "surrogateescape")
+                    if pendingCheck is not None and error is None:
+                        checkpoint.store(checkpointKey, outputBytes)
+                    if report is None:
+                        sys.stdout.write(outputBytes.decode("utf-8", "surrogateescape"))
+                    else:
+                        report.stream.write(outputBytes.decode("utf-8", "surrogateescape"))
+    
+    if checkpoint is not None:
+        checkpoint.close()
+    
+    if sampleCache is not None:
+        sampleCache.close()
+    
+    if failures > 0:
+        logger.error(f"{failures} errors checking the hash files")
+        sys.exit(1)
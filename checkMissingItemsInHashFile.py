@@ -1,10 +1,18 @@
 from argparse import ArgumentParser
 from pathlib import Path
 import sys
+import os
 from config import initLogger
+from statsUtils import startInstrumentation
+from throttleUtils import setThrottle, parseByteSize
 import logging
-from fileUtils import loadFileTree
-from hashfileUtils import splitHashFileItemsByFolder, checkDifferencesBetweenTrees, printDifferencesBetweenTrees
+from fileUtils import loadRelativeFileTree, relativeTreeToPaths
+from hashfileUtils import splitHashFileRowsByFolder, checkDifferencesBetweenRelativeTrees, printDifferencesBetweenTrees, printSortedDifferences, iterSortedDifferences, iterTreeDifferences, excludeHashFile
+from digestUtils import verifyHashFile, printVerificationResults, updateHashFile, printUpdateResults
+from cacheUtils import DEFAULT_REVERIFY_AGE
+from reportUtils import ReportWriter, REPORT_FORMATS, writeDifferences, writeVerificationResults
+from contextlib import nullcontext
+import errno
 
 if __name__ == "__main__":
     arg_parser = ArgumentParser(prog='findMissingItemInHashFile', allow_abbrev=False, description="find missing items between the file rows and the file listed in the file folder")
@@ -17,40 +25,245 @@ if __name__ == "__main__":
             metavar='file',   # displayed name (in help messages)
             help="Option to select the folder where to search files."
         )
+    arg_parser.add_argument(
+            "-v",               # short parameter name
+            "--verify",         # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to verify the hash of each file listed in the hash file."
+        )
+    arg_parser.add_argument(
+            "-u",               # short parameter name
+            "--update",         # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to update the hash file before the check, adding the new files in the folder and removing the files that don't exist anymore."
+        )
+    arg_parser.add_argument(
+            "-w",               # short parameter name
+            "--workers",        # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=os.cpu_count() or 1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of workers hashing the files."
+        )
+    arg_parser.add_argument(
+            "-p",               # short parameter name
+            "--pool",           # long parameter name
+            required=False,
+            default='thread',
+            choices=['thread', 'process'],
+            action="store",     # store the value in memory
+            help="Option to hash the files in a pool of threads or in a pool of processes."
+        )
+    arg_parser.add_argument(
+            "--cache",          # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='cache',    # displayed name (in help messages)
+            help="Option to select a cache file, so that only the folders and the files changed since the previous run are listed and hashed again."
+        )
+    arg_parser.add_argument(
+            "--reverify-days",  # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=DEFAULT_REVERIFY_AGE / (24 * 60 * 60),
+            action="store",     # store the value in memory
+            metavar='days',     # displayed name (in help messages)
+            help="Option to select the age, in days, after which a digest in the cache is verified again reading the file."
+        )
+    arg_parser.add_argument(
+            "-l",               # short parameter name
+            "--low-memory",     # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to compare the hash file and the folder as sorted streams, without loading them in memory."
+        )
+    arg_parser.add_argument(
+            "--scan-workers",   # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of folders listed at the same time, useful on network file systems."
+        )
+    arg_parser.add_argument(
+            "-o",               # short parameter name
+            "--output-format",  # long parameter name
+            required=False,
+            default='text',
+            choices=REPORT_FORMATS,
+            action="store",     # store the value in memory
+            help="Option to print the differences as text or to write them as JSON lines, CSV or NUL-separated fields."
+        )
+    arg_parser.add_argument(
+            "--max-bytes-per-second",   # long parameter name
+            type=parseByteSize, # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='bytes',    # displayed name (in help messages)
+            help="Option to limit the bytes read per second, with an optional suffix K, M, G (for example 50M), 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-files-per-second",   # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='files',    # displayed name (in help messages)
+            help="Option to limit the files opened and the folders listed per second, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-open-files", # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='files',    # displayed name (in help messages)
+            help="Option to limit the files open and the folders listed at the same time, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-latency",    # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='ms',       # displayed name (in help messages)
+            help="Option to slow down the reads when their latency, in milliseconds, is over this limit, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--stats",          # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to print on the standard error the wall and CPU time of each stage, the folders and the files listed per second, the bytes hashed and the peak memory."
+        )
+    arg_parser.add_argument(
+            "--profile",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='profile',  # displayed name (in help messages)
+            help="Option to profile the main thread with cProfile, dumping the statistics in a file readable by the pstats module."
+        )
+    arg_parser.add_argument(
+            "--metrics",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='metrics',  # displayed name (in help messages)
+            help="Option to write the statistics of the run, as with --stats, in a JSON file."
+        )
     parsed_args = arg_parser.parse_args()
     
     initLogger()
     
+    startInstrumentation(Path(__file__).stem, parsed_args.stats, parsed_args.profile, parsed_args.metrics)
+    
+    try:
+        setThrottle(parsed_args.max_bytes_per_second, parsed_args.max_files_per_second, parsed_args.max_open_files, parsed_args.max_latency / 1000)
+    except ValueError as ex:
+        arg_parser.error(f"invalid throttling limits: {ex}")
+    
     logger : logging.Logger = logging.getLogger(__name__)
 
     filenameInHashFileNotInDirSet : set[Path] = set()
     filenameInDirNotInHashFileSet : set[Path] = set()
     error : Exception | None = None
     
-    mapOfFileByFolder : dict[Path, set[Path]]
-    mapOfFileByFolder, error = splitHashFileItemsByFolder(parsed_args.file)
-    
-    if error is not None:
-        logger.error (f"error loading the file: {parsed_args.file}: {error}")
-        sys.exit(1)
+    # the machine-readable formats are written through a buffered report, the text format is printed
+    report : ReportWriter | None = ReportWriter(parsed_args.output_format) if parsed_args.output_format != "text" else None
     
-    fileInFolders : dict[Path, set[Path]]
-    fileInFolders, error = loadFileTree(parsed_args.file.parent)
+    with report if report is not None else nullcontext():
+        if parsed_args.update:
+            # only the new files are hashed, the rows of the other files are kept
+            addedFiles : set[Path]
+            removedFiles : set[Path]
+            unhashedFiles : set[Path]
+            addedFiles, removedFiles, unhashedFiles, error = updateHashFile(parsed_args.file, parsed_args.workers, parsed_args.pool == 'process', parsed_args.cache, parsed_args.scan_workers)
+            
+            if error is not None:
+                logger.error(f"Error updating the hash file {parsed_args.file}: {error}")
+                sys.exit(1)
+            
+            if report is None:
+                printUpdateResults(addedFiles, removedFiles, unhashedFiles)
+            else:
+                logger.info(f"updated hash file {parsed_args.file}: {len(addedFiles)} files added, {len(removedFiles)} files removed, {len(unhashedFiles)} files not readable")
+        
+        if parsed_args.low_memory:
+            # the trees are merged as sorted streams, without loading them in memory
+            differenceCounter : int
+            if report is None:
+                differenceCounter, error = printSortedDifferences(parsed_args.file)
+            elif not parsed_args.file.is_file():
+                error = FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), parsed_args.file)
+            else:
+                try:
+                    differenceCounter = writeDifferences(report, parsed_args.file, iterSortedDifferences(parsed_args.file))
+                except OSError as ex:
+                    error = ex
+            
+            if error is not None:
+                logger.error(f"Error checking the difference between trees: {error}")
+                sys.exit(1)
+        else:
+            mapOfFileByFolder : dict[str, set[str]]
+            mapOfFileByFolder, error = splitHashFileRowsByFolder(parsed_args.file)
+        
+            if error is not None:
+                logger.error (f"error loading the file: {parsed_args.file}: {error}")
+                sys.exit(1)
+        
+            fileInFolders : dict[str, set[str]]
+            fileInFolders, error = loadRelativeFileTree(parsed_args.file.parent, parsed_args.cache, parsed_args.scan_workers)
+        
+            if error is not None:
+                logger.error (f" error iterating folder {parsed_args.file.parent}: {error}")
+                sys.exit(1)
     
-    if error is not None:
-        logger.error (f" error iterating folder {parsed_args.file.parent}: {error}")
-        sys.exit(1)
-
-    if len(fileInFolders) <= 0:
-        logger.error(f"No files found in folder {parsed_args.file.parent}")
-        sys.exit(1)
+            if len(fileInFolders) <= 0:
+                logger.error(f"No files found in folder {parsed_args.file.parent}")
+                sys.exit(1)
+            
+            # the hash file itself isn't a difference
+            mapOfFileByFolder, fileInFolders = excludeHashFile(parsed_args.file, mapOfFileByFolder, fileInFolders)
+        
+            if report is None:
+                missingInHashFileNotInDir : dict[str, set[str]]
+                missingInDirNotInHashFile : dict[str, set[str]]
+                missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenRelativeTrees(mapOfFileByFolder, fileInFolders)
+            
+                if error is not None:
+                    logger.error(f"Error checking the difference between trees: {error}")
+                    sys.exit(1)
+            
+                printDifferencesBetweenTrees(relativeTreeToPaths(parsed_args.file.parent, missingInHashFileNotInDir), relativeTreeToPaths(parsed_args.file.parent, missingInDirNotInHashFile))
+            else:
+                writeDifferences(report, parsed_args.file, iterTreeDifferences(mapOfFileByFolder, fileInFolders))
     
-    missingInHashFileNotInDir : dict[Path, set[Path]]
-    missingInDirNotInHashFile : dict[Path, set[Path]]
-    missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenTrees(mapOfFileByFolder, fileInFolders)
+        if parsed_args.verify:
+            okFiles : set[Path]
+            mismatchedFiles : set[Path]
+            unreadableFiles : set[Path]
+            okFiles, mismatchedFiles, unreadableFiles, error = verifyHashFile(parsed_args.file, parsed_args.workers, parsed_args.pool == 'process', parsed_args.cache, parsed_args.reverify_days * 24 * 60 * 60)
     
-    if error is not None:
-        logger.error(f"Error checking the difference between trees: {error}")
-        sys.exit(1)
+            if error is not None:
+                logger.error(f"Error verifying the hash file {parsed_args.file}: {error}")
+                sys.exit(1)
     
-    printDifferencesBetweenTrees(missingInHashFileNotInDir, missingInDirNotInHashFile)
+            if report is None:
+                printVerificationResults(okFiles, mismatchedFiles, unreadableFiles)
+            else:
+                writeVerificationResults(report, parsed_args.file, mismatchedFiles, unreadableFiles)
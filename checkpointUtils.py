@@ -0,0 +1,108 @@
+from config import initLogger
+from pathlib import Path
+import time
+import sqlite3
+import logging
+
+# interval, in seconds, between two commits of the checked hash files to the state file
+CHECKPOINT_INTERVAL : float = 10.0
+
+class Checkpoint:
+    """
+    State of a long check of many hash files, stored in a SQLite file so an interrupted check can be resumed
+
+    The state file stores the options of the check and, for each hash file checked without errors, the output of its check.
+    The checked hash files are committed to the state file every CHECKPOINT_INTERVAL seconds, so an interruption loses at most the work of the last interval.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, interval: float = CHECKPOINT_INTERVAL) -> None:
+        self.connection : sqlite3.Connection = connection
+        self.interval : float = interval
+        self.lastCommit : float = time.monotonic()
+
+    def load(self) -> dict[str, bytes]:
+        """
+        Load the hash files already checked, each one bound to the output of its check
+        """
+        hashFile : str
+        output : bytes
+        return {hashFile: output for hashFile, output in self.connection.execute("SELECT hash_file, output FROM checked")}
+
+    def store(self, hashFile: str, output: bytes) -> None:
+        """
+        Store an hash file checked without errors and the output of its check, committing the state file when the checkpoint interval is elapsed
+        """
+        self.connection.execute("INSERT OR REPLACE INTO checked (hash_file, output, checked_at) VALUES (?, ?, ?)", (hashFile, output, time.time()))
+        if time.monotonic() - self.lastCommit >= self.interval:
+            self.commit()
+
+    def commit(self) -> None:
+        self.connection.commit()
+        self.lastCommit = time.monotonic()
+
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
+
+
+def openCheckpoint(stateFile: Path, options: str, resume: bool) -> tuple[Checkpoint | None, Exception | None]:
+    """
+    Open the state file of a check, creating it if it doesn't exist
+
+    Resuming a check, the state file must be written by a check with the same options; otherwise the state of a previous check is discarded.
+
+    Parameters
+    ----------
+    stateFile : Path
+        The SQLite file of the state
+    options : str
+        The options of the check changing its output (i.e. the folders, the verification, the output format)
+    resume : bool
+        True to keep the hash files checked by a previous check, False to start a new check
+
+    Returns
+    -------
+    tuple[Checkpoint | None, Exception | None]:
+        The state of the check, None in case of error
+        Exception | None :
+            ValueError if the stateFile is None or, resuming a check, if the state file was written by a check with different options
+            sqlite3.Error in case of error opening or initializing the state file
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    connection : sqlite3.Connection | None = None
+    error : Exception | None = None
+
+    if stateFile is None:
+        error = ValueError("state file has an illegal value")
+        logger.error(f"Expected a state file: {error}")
+        return None, error
+
+    try:
+        logger.debug(f"opening state file {stateFile}")
+        connection = sqlite3.connect(stateFile)
+        connection.execute("CREATE TABLE IF NOT EXISTS options (options TEXT NOT NULL)")
+        connection.execute("CREATE TABLE IF NOT EXISTS checked (hash_file TEXT PRIMARY KEY, output BLOB NOT NULL, checked_at REAL NOT NULL)")
+
+        row : tuple[str] | None = connection.execute("SELECT options FROM options").fetchone()
+        if resume and row is not None and row[0] != options:
+            error = ValueError(f"state file written by a check with different options: {row[0]}")
+            logger.error(f"Can't resume the check with the state file {stateFile}: {error}")
+            connection.close()
+            return None, error
+
+        if not resume or row is None:
+            connection.execute("DELETE FROM options")
+            connection.execute("DELETE FROM checked")
+            connection.execute("INSERT INTO options (options) VALUES (?)", (options,))
+        connection.commit()
+    except sqlite3.Error as ex:
+        error = ex
+        if connection is not None:
+            connection.close()
+        logger.exception(f"Error opening state file {stateFile}: {error}")
+        return None, error
+
+    return Checkpoint(connection), error
@@ -1,13 +1,61 @@
-import yaml
+from pathlib import Path
+import os
+import sys
+import json
 import logging
 import logging.config
 
-def initLogger() -> None :
+# environment variable selecting the configuration file of the logger, as YAML (like loggerConfig.yml) or JSON, in the format of logging.config.dictConfig
+LOGGER_CONFIG_VARIABLE : str = "LOGGER_CONFIG"
+
+# environment variable selecting the level of the quiet profile, used when no configuration file is selected
+LOGGER_LEVEL_VARIABLE : str = "LOGGER_LEVEL"
+
+# level and format of the quiet profile
+QUIET_LOGGER_LEVEL : str = "WARNING"
+QUIET_LOGGER_FORMAT : str = "%(asctime)s %(levelname)-8s - %(message)s"
+
+def initLogger(configFile: Path | None = None) -> None :
     """
-    Initialize the logger from YAML comfiguration file.
+    Initialize the logger from a configuration file, or with the quiet profile.
+
+    The configuration file is the given one or the one selected by the environment variable LOGGER_CONFIG, like LOGGER_CONFIG=loggerConfig.yml.
+    A relative path is searched in the current directory, then in the folder of this module. PyYAML is imported only to read a YAML file.
+    Without a configuration file the quiet profile is used: the records of level LOGGER_LEVEL (WARNING by default) or higher are written on the standard error,
+    nothing is read to configure the logger and no log file is written, so the scripts start fast and the debug records aren't formatted.
+
+    Parameters
+    ----------
+    configFile : Path | None
+        The configuration file, None to take it from the environment variable LOGGER_CONFIG
+
+    Raises
+    ------
+    OSError
+        if the configuration file can't be read
+    ValueError
+        if the configuration file or the level isn't valid
     """
-    with open('loggerConfig.yml') as loggerConfigFile:
-        loggerConfig = yaml.safe_load(loggerConfigFile)
+
+    if configFile is None and os.environ.get(LOGGER_CONFIG_VARIABLE):
+        configFile = Path(os.environ[LOGGER_CONFIG_VARIABLE])
+
+    if configFile is None:
+        level : str = (os.environ.get(LOGGER_LEVEL_VARIABLE) or QUIET_LOGGER_LEVEL).upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"invalid logger level: {level}")
+        logging.basicConfig(level=level, format=QUIET_LOGGER_FORMAT, datefmt="%F %T", stream=sys.stderr, force=True)
+        return None
+
+    if not configFile.is_absolute() and not configFile.is_file():
+        configFile = Path(__file__).parent.joinpath(configFile)
+
+    with open(configFile) as loggerConfigFile:
+        if configFile.suffix == ".json":
+            loggerConfig = json.load(loggerConfigFile)
+        else:
+            import yaml
+            loggerConfig = yaml.safe_load(loggerConfigFile)
         logging.config.dictConfig(loggerConfig)
 
     logger : logging.Logger = logging.getLogger(__name__)
@@ -0,0 +1,777 @@
+from config import initLogger
+from pathlib import Path
+from os import strerror, stat, stat_result, path, fstat
+from threading import local
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Protocol, cast
+from hashfileUtils import HASH_FILE_BUFFER_SIZE, loadHashFile, iterHashFile, writeHashFile, writeHashFileLines, formatHashFileRow, parseHashFileRow, normalizeRelativePath, hashFileAlgorithm
+from fileUtils import HASH_FILE_EXTENSIONS, loadRelativeFileTree
+from cacheUtils import openCache, loadCachedDigest, storeCachedDigest, DEFAULT_REVERIFY_AGE
+from throttleUtils import Throttle, getThrottle, setThrottle
+from statsUtils import measureStage, addCounter, getStats
+from contextlib import nullcontext
+import hashlib
+import math
+import os
+import time
+import errno
+import sqlite3
+import logging
+
+# xxhash is optional: without it the xxh64 and xxh128 algorithms aren't available
+try:
+    import xxhash # type: ignore[import-not-found]
+    XXHASH_AVAILABLE : bool = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# size of the blocks read from disk and fed to the hash function
+HASH_CHUNK_SIZE : int = 1024 * 1024
+
+# files up to this size are read by a single read call
+HASH_SMALL_FILE_SIZE : int = 64 * 1024
+
+# read buffers of the threads hashing the files, allocated once and reused for each file (see hashBuffer)
+threadBuffers : local = local()
+
+# names of the hash algorithms of the hash files (see fileUtils.HASH_FILE_EXTENSIONS) available in this environment
+HASH_ALGORITHMS : list[str] = [algorithm for algorithm in dict.fromkeys(HASH_FILE_EXTENSIONS.values()) if algorithm in hashlib.algorithms_available or (XXHASH_AVAILABLE and algorithm.startswith("xxh"))]
+
+class Hasher(Protocol):
+    """
+    The interface shared by the hash objects of hashlib and xxhash
+    """
+
+    def update(self, data: bytes | bytearray | memoryview, /) -> None: ...
+
+    def hexdigest(self) -> str: ...
+
+
+def newHasher(algorithm: str) -> Hasher:
+    """
+    Create the hash object of an algorithm
+
+    The algorithms of hashlib (md5, sha1, sha256, blake2b, ...) and, when the optional xxhash package is installed, xxh64 and xxh128 are supported.
+    BLAKE2b is usually faster than MD5 and SHA-256 on 64-bit CPUs, xxh64 and xxh128 are much faster but are not cryptographic hashes.
+
+    Parameters
+    ----------
+    algorithm : str
+        The name of the hash algorithm
+
+    Returns
+    -------
+    Hasher
+        The hash object
+
+    Raises
+    ------
+    ValueError
+        if the algorithm isn't supported
+    """
+    if algorithm.startswith("xxh"):
+        if not XXHASH_AVAILABLE or algorithm not in ("xxh64", "xxh128"):
+            raise ValueError(f"unsupported hash type {algorithm}")
+        return cast(Hasher, xxhash.xxh64() if algorithm == "xxh64" else xxhash.xxh128())
+    return hashlib.new(algorithm)
+
+
+def computeFileHash(filename: Path, algorithm: str = "md5", chunkSize: int = HASH_CHUNK_SIZE) -> tuple[str, Exception | None]:
+    """
+    Compute the hash of a file
+
+    The way the file is read depends on its size, so the memory used doesn't depend on the file size and the data is copied as little as possible:
+      up to HASH_SMALL_FILE_SIZE  : the file is read by a single read call
+      otherwise                   : the file is read in blocks of chunkSize bytes, into a buffer reused by all the files hashed in the same thread
+    The files aren't memory mapped: a file truncated while it's hashed would kill the process with SIGBUS, while a read just returns fewer bytes.
+    Where available, the kernel is told that the file is read sequentially and, after hashing a file bigger than HASH_SMALL_FILE_SIZE,
+    that its pages aren't needed anymore (posix_fadvise), so hashing large archives doesn't evict the rest of the page cache.
+    When a throttle is set (see throttleUtils.setThrottle), the file is opened and read within its limits.
+
+    Parameters
+    ----------
+    filename : Path
+        The file to hash
+    algorithm : str
+        The name of the hash algorithm (see newHasher)
+    chunkSize : int
+        The size of the blocks read from the file
+
+    Returns
+    -------
+    tuple[str, Exception | None]:
+        The hexadecimal digest of the file, an empty string in case of error
+        Exception | None :
+            FileNotFoundError if the filename is None or is not a valid file
+            OSError in case of IO error reading the file
+            ValueError if the algorithm isn't supported
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    digest : str = ""
+    error : Exception | None = None
+
+    if filename is None or not filename.is_file():
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), filename)
+        logger.error(f"file doesn't exists: {filename}")
+        return digest, error
+
+    throttle : Throttle | None = getThrottle()
+
+    try:
+        hasher : Hasher = newHasher(algorithm)
+        with throttle.openFile() if throttle is not None else nullcontext(), open(filename, "rb", buffering=0) as f:
+            fileno : int = f.fileno()
+            size : int = fstat(fileno).st_size
+            adviseFile(fileno, "POSIX_FADV_SEQUENTIAL")
+            readStart : float = time.monotonic()
+
+            if size <= HASH_SMALL_FILE_SIZE:
+                content : bytes = f.readall()
+                hasher.update(content)
+                if throttle is not None:
+                    throttle.read(len(content), time.monotonic() - readStart)
+            else:
+                buffer : memoryview = hashBuffer(chunkSize)
+                count : int | None = f.readinto(buffer)
+                while count:
+                    if throttle is not None:
+                        throttle.read(count, time.monotonic() - readStart)
+                    hasher.update(buffer[:count])
+                    readStart = time.monotonic()
+                    count = f.readinto(buffer)
+
+            if size > HASH_SMALL_FILE_SIZE:
+                adviseFile(fileno, "POSIX_FADV_DONTNEED")
+        digest = hasher.hexdigest()
+        addCounter("bytes_hashed", size)
+    except (OSError, ValueError) as ex:
+        error = ex
+        logger.error(f"Error hashing file {filename}: {error}")
+
+    return digest, error
+
+
+def hashBuffer(size: int) -> memoryview:
+    """
+    Return the read buffer of the current thread, allocated the first time or when its size changes
+    """
+    buffer : memoryview | None = getattr(threadBuffers, "buffer", None)
+    if buffer is None or len(buffer) != size:
+        buffer = memoryview(bytearray(size))
+        threadBuffers.buffer = buffer
+    return buffer
+
+
+def adviseFile(fileno: int, advice: str) -> None:
+    """
+    Give an advice about the access to an open file to the kernel (os.posix_fadvise), on the platforms supporting it
+
+    Parameters
+    ----------
+    fileno : int
+        The file descriptor
+    advice : str
+        The name of the advice, as a constant of the os module (POSIX_FADV_SEQUENTIAL, POSIX_FADV_DONTNEED, ...)
+    """
+    if hasattr(os, "posix_fadvise") and hasattr(os, advice):
+        try:
+            os.posix_fadvise(fileno, 0, 0, getattr(os, advice))
+        except OSError:
+            # an advice is only a hint, some file systems don't accept it
+            pass
+
+
+def computeFileHashes(filenames: list[Path], workers: int = 1, useProcesses: bool = False, cacheFile: Path | None = None, reverifyAge: float = DEFAULT_REVERIFY_AGE, algorithm: str = "md5") -> tuple[list[tuple[str, Exception | None]], Exception | None]:
+    """
+    Compute the hash of a list of files
+
+    The files are hashed in parallel by a pool of threads or a pool of processes.
+    With a cache file, a file whose device, inode, size and modification time didn't change since it was last hashed isn't read again,
+    unless its cached digest is older than the re-verify age.
+    The throttle of this process (see throttleUtils.setThrottle) limits the hashing, in a pool of processes each process gets a share of its limits.
+    The hashing is timed as the "hash" stage of the statistics of this process (see statsUtils.measureStage).
+
+    Parameters
+    ----------
+    filenames : list[Path]
+        The files to hash
+    workers : int
+        The number of threads or processes hashing the files
+    useProcesses : bool
+        True to hash the files in a pool of processes, False to hash them in a pool of threads
+    cacheFile : Path | None
+        The persistent cache of the digests, None to read all the files
+    reverifyAge : float
+        The age, in seconds, after which a cached digest is computed again reading the file
+    algorithm : str
+        The name of the hash algorithm (see newHasher)
+
+    Returns
+    -------
+    tuple[list[tuple[str, Exception | None]], Exception | None]:
+        The result of computeFileHash for each file, in the same order of the filenames
+        Exception | None :
+            ValueError if the number of workers is less than 1 or the algorithm isn't supported
+            sqlite3.Error in case of error opening the cache
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    results : list[tuple[str, Exception | None]] = []
+    error : Exception | None = None
+
+    if workers < 1:
+        error = ValueError("Expected at least one worker")
+        logger.error(f"Invalid number of workers {workers}: {error}")
+        return results, error
+
+    try:
+        newHasher(algorithm)
+    except ValueError as ex:
+        error = ex
+        logger.error(f"Invalid hash algorithm {algorithm}: {error}")
+        return results, error
+
+    cache : sqlite3.Connection | None = None
+    if cacheFile is not None:
+        cache, error = openCache(cacheFile)
+        if error is not None:
+            return results, error
+
+    # the status of each file, taken before hashing it, is the key of its cached digest
+    fileStats : list[stat_result | None] = [None] * len(filenames)
+    results = [("", None)] * len(filenames)
+    indexesToHash : list[int] = []
+
+    index : int
+    for index in range(len(filenames)):
+        if cache is not None:
+            currentStat : stat_result
+            try:
+                currentStat = stat(filenames[index])
+            except OSError as ex:
+                results[index] = ("", ex)
+                continue
+            fileStats[index] = currentStat
+            cachedDigest : str | None = loadCachedDigest(cache, currentStat, algorithm, reverifyAge)
+            if cachedDigest is not None:
+                results[index] = (cachedDigest, None)
+                continue
+        indexesToHash.append(index)
+
+    logger.debug(f"hashing {len(indexesToHash)} files with {workers} workers, {len(filenames) - len(indexesToHash)} digests from the cache")
+
+    executor : Executor
+    if useProcesses:
+        # each process gets its share of the limits of the throttle of this process
+        throttle : Throttle | None = getThrottle()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=setThrottle, initargs=throttle.split(workers) if throttle is not None else ())
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    addCounter("files_hashed", len(indexesToHash))
+    addCounter("digests_from_cache", len(filenames) - len(indexesToHash))
+
+    with measureStage("hash"), executor:
+        filesToHash : list[Path] = [filenames[index] for index in indexesToHash]
+        result : tuple[str, Exception | None]
+        for index, result in zip(indexesToHash, executor.map(computeFileHash, filesToHash, [algorithm] * len(filesToHash))):
+            results[index] = result
+            fileStat : stat_result | None = fileStats[index]
+            if cache is not None and fileStat is not None and result[1] is None:
+                storeCachedDigest(cache, fileStat, algorithm, result[0])
+            # the other processes don't count in the statistics of this process, the bytes they hashed are counted here
+            if useProcesses and result[1] is None and getStats() is not None:
+                addCounter("bytes_hashed", fileStat.st_size if fileStat is not None else fileSize(filenames[index]))
+
+    if cache is not None:
+        cache.commit()
+        cache.close()
+
+    return results, error
+
+
+def fileSize(filename: Path) -> int:
+    """
+    Return the size of a file, 0 if the file can't be read
+    """
+    try:
+        return stat(filename).st_size
+    except OSError:
+        return 0
+
+
+def generateHashFiles(folders: dict[Path, list[str]], workers: int = 1, useProcesses: bool = False, cacheFile: Path | None = None, algorithm: str = "md5") -> tuple[set[Path], set[Path], Exception | None]:
+    """
+    Generate an hash file in each folder, with the hash of the given files of the folder or of its sub-tree
+
+    The hash file of a folder is named after the folder, with the extension of the algorithm (a folder "album" gets "album.md5" with md5, "album.b2" with blake2b), and lists the given files sorted by path, in the format read by loadHashFile.
+    An hash file is checked against the whole sub-tree of its folder, so the files of a folder are usually all the files of its sub-tree (see fileUtils.groupSubtreeFiles);
+    the hash files generated in the subfolders are listed too: the hash files are written from the deepest folders, and an hash file is hashed after it's written.
+    The other files of all the folders are hashed together, once, by a single pool (see computeFileHashes), so small folders don't leave the workers idle.
+    An hash file is written atomically (see writeHashFile) and only when all the files of its folder are hashed, so an unreadable file leaves its folder, and the folders listing it, without an hash file.
+
+    Parameters
+    ----------
+    folders : dict[Path, list[str]]
+        The folders, each one bound to the relative paths of the files to hash
+    workers : int
+        The number of threads or processes hashing the files
+    useProcesses : bool
+        True to hash the files in a pool of processes, False to hash them in a pool of threads
+    cacheFile : Path | None
+        The persistent cache of the digests, None to read all the files
+    algorithm : str
+        The name of the hash algorithm (see newHasher)
+
+    Returns
+    -------
+    tuple[set[Path], set[Path], Exception | None]:
+        The hash files written
+        The folders whose hash file can't be written, because a file can't be read or because of an error writing the hash file
+        Exception | None :
+            ValueError if the number of workers is less than 1 or the algorithm hasn't an hash file extension
+            sqlite3.Error in case of error opening the cache
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    writtenHashFiles : set[Path] = set()
+    failedFolders : set[Path] = set()
+    error : Exception | None = None
+
+    extension : str | None = next((extension for extension in HASH_FILE_EXTENSIONS if HASH_FILE_EXTENSIONS[extension] == algorithm), None)
+    if extension is None:
+        error = ValueError(f"no hash file extension for the algorithm {algorithm}")
+        logger.error(f"Invalid hash algorithm {algorithm}: {error}")
+        return writtenHashFiles, failedFolders, error
+
+    folder : Path
+    hashFiles : dict[Path, Path] = {folder: folder.joinpath(f"{folder.absolute().name or 'root'}{extension}") for folder in folders}
+    # the files listed by more folders are hashed once
+    filenames : list[Path] = list(dict.fromkeys(filename for folder in folders for filename in map(folder.joinpath, folders[folder])))
+
+    # a folder lists the hash files generated in its subfolders, hashed when written
+    folderRows : dict[Path, list[str]] = {folder: list(folders[folder]) for folder in folders}
+    hashFile : Path
+    for folder, hashFile in hashFiles.items():
+        parentFolder : Path
+        for parentFolder in folder.parents:
+            if parentFolder in folderRows:
+                folderRows[parentFolder].append(hashFile.relative_to(parentFolder).as_posix())
+
+    results : list[tuple[str, Exception | None]]
+    results, error = computeFileHashes(filenames, workers, useProcesses, cacheFile, algorithm=algorithm)
+
+    if error is not None:
+        return writtenHashFiles, failedFolders, error
+
+    digests : dict[Path, tuple[str, Exception | None]] = dict(zip(filenames, results))
+
+    for folder in sorted(folders, key=lambda folder: len(folder.parts), reverse=True):
+        names : list[str] = folderRows[folder]
+
+        name : str
+        # an hash file of a subfolder that can't be generated is missing
+        folderResults : list[tuple[str, Exception | None]] = [digests.get(folder.joinpath(name), ("", FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), folder.joinpath(name)))) for name in names]
+        digest : str
+        hashError : Exception | None
+        unreadableNames : list[str] = [name for name, (digest, hashError) in zip(names, folderResults) if hashError is not None]
+        if len(unreadableNames) > 0:
+            logger.error(f"Skipping folder {folder}, files can't be read: {unreadableNames}")
+            failedFolders.add(folder)
+            continue
+
+        hashFile = hashFiles[folder]
+        writeError : Exception | None = writeHashFile(hashFile, sorted(((name, digest) for name, (digest, hashError) in zip(names, folderResults)), key=lambda row: tuple(row[0].split("/"))))
+        if writeError is not None:
+            failedFolders.add(folder)
+            continue
+
+        logger.debug(f"written hash file {hashFile} with {len(names)} rows")
+        writtenHashFiles.add(hashFile)
+        # the hash file can be listed by the hash file of a parent folder
+        digests[hashFile] = computeFileHash(hashFile, algorithm)
+
+    return writtenHashFiles, failedFolders, error
+
+
+def verifyHashFile(filename: Path, workers: int = 1, useProcesses: bool = False, cacheFile: Path | None = None, reverifyAge: float = DEFAULT_REVERIFY_AGE, algorithm: str | None = None) -> tuple[set[Path], set[Path], set[Path], Exception | None]:
+    """
+    Verify the hashes listed in the hash file
+
+    Each file listed in the hash file is hashed again and its digest is compared with the one stored in the hash file.
+    The hash algorithm is detected from the hash file (see hashfileUtils.hashFileAlgorithm), unless it's given.
+    The files are hashed in parallel and the digests of unchanged files can be taken from a cache (see computeFileHashes).
+
+    Parameters
+    ----------
+    filename : Path
+        The hash file to verify
+    workers : int
+        The number of threads or processes hashing the files
+    useProcesses : bool
+        True to hash the files in a pool of processes, False to hash them in a pool of threads
+    cacheFile : Path | None
+        The persistent cache of the digests, None to read all the files
+    reverifyAge : float
+        The age, in seconds, after which a cached digest is computed again reading the file
+    algorithm : str | None
+        The name of the hash algorithm (see newHasher), None to detect it from the hash file
+
+    Returns
+    -------
+    tuple[set[Path], set[Path], set[Path], Exception | None]:
+        A first set of files matching the hash in the hash file
+        A second set of files NOT matching the hash in the hash file
+        A third set of files that can't be read
+        Exception | None :
+            FileNotFoundError if the filename is None or is not a valid file
+            ValueError if the number of workers is less than 1
+            OSError in case of IO error loading the hash file
+            sqlite3.Error in case of error opening the cache
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    okFiles : set[Path] = set()
+    mismatchedFiles : set[Path] = set()
+    unreadableFiles : set[Path] = set()
+    error : Exception | None = None
+
+    fileAndHashes : dict[str, str]
+    fileAndHashes, error = loadHashFile(filename)
+
+    if error is not None:
+        logger.error(f"error loading hashfile: {error}")
+        return okFiles, mismatchedFiles, unreadableFiles, error
+
+    if algorithm is None:
+        algorithm, error = hashFileAlgorithm(filename)
+        if error is not None:
+            return okFiles, mismatchedFiles, unreadableFiles, error
+
+    rootFolder : Path = filename.parent
+    fullPaths : list[Path] = [rootFolder.joinpath(filepath) for filepath in fileAndHashes]
+    expectedHashes : list[str] = [hash.lower() for hash in fileAndHashes.values()]
+
+    logger.debug(f"verifying {len(fullPaths)} files")
+
+    results : list[tuple[str, Exception | None]]
+    results, error = computeFileHashes(fullPaths, workers, useProcesses, cacheFile, reverifyAge, algorithm)
+
+    if error is not None:
+        logger.error(f"error hashing the files in {filename}: {error}")
+        return okFiles, mismatchedFiles, unreadableFiles, error
+
+    fullPath : Path
+    expectedHash : str
+    digest : str
+    hashError : Exception | None
+    for fullPath, expectedHash, (digest, hashError) in zip(fullPaths, expectedHashes, results):
+        if hashError is not None:
+            unreadableFiles.add(fullPath)
+        elif digest == expectedHash:
+            okFiles.add(fullPath)
+        else:
+            mismatchedFiles.add(fullPath)
+
+    logger.debug(f"verified files: {len(okFiles)} ok, {len(mismatchedFiles)} mismatched, {len(unreadableFiles)} unreadable")
+
+    return okFiles, mismatchedFiles, unreadableFiles, error
+
+
+def sampleHashFiles(hashFiles: list[Path], checkedAt: dict[str, float], fraction: float = 0, byteBudget: int = 0) -> tuple[list[Path], Exception | None]:
+    """
+    Choose the hash files to check in this run, among the hash files not checked for the longest time
+
+    The hash files never checked come first, then the others from the oldest check; a run checks a fraction of the hash files
+    or the hash files whose listed files sum up to a budget of bytes (at least one hash file, even if it exceeds the budget).
+    Saving the time of each check (see cacheUtils.storeCheckedHashFile), all the hash files are checked within 1 / fraction runs,
+    or within as many runs as the budgets needed to read all the listed files.
+
+    Parameters
+    ----------
+    hashFiles : list[Path]
+        The hash files to choose from
+    checkedAt : dict[str, float]
+        The hash files already checked, each one bound to the time of its last check (see cacheUtils.loadCheckedHashFiles)
+    fraction : float
+        The fraction of the hash files to check, between 0 and 1, 0 to use the byte budget
+    byteBudget : int
+        The bytes of the files to check, 0 to use the fraction
+
+    Returns
+    -------
+    tuple[list[Path], Exception | None]:
+        The hash files to check, from the one not checked for the longest time
+        Exception | None :
+            ValueError if neither or both the fraction and the byte budget are given, or if the fraction isn't between 0 and 1
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    sample : list[Path] = []
+    error : Exception | None = None
+
+    if (fraction > 0) == (byteBudget > 0) or fraction < 0 or fraction > 1 or byteBudget < 0:
+        error = ValueError("expected a fraction between 0 and 1 or a byte budget")
+        logger.error(f"Invalid sample of fraction {fraction} and byte budget {byteBudget}: {error}")
+        return sample, error
+
+    hashFile : Path
+    candidates : list[Path] = sorted(hashFiles, key=lambda hashFile: (checkedAt.get(str(hashFile), 0.0), hashFile.parts))
+
+    if fraction > 0:
+        sample = candidates[:math.ceil(fraction * len(candidates))]
+    else:
+        budgetLeft : int = byteBudget
+        for hashFile in candidates:
+            size : int = hashFileBytes(hashFile)
+            if len(sample) > 0 and size > budgetLeft:
+                break
+            sample.append(hashFile)
+            budgetLeft = budgetLeft - size
+
+    logger.debug(f"sampled {len(sample)} of {len(candidates)} hash files")
+
+    return sample, error
+
+
+def hashFileBytes(filename: Path) -> int:
+    """
+    Return the bytes of the files listed in the hash file, that is the bytes read verifying it; the files that can't be read are ignored
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    rootFolder : Path = filename.parent
+    size : int = 0
+    try:
+        filepath : str
+        hash : str
+        for filepath, hash in iterHashFile(filename):
+            try:
+                size = size + stat(rootFolder.joinpath(filepath)).st_size
+            except OSError:
+                continue
+    except OSError as ex:
+        logger.warning(f"Error reading file {filename}: {ex}")
+
+    return size
+
+
+def updateHashFile(filename: Path, workers: int = 1, useProcesses: bool = False, cacheFile: Path | None = None, scanWorkers: int = 1) -> tuple[set[Path], set[Path], set[Path], Exception | None]:
+    """
+    Update an hash file with the changes of the tree of its folder
+
+    The rows of the hash file are kept as they are, with their text and format, only the files in the folder tree and NOT in the hash file are hashed and appended,
+    and the rows of the files that don't exist anymore are removed, so the cost of the update depends on the changed files and not on the size of the folder.
+    The paths of the rows are normalized (see hashfileUtils.normalizeRelativePath) before comparing them with the folder tree, so a row like ./a.jpg lists the file a.jpg.
+    Hash files in the folder tree are not added, the new files are hashed with the algorithm of the hash file (see hashfileUtils.hashFileAlgorithm) and appended in the format of its first row (GNU or BSD).
+    The hash file is rewritten atomically (see hashfileUtils.writeHashFileLines), and only if something changed.
+
+    Parameters
+    ----------
+    filename : Path
+        The hash file to update
+    workers : int
+        The number of threads or processes hashing the new files
+    useProcesses : bool
+        True to hash the files in a pool of processes, False to hash them in a pool of threads
+    cacheFile : Path | None
+        The persistent cache of the folder listings and of the digests, None to list all the folders and read all the new files
+    scanWorkers : int
+        The number of folders listed at the same time (see fileUtils.scanRelativeTree)
+
+    Returns
+    -------
+    tuple[set[Path], set[Path], set[Path], Exception | None]:
+        The files added to the hash file
+        The files removed from the hash file
+        The new files that can't be read, NOT added to the hash file
+        Exception | None :
+            FileNotFoundError if the filename is None or is not a valid file
+            OSError in case of IO error loading the hash file, listing the folder or writing the hash file
+            UnicodeEncodeError in case of error encoding a new row, the hash file is left as it is
+            sqlite3.Error in case of error opening the cache
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    addedFiles : set[Path] = set()
+    removedFiles : set[Path] = set()
+    unreadableFiles : set[Path] = set()
+    error : Exception | None = None
+
+    if filename is None or not filename.is_file():
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), filename)
+        logger.error(f"error loading hashfile: {error}")
+        return addedFiles, removedFiles, unreadableFiles, error
+
+    # the lines of the hash file, each one bound to the normalized path of its row (None for the empty and invalid lines)
+    lines : list[tuple[bytes, str | None]] = []
+    tag : str | None = None
+    lineTerminator : bytes = b"\n"
+    try:
+        line : bytes
+        with open(filename, "rb", buffering=HASH_FILE_BUFFER_SIZE) as f:
+            for line in f:
+                row : tuple[str, str, str] | None = parseHashFileRow(line.rstrip(b"\r\n"))
+                if row is not None and tag is None:
+                    # the new rows get the format and the line terminator of the first row
+                    tag = row[2]
+                    lineTerminator = b"\r\n" if line.endswith(b"\r\n") else b"\n"
+                lines.append((line, normalizeRelativePath(row[0]) if row is not None else None))
+    except OSError as ex:
+        logger.error(f"error loading hashfile: {ex}")
+        return addedFiles, removedFiles, unreadableFiles, ex
+
+    algorithm : str
+    algorithm, error = hashFileAlgorithm(filename)
+
+    if error is not None:
+        return addedFiles, removedFiles, unreadableFiles, error
+
+    rootFolder : Path = filename.parent
+    fileInFolders : dict[str, set[str]]
+    fileInFolders, error = loadRelativeFileTree(rootFolder, cacheFile, scanWorkers)
+
+    if error is not None:
+        logger.error(f"error iterating folder {rootFolder}: {error}")
+        return addedFiles, removedFiles, unreadableFiles, error
+
+    folder : str
+    name : str
+    filesInDir : set[str] = {f"{folder}/{name}" if len(folder) > 0 else name for folder in fileInFolders for name in fileInFolders[folder]}
+    filesInHashFile : set[str] = {filepath for line, filepath in lines if filepath is not None}
+
+    # the folder tree only lists the files with an extension, a row missing from the tree is removed only if its file doesn't exist
+    filepath : str
+    removedPaths : set[str] = {filepath for filepath in filesInHashFile if filepath not in filesInDir and not path.isfile(rootFolder.joinpath(filepath))}
+    newPaths : list[str] = sorted(filepath for filepath in filesInDir - filesInHashFile if not filepath.endswith(tuple(HASH_FILE_EXTENSIONS)))
+
+    if len(removedPaths) == 0 and len(newPaths) == 0:
+        logger.debug(f"hash file {filename} is up to date")
+        return addedFiles, removedFiles, unreadableFiles, error
+
+    logger.debug(f"updating hash file {filename}: {len(newPaths)} new files, {len(removedPaths)} removed files")
+
+    results : list[tuple[str, Exception | None]]
+    results, error = computeFileHashes([rootFolder.joinpath(filepath) for filepath in newPaths], workers, useProcesses, cacheFile, algorithm=algorithm)
+
+    if error is not None:
+        logger.error(f"error hashing the new files in {rootFolder}: {error}")
+        return addedFiles, removedFiles, unreadableFiles, error
+
+    # the rows kept are written as they are, the removed rows are dropped and the new ones appended
+    rowPath : str | None
+    newLines : list[bytes] = [line for line, rowPath in lines if rowPath not in removedPaths]
+    if len(newLines) > 0 and not newLines[-1].endswith(b"\n"):
+        newLines[-1] = newLines[-1] + lineTerminator
+    removedFiles = {rootFolder.joinpath(filepath) for filepath in removedPaths}
+
+    digest : str
+    hashError : Exception | None
+    for filepath, (digest, hashError) in zip(newPaths, results):
+        if hashError is not None:
+            unreadableFiles.add(rootFolder.joinpath(filepath))
+            continue
+        newLines.append(formatHashFileRow(filepath, digest, tag if tag is not None else "")[:-1] + lineTerminator)
+        addedFiles.add(rootFolder.joinpath(filepath))
+
+    if len(addedFiles) > 0 or len(removedFiles) > 0:
+        error = writeHashFileLines(filename, newLines)
+
+    if error is not None:
+        addedFiles = set()
+        removedFiles = set()
+
+    return addedFiles, removedFiles, unreadableFiles, error
+
+
+def printVerificationResults(okFiles: set[Path], mismatchedFiles: set[Path], unreadableFiles: set[Path]) -> None:
+    """
+    Print the result of the verification of an hash file
+
+    This function prints the number of files matching their hash, the files NOT matching their hash and the files that can't be read. If a set is None, it will print nothing
+
+    Parameters
+    ----------
+    okFiles: set[Path]
+        contains the files matching the hash in the hash file
+    mismatchedFiles: set[Path]
+        contains the files NOT matching the hash in the hash file
+    unreadableFiles: set[Path]
+        contains the files that can't be read
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    if okFiles is None or mismatchedFiles is None or unreadableFiles is None:
+        error = ValueError("set of verified files has an illegal value")
+        logger.error(f"Expected the sets of verified files: {error}")
+        return None
+
+    print (f"Files matching their hash: {len(okFiles)}")
+
+    filename: Path
+    if len(mismatchedFiles) == 0:
+        print ("All readable files match their hash.")
+    else:
+        print ("Files NOT matching their hash:")
+        for filename in sorted(mismatchedFiles):
+            print(f"\t {filename}")
+
+    if len(unreadableFiles) == 0:
+        print ("All files in hash file are readable.")
+    else:
+        print ("Files in hash file that can't be read:")
+        for filename in sorted(unreadableFiles):
+            print(f"\t {filename}")
+
+    return None
+
+
+def printUpdateResults(addedFiles: set[Path], removedFiles: set[Path], unreadableFiles: set[Path]) -> None:
+    """
+    Print the result of the update of an hash file (see updateHashFile)
+
+    Parameters
+    ----------
+    addedFiles: set[Path]
+        contains the files added to the hash file
+    removedFiles: set[Path]
+        contains the files removed from the hash file
+    unreadableFiles: set[Path]
+        contains the new files that can't be read
+    """
+
+    filename: Path
+    if len(addedFiles) == 0 and len(removedFiles) == 0:
+        print ("Hash file is up to date.")
+
+    if len(addedFiles) > 0:
+        print ("Files added to hash file:")
+        for filename in sorted(addedFiles):
+            print(f"\t {filename}")
+
+    if len(removedFiles) > 0:
+        print ("Files removed from hash file:")
+        for filename in sorted(removedFiles):
+            print(f"\t {filename}")
+
+    if len(unreadableFiles) > 0:
+        print ("New files that can't be read, NOT added to hash file:")
+        for filename in sorted(unreadableFiles):
+            print(f"\t {filename}")
+
+    return None
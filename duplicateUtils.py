@@ -0,0 +1,171 @@
+from config import initLogger
+from pathlib import Path
+from os import path, stat, stat_result
+from typing import Iterable
+from hashfileUtils import iterHashFile, hashFileAlgorithm
+from statsUtils import measureStage, addCounter
+import logging
+
+def findDuplicateFiles(hashFiles: Iterable[Path]) -> tuple[dict[str, list[Path]], Exception | None]:
+    """
+    Find the files with the same content listed in a set of hash files, from the digests of the hash files, without reading the files
+
+    Each hash file is streamed (see hashfileUtils.iterHashFile) into an index from each digest to the first file with that digest;
+    only the digests of the files found again get a list of files, so the memory used is about one path for each distinct content.
+    The digests of different algorithms aren't compared, and a file listed by more hash files (i.e. an hash file of a folder and one of its subfolder) isn't a duplicate.
+
+    Parameters
+    ----------
+    hashFiles : Iterable[Path]
+        The hash files, like the ones found by fileUtils.searchHashFiles
+
+    Returns
+    -------
+    tuple[dict[str, list[Path]], Exception | None]:
+        Each duplicated content, as the algorithm and the digest (like md5:d41d8cd98f00b204e9800998ecf8427e), bound to its files (at least two) in the order they were found
+        Exception | None :
+            OSError in case of IO error reading an hash file, the other hash files are indexed anyway
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    # each digest bound to its first file, and each digest found again bound to all its files
+    firstFiles : dict[bytes, str] = {}
+    duplicateFiles : dict[bytes, list[str]] = {}
+    error : Exception | None = None
+
+    with measureStage("parse"):
+        hashFile : Path
+        for hashFile in hashFiles:
+            algorithm : str
+            algorithmError : Exception | None
+            algorithm, algorithmError = hashFileAlgorithm(hashFile)
+            if algorithmError is not None:
+                error = algorithmError
+                continue
+
+            prefix : bytes = f"{algorithm}:".encode()
+            rootFolder : str = str(hashFile.parent)
+            rows : int = 0
+            try:
+                filepath : str
+                hash : str
+                for filepath, hash in iterHashFile(hashFile):
+                    digest : bytes
+                    try:
+                        # the raw digest takes half the memory of the hexadecimal one
+                        digest = prefix + bytes.fromhex(hash)
+                    except ValueError:
+                        logger.warning(f"skipping invalid hash in {hashFile}: {hash}")
+                        continue
+
+                    fullPath : str = path.normpath(path.join(rootFolder, filepath))
+                    rows = rows + 1
+                    firstFile : str = firstFiles.setdefault(digest, fullPath)
+                    if firstFile == fullPath:
+                        continue
+                    sameFiles : list[str] | None = duplicateFiles.get(digest)
+                    if sameFiles is None:
+                        duplicateFiles[digest] = [firstFile, fullPath]
+                    elif fullPath not in sameFiles:
+                        sameFiles.append(fullPath)
+            except OSError as ex:
+                logger.error(f"Error reading hash file {hashFile}: {ex}")
+                error = ex
+                continue
+
+            logger.debug(f"indexed {rows} files of hash file {hashFile}")
+
+    logger.debug(f"indexed {len(firstFiles)} distinct contents, {len(duplicateFiles)} duplicated")
+    addCounter("distinct_contents", len(firstFiles))
+
+    duplicates : dict[str, list[Path]] = {}
+    key : bytes
+    files : list[str]
+    for key, files in duplicateFiles.items():
+        algorithmName : bytes
+        separator : bytes
+        rawDigest : bytes
+        algorithmName, separator, rawDigest = key.partition(b":")
+        duplicates[f"{algorithmName.decode()}:{rawDigest.hex()}"] = [Path(filepath) for filepath in files]
+
+    return duplicates, error
+
+
+def measureDuplicateFiles(duplicates: dict[str, list[Path]]) -> list[tuple[str, int, list[Path]]]:
+    """
+    Measure the size of the duplicated files, sorting the duplicated contents by the bytes wasted
+
+    Only the duplicated files are read by stat. The files that don't exist anymore are skipped,
+    and the hard links of the same file are counted once, since they don't waste space.
+    The bytes wasted by a content are its size multiplied by its copies but one.
+
+    Parameters
+    ----------
+    duplicates : dict[str, list[Path]]
+        Each duplicated content bound to its files, as returned by findDuplicateFiles
+
+    Returns
+    -------
+    list[tuple[str, int, list[Path]]]
+        The contents still duplicated, each one as the digest, the size of a file and the files (a file for each hard linked set of files),
+        sorted by the bytes wasted, most wasted first
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    groups : list[tuple[str, int, list[Path]]] = []
+
+    digest : str
+    files : list[Path]
+    for digest, files in duplicates.items():
+        inodes : set[tuple[int, int]] = set()
+        copies : list[Path] = []
+        size : int = 0
+        filepath : Path
+        for filepath in files:
+            fileStat : stat_result
+            try:
+                fileStat = stat(filepath)
+            except OSError as ex:
+                logger.debug(f"skipping duplicated file {filepath}: {ex}")
+                continue
+            if (fileStat.st_dev, fileStat.st_ino) in inodes:
+                continue
+            inodes.add((fileStat.st_dev, fileStat.st_ino))
+            copies.append(filepath)
+            size = fileStat.st_size
+
+        if len(copies) > 1:
+            groups.append((digest, size, copies))
+
+    groups.sort(key=lambda group: (-group[1] * (len(group[2]) - 1), group[0]))
+    return groups
+
+
+def printDuplicateFiles(groups: list[tuple[str, int, list[Path]]]) -> int:
+    """
+    Print each duplicated content with its files, then the total bytes wasted
+
+    Returns
+    -------
+    int
+        The total bytes wasted by the copies
+    """
+
+    wastedBytes : int = 0
+
+    digest : str
+    size : int
+    files : list[Path]
+    for digest, size, files in groups:
+        print(f"{size * (len(files) - 1)} bytes wasted by {len(files)} copies of {size} bytes ({digest}):")
+        filepath : Path
+        for filepath in files:
+            print(f"  {filepath}")
+        wastedBytes = wastedBytes + size * (len(files) - 1)
+
+    print(f"wasted bytes: {wastedBytes} in {len(groups)} duplicated contents")
+
+    return wastedBytes
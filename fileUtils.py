@@ -1,10 +1,36 @@
 from config import initLogger
 from pathlib import Path
-from os import walk, strerror
+from os import scandir, stat, stat_result, strerror, path, DirEntry
+from cacheUtils import openCache, loadCachedFolder, storeCachedFolder, pruneCachedFolders
+from bisect import bisect_left
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from threading import Lock
+from _thread import LockType
+from contextlib import nullcontext
+from throttleUtils import Throttle, getThrottle
+from statsUtils import measureStage, addCounter
+import time
 import errno
+import sqlite3
 import logging
 
-def searchHashFiles(folder: Path) -> tuple[set[Path], set[Path], Exception | None]: 
+# extension of the hash files generated in the folders
+HASH_FILE_EXTENSION: str = ".md5"
+
+# extensions of the hash files searched in the folders, each one bound to the name of its hash algorithm
+HASH_FILE_EXTENSIONS: dict[str, str] = {
+    ".md5": "md5",
+    ".sha1": "sha1",
+    ".sha": "sha1",
+    ".sha256": "sha256",
+    ".sha512": "sha512",
+    ".b2": "blake2b",
+    ".xxh64": "xxh64",
+    ".xxh128": "xxh128",
+}
+
+def searchHashFiles(folder: Path, cacheFile: Path | None = None, workers: int = 1) -> tuple[set[Path], set[Path], Exception | None]: 
     """
     Search recursively the hash files inside the folder 
     
@@ -14,6 +40,10 @@ def searchHashFiles(folder: Path) -> tuple[set[Path], set[Path], Exception | Non
     ----------
     folder: Path
         The folder where recursively search for hash files 
+    cacheFile: Path | None
+        The persistent cache of the folder listings, None to list all the folders
+    workers: int
+        The number of folders listed at the same time by a pool of threads, to hide the latency of network file systems
 
     Returns
     -------
@@ -37,27 +67,9 @@ def searchHashFiles(folder: Path) -> tuple[set[Path], set[Path], Exception | Non
         error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), folder)
         return missingHashFiles, existentHashFiles, error
     
-    root: str
-    dirs: list[str]
-    files: list[str]
+    fileTree: dict[Path, set[Path]]
+    fileTree, missingHashFiles, existentHashFiles, error = scanTree(folder, cacheFile, workers)
     
-    try:
-        logger.debug(f"searching hash files in folder {folder}")
-        for root, dirs, files in walk(folder):
-            hashFiles: set[Path] = set (Path(root).glob("*.md5"))
-            if len(hashFiles) == 0:
-                missingHashFiles.add(Path(root))
-            else:
-                path: Path
-                for path in hashFiles:
-                    existentHashFiles.add(path)
-        logger.debug(f"missing hash files {len(missingHashFiles)}, existent hash file {len(existentHashFiles)}")
-    except OSError as ex:
-        error = ex
-        missingHashFiles = set()
-        existentHashFiles = set()
-        logger.exception(f"Error searching hash files in folder {folder}: {error}")
-
     return missingHashFiles, existentHashFiles, error
 
 
@@ -199,7 +211,53 @@ def splitFoldersByExistence(folders: set[Path]) -> tuple[set[Path], set[Path], E
     return existentFolders, invalidFolders, error
 
 
-def loadFileTree(rootFolder: Path) -> tuple[dict[Path, set[Path]], Exception | None]:
+def loadFolderList(filename: Path) -> tuple[list[Path], Exception | None]:
+    """
+    Load a list of folders from a text file, one folder for each row
+    
+    Empty rows and rows starting with "#" are skipped
+    
+    Parameters
+    ----------
+    filename: Path
+        The text file to load 
+
+    Returns
+    -------
+    tuple[list[Path], Exception | None]
+        The list of folders, in the order of the file
+        Exception | None: 
+            FileNotFoundError if the filename is None or is not a valid file 
+            OSError in case of IO error loading the file
+            None in case of success (no error happens)
+    """
+    logger: logging.Logger = logging.getLogger(__name__)
+    
+    folders: list[Path] = []
+    error: Exception | None = None
+    
+    if filename is None or not filename.is_file():
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), filename)
+        logger.error(f"file doesn't exists: {filename}")
+        return folders, error
+    
+    try:
+        logger.debug(f"loading folder list {filename}")
+        with open(filename) as f:
+            line: str
+            for line in f:
+                line = line.strip()
+                if len(line) > 0 and not line.startswith("#"):
+                    folders.append(Path(line))
+    except OSError as ex:
+        error = ex
+        folders = []
+        logger.exception(f"Error loading folder list {filename}: {error}")
+    
+    return folders, error
+
+
+def loadFileTree(rootFolder: Path, cacheFile: Path | None = None, workers: int = 1) -> tuple[dict[Path, set[Path]], Exception | None]:
     """
     Scan all the file tree in a root folder 
     
@@ -207,6 +265,10 @@ def loadFileTree(rootFolder: Path) -> tuple[dict[Path, set[Path]], Exception | N
     ----------
     folders: Path
         The root folder to scan 
+    cacheFile: Path | None
+        The persistent cache of the folder listings, None to list all the folders
+    workers: int
+        The number of folders listed at the same time by a pool of threads, to hide the latency of network file systems
 
     Returns
     -------
@@ -227,21 +289,545 @@ def loadFileTree(rootFolder: Path) -> tuple[dict[Path, set[Path]], Exception | N
         error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), rootFolder)
         return fileTree, error
     
-    fileCounter: int = 0
+    missingHashFiles: set[Path]
+    existentHashFiles: set[Path]
+    fileTree, missingHashFiles, existentHashFiles, error = scanTree(rootFolder, cacheFile, workers)
+
+    return fileTree, error
+
+
+def loadRelativeFileTree(rootFolder: Path, cacheFile: Path | None = None, workers: int = 1) -> tuple[dict[str, set[str]], Exception | None]:
+    """
+    Scan all the file tree in a root folder, using relative paths as keys
+    
+    Like loadFileTree, but the folders are relative to the root folder and bound to the names of the files they contain (see scanRelativeTree)
+    
+    Parameters
+    ----------
+    rootFolder: Path
+        The root folder to scan 
+    cacheFile: Path | None
+        The persistent cache of the folder listings, None to list all the folders
+    workers: int
+        The number of folders listed at the same time by a pool of threads, to hide the latency of network file systems
+
+    Returns
+    -------
+    tuple[dict[str, set[str]], Exception | None]
+        A dict of relative folders, each folder bound to the set of names of the files it contains 
+        Exception | None: 
+            FileNotFoundError if the root folder is None or is not a valid directory 
+            OSError in case of error listing the root folder
+            None in case of success (no error happens)
+    """
+    fileTree: dict[str, set[str]]
+    missingHashFiles: set[str]
+    existentHashFiles: set[str]
+    error: Exception | None
+    fileTree, missingHashFiles, existentHashFiles, error = scanRelativeTree(rootFolder, cacheFile, workers)
+
+    return fileTree, error
+
+
+def listFolder(folder: str, cache: sqlite3.Connection | None = None, cacheLock: LockType | None = None) -> tuple[list[str], list[str], Exception | None]:
+    """
+    List the files and the subfolders of a folder
+    
+    The folder is listed by a single os.scandir call and the type of each entry is taken from the directory listing, without a further stat call; symbolic links to folders are not followed.
+    With a cache, the listing is taken from the cache when the modification time and the inode of the folder didn't change, otherwise the folder is listed and the cache is updated.
+    A folder listed from the storage counts as an open file for the throttle of this process (see throttleUtils.setThrottle).
+    The folders and the files listed are counted in the statistics of this process (see statsUtils.addCounter).
+    
+    Parameters
+    ----------
+    folder: str
+        The folder to list 
+    cache: sqlite3.Connection | None
+        The cache opened by cacheUtils.openCache, None to always list the folder
+    cacheLock: Lock | None
+        The lock serializing the access to the cache, when folders are listed by several threads
+
+    Returns
+    -------
+    tuple[list[str], list[str], Exception | None]
+        The names of the files in the folder
+        The names of the subfolders in the folder
+        Exception | None: 
+            OSError in case of error listing the folder
+            None in case of success (no error happens)
+    """
+    files: list[str] = []
+    subfolders: list[str] = []
+    error: Exception | None = None
     
     try:
-        logger.debug(f"loading folder tree {rootFolder}")
-        root: str
-        dirs: list[str]
-        files: list[str]
-        for root, dirs, files in walk(rootFolder):
-            fileFound : set[Path] = set (Path(root).glob("*.*"))
-            fileTree[Path(root)] = fileFound
-            fileCounter = fileCounter + len(fileFound)
-        logger.debug(f"Loaded {fileCounter} files from folder tree {rootFolder}")
+        folderStat: stat_result | None = None
+        if cache is not None:
+            folderStat = stat(folder)
+            cachedListing: tuple[list[str], list[str]] | None
+            with cacheLock if cacheLock is not None else nullcontext():
+                cachedListing = loadCachedFolder(cache, folder, folderStat.st_mtime_ns, folderStat.st_ino)
+            if cachedListing is not None:
+                files, subfolders = cachedListing
+                addCounter("folders_from_cache")
+                addCounter("files_listed", len(files))
+                return files, subfolders, error
+        
+        throttle: Throttle | None = getThrottle()
+        entry: DirEntry[str]
+        with throttle.openFile() if throttle is not None else nullcontext(), scandir(folder) as entries:
+            listStart: float = time.monotonic()
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+            if throttle is not None:
+                throttle.read(0, time.monotonic() - listStart)
+        addCounter("folders_listed")
+        addCounter("files_listed", len(files))
+        
+        if cache is not None and folderStat is not None:
+            with cacheLock if cacheLock is not None else nullcontext():
+                storeCachedFolder(cache, folder, folderStat.st_mtime_ns, folderStat.st_ino, files, subfolders)
     except OSError as ex:
         error = ex
-        fileTree = dict()
-        logger.exception(f"Error loading folder tree {rootFolder}: {error}")
+        files = []
+        subfolders = []
+    
+    return files, subfolders, error
 
-    return fileTree, error
+
+def scanTree(rootFolder: Path, cacheFile: Path | None = None, workers: int = 1) -> tuple[dict[Path, set[Path]], set[Path], set[Path], Exception | None]:
+    """
+    Scan the file tree in a root folder, listing each folder only once
+    
+    Starting from the root folder, recursively iterating in the directories and subdirectories, it will create a dict of folders, each one bound to the set of files it contains, a set of folders with missing hash file inside and a set of existent hash files.
+    This is scanRelativeTree, with the relative paths converted to Path objects.
+    
+    Parameters
+    ----------
+    rootFolder: Path
+        The root folder to scan 
+    cacheFile: Path | None
+        The persistent cache of the folder listings, None to list all the folders
+    workers: int
+        The number of folders listed at the same time by a pool of threads, to hide the latency of network file systems
+
+    Returns
+    -------
+    tuple[dict[Path, set[Path]], set[Path], set[Path], Exception | None]
+        A dict of folders, each folder bound to a set of file it contains 
+        A first set of folders with missing hash file inside
+        A second set of (existent) hash file
+        Exception | None: 
+            FileNotFoundError if the root folder is None or is not a valid directory 
+            OSError in case of error listing the root folder
+            sqlite3.Error in case of error opening the cache
+            None in case of success (no error happens)
+    """
+    relativeTree: dict[str, set[str]]
+    relativeMissingHashFiles: set[str]
+    relativeHashFiles: set[str]
+    error: Exception | None
+    relativeTree, relativeMissingHashFiles, relativeHashFiles, error = scanRelativeTree(rootFolder, cacheFile, workers)
+    
+    fileTree: dict[Path, set[Path]] = relativeTreeToPaths(rootFolder, relativeTree)
+    missingHashFiles: set[Path] = {rootFolder.joinpath(relativeFolder) for relativeFolder in relativeMissingHashFiles}
+    existentHashFiles: set[Path] = {rootFolder.joinpath(relativeHashFile) for relativeHashFile in relativeHashFiles}
+    
+    return fileTree, missingHashFiles, existentHashFiles, error
+
+
+def relativeTreeToPaths(rootFolder: Path, relativeTree: dict[str, set[str]]) -> dict[Path, set[Path]]:
+    """
+    Convert a relative tree to a tree of Path objects, i.e. to print it with hashfileUtils.printDifferencesBetweenTrees
+    
+    Parameters
+    ----------
+    rootFolder: Path
+        The root folder of the relative tree
+    relativeTree: dict[str, set[str]]
+        A dict of relative folders, each folder bound to the set of names of the files it contains
+
+    Returns
+    -------
+    dict[Path, set[Path]]
+        A dict of folders, each folder bound to the set of files it contains
+    """
+    fileTree : dict[Path, set[Path]] = dict()
+    
+    relativeFolder : str
+    filenames : set[str]
+    for relativeFolder, filenames in relativeTree.items():
+        folder : Path = rootFolder.joinpath(relativeFolder)
+        fileTree[folder] = {folder.joinpath(filename) for filename in filenames}
+    
+    return fileTree
+
+
+def scanRelativeTree(rootFolder: Path, cacheFile: Path | None = None, workers: int = 1, ignoredFiles: set[str] | None = None) -> tuple[dict[str, set[str]], set[str], set[str], Exception | None]:
+    """
+    Scan the file tree in a root folder, listing each folder only once, using relative paths as keys
+    
+    Like scanTree, but folders and files are plain strings instead of Path objects, which are much cheaper to build, hash and compare:
+    the folders are relative to the root folder ("" is the root folder itself, "/" is the separator) and each folder is bound to the names of the files it contains.
+    Each folder is listed only once (see listFolder). With a cache file, only the folders changed since the previous scan are listed again.
+    With more workers, several folders are listed at the same time (at most one for each worker); the result is the same, with the folders sorted by their components.
+    The scan is timed as the "scan" stage of the statistics of this process (see statsUtils.measureStage).
+    The files bound to a folder are the files with an extension (matching "*.*"); symbolic links to folders are not followed.
+    Subfolders that can't be listed are skipped, like os.walk does.
+    
+    Parameters
+    ----------
+    rootFolder: Path
+        The root folder to scan 
+    cacheFile: Path | None
+        The persistent cache of the folder listings, None to list all the folders
+    workers: int
+        The number of folders listed at the same time by a pool of threads, to hide the latency of network file systems
+    ignoredFiles: set[str] | None
+        The set collecting the relative paths of the files without an extension, not bound to their folders; None to not collect them
+
+    Returns
+    -------
+    tuple[dict[str, set[str]], set[str], set[str], Exception | None]
+        A dict of relative folders, each folder bound to the set of names of the files it contains 
+        A first set of relative folders with missing hash file inside
+        A second set of relative paths of (existent) hash file
+        Exception | None: 
+            FileNotFoundError if the root folder is None or is not a valid directory 
+            OSError in case of error listing the root folder
+            ValueError if the number of workers is less than 1
+            sqlite3.Error in case of error opening the cache
+            None in case of success (no error happens)
+    """
+    logger: logging.Logger = logging.getLogger(__name__)
+    
+    fileTree: dict[str, set[str]] = dict()
+    missingHashFiles: set[str] = set()
+    existentHashFiles: set[str] = set()
+    error: Exception | None = None
+    
+    if rootFolder is None or not rootFolder.is_dir():
+        logger.error(f"folder doesn't exists:{rootFolder}")
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), rootFolder)
+        return fileTree, missingHashFiles, existentHashFiles, error
+    
+    if workers < 1:
+        error = ValueError("Expected at least one worker")
+        logger.error(f"Invalid number of workers {workers}: {error}")
+        return fileTree, missingHashFiles, existentHashFiles, error
+    
+    cache: sqlite3.Connection | None = None
+    if cacheFile is not None:
+        cache, error = openCache(cacheFile)
+        if error is not None:
+            return fileTree, missingHashFiles, existentHashFiles, error
+    
+    rootFolderName: str = str(rootFolder)
+    hashFileSuffixes: tuple[str, ...] = tuple(HASH_FILE_EXTENSIONS)
+    fileCounter: int = 0
+    scannedFolders: set[str] = set()
+    foldersToScan: list[str] = [""]
+    cacheLock: Lock = Lock()
+    # the folders being listed, at most one for each worker
+    pendingFolders: dict[Future[tuple[list[str], list[str], Exception | None]], str] = dict()
+    
+    logger.debug(f"scanning folder tree {rootFolder} with {workers} workers")
+    with measureStage("scan"), ThreadPoolExecutor(max_workers=workers) as executor:
+        while len(foldersToScan) > 0 or len(pendingFolders) > 0:
+            while len(foldersToScan) > 0 and len(pendingFolders) < workers:
+                relativeFolder: str = foldersToScan.pop()
+                folderName: str = path.join(rootFolderName, relativeFolder) if len(relativeFolder) > 0 else rootFolderName
+                pendingFolders[executor.submit(listFolder, folderName, cache, cacheLock)] = relativeFolder
+            
+            listedFolders: set[Future[tuple[list[str], list[str], Exception | None]]]
+            listedFolders, _ = wait(pendingFolders, return_when=FIRST_COMPLETED)
+            
+            listedFolder: Future[tuple[list[str], list[str], Exception | None]]
+            for listedFolder in listedFolders:
+                relativeFolder = pendingFolders.pop(listedFolder)
+                folderName = path.join(rootFolderName, relativeFolder) if len(relativeFolder) > 0 else rootFolderName
+                
+                files: list[str]
+                subfolders: list[str]
+                files, subfolders, error = listedFolder.result()
+                
+                if error is not None:
+                    if len(relativeFolder) == 0:
+                        break
+                    logger.warning(f"skipping folder {folderName}: {error}")
+                    error = None
+                    continue
+                
+                prefix: str = relativeFolder + "/" if len(relativeFolder) > 0 else ""
+                fileFound: set[str] = set()
+                hashFileFound: bool = False
+                
+                filename: str
+                for filename in files:
+                    if "." in filename:
+                        fileFound.add(filename)
+                    elif ignoredFiles is not None:
+                        ignoredFiles.add(prefix + filename)
+                    if filename.endswith(hashFileSuffixes):
+                        existentHashFiles.add(prefix + filename)
+                        hashFileFound = True
+                
+                subfolder: str
+                for subfolder in subfolders:
+                    foldersToScan.append(prefix + subfolder)
+                
+                scannedFolders.add(folderName)
+                fileTree[relativeFolder] = fileFound
+                fileCounter = fileCounter + len(fileFound)
+                if not hashFileFound:
+                    missingHashFiles.add(relativeFolder)
+            
+            if error is not None:
+                fileTree = dict()
+                missingHashFiles = set()
+                existentHashFiles = set()
+                logger.error(f"Error scanning folder tree {rootFolder}: {error}")
+                break
+    
+    # the folders are listed in the order they complete, sort them for a deterministic result
+    fileTree = {folder: fileTree[folder] for folder in sorted(fileTree, key=lambda folder: tuple(folder.split("/")))}
+    
+    if cache is not None:
+        if error is None:
+            pruneCachedFolders(cache, rootFolderName, scannedFolders)
+        cache.commit()
+        cache.close()
+    
+    logger.debug(f"Loaded {fileCounter} files from folder tree {rootFolder}, missing hash files {len(missingHashFiles)}, existent hash file {len(existentHashFiles)}")
+
+    return fileTree, missingHashFiles, existentHashFiles, error
+
+
+def iterSortedFileTree(rootFolder: Path) -> Iterator[str]:
+    """
+    Iterate the files in the tree of a root folder, sorted by the components of their relative path
+    
+    The folders are visited depth first, sorting the entries of each folder by name, so that the relative paths are yielded in the same order of hashfileUtils.relativePathKey.
+    Only the listings of the folders in the current branch are kept in memory.
+    Like loadFileTree, only the files with an extension (matching "*.*") are yielded, symbolic links to folders are not followed and subfolders that can't be listed are skipped.
+    
+    Parameters
+    ----------
+    rootFolder: Path
+        The root folder to scan 
+
+    Yields
+    ------
+    str:
+        The relative path of each file, with "/" as separator
+    
+    Raises
+    ------
+    OSError
+        in case of error listing the root folder
+    """
+    logger: logging.Logger = logging.getLogger(__name__)
+    
+    files: list[str]
+    subfolders: list[str]
+    error: Exception | None
+    files, subfolders, error = listFolder(str(rootFolder))
+    if error is not None:
+        raise error
+    
+    # each item of the stack is the relative path of a folder and its sorted entries, as (name, isFolder)
+    stack: list[tuple[str, Iterator[tuple[str, bool]]]] = [("", iter(sorted([(name, False) for name in files] + [(name, True) for name in subfolders])))]
+    
+    while len(stack) > 0:
+        prefix: str
+        entries: Iterator[tuple[str, bool]]
+        prefix, entries = stack[-1]
+        
+        entry: tuple[str, bool] | None = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        
+        name: str = entry[0]
+        isFolder: bool = entry[1]
+        relativePath: str = prefix + name
+        if not isFolder:
+            if "." in name:
+                yield relativePath
+            continue
+        
+        files, subfolders, error = listFolder(path.join(str(rootFolder), relativePath))
+        if error is not None:
+            logger.warning(f"skipping folder {relativePath}: {error}")
+            continue
+        stack.append((relativePath + "/", iter(sorted([(name, False) for name in files] + [(name, True) for name in subfolders]))))
+
+
+def sortFolders(fileTree: dict[Path, set[Path]]) -> list[Path]:
+    """
+    Sort the folders of a file tree, so that each folder is followed by all its subfolders
+    
+    The folders are sorted by their path components, so the subfolders of a folder are contiguous and the list can be sliced by prefix with a binary search (see sliceFileTree)
+    
+    Parameters
+    ----------
+    fileTree: dict[Path, set[Path]]
+        A dict of folders, each folder bound to a set of file it contains 
+
+    Returns
+    -------
+    list[Path]
+        The sorted list of folders in the file tree
+    """
+    return sorted(fileTree.keys(), key=lambda folder: folder.parts)
+
+
+def sliceFileTree(fileTree: dict[Path, set[Path]], sortedFolders: list[Path], rootFolder: Path) -> tuple[dict[Path, set[Path]], Exception | None]:
+    """
+    Extract from a file tree the sub-tree of a root folder
+    
+    The sub-tree is the same returned by loadFileTree(rootFolder), but it's computed in memory from a file tree already loaded, without listing the folders again.
+    
+    Parameters
+    ----------
+    fileTree: dict[Path, set[Path]]
+        A dict of folders, each folder bound to a set of file it contains 
+    sortedFolders: list[Path]
+        The folders of the file tree, as returned by sortFolders(fileTree)
+    rootFolder: Path
+        The root folder of the sub-tree to extract
+
+    Returns
+    -------
+    tuple[dict[Path, set[Path]], Exception | None]
+        A dict of the root folder and its subfolders, each folder bound to a set of file it contains 
+        Exception | None: 
+            ValueError if the file tree, the sorted folders or the root folder are None
+            FileNotFoundError if the root folder is not in the file tree
+            None in case of success (no error happens)
+    """
+    logger: logging.Logger = logging.getLogger(__name__)
+    
+    subTree : dict[Path, set[Path]] = dict()
+    error: Exception | None = None
+    
+    if fileTree is None or sortedFolders is None or rootFolder is None:
+        error = ValueError("file tree, sorted folders and root folder are required")
+        logger.error(f"Expected a file tree to slice: {error}")
+        return subTree, error
+    
+    if rootFolder not in fileTree:
+        logger.error(f"folder doesn't exists in the file tree:{rootFolder}")
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), rootFolder)
+        return subTree, error
+    
+    rootParts: tuple[str, ...] = rootFolder.parts
+    depth: int = len(rootParts)
+    
+    index: int = bisect_left(sortedFolders, rootParts, key=lambda folder: folder.parts)
+    while index < len(sortedFolders) and sortedFolders[index].parts[:depth] == rootParts:
+        subTree[sortedFolders[index]] = fileTree[sortedFolders[index]]
+        index = index + 1
+    
+    logger.debug(f"sliced {len(subTree)} folders from the file tree of {rootFolder}")
+    
+    return subTree, error
+
+
+def sliceRelativeTree(fileTree: dict[str, set[str]], sortedFolders: list[str], rootFolder: str) -> tuple[dict[str, set[str]], Exception | None]:
+    """
+    Extract from a relative file tree the sub-tree of a relative root folder
+    
+    Like sliceFileTree, but for the trees returned by scanRelativeTree: the folders of the sub-tree are relative to the root folder of the sub-tree, so the sub-tree is the same returned by scanRelativeTree for that folder.
+    
+    Parameters
+    ----------
+    fileTree: dict[str, set[str]]
+        A dict of relative folders, each folder bound to the set of names of the files it contains 
+    sortedFolders: list[str]
+        The folders of the file tree, sorted by their components (see hashfileUtils.relativePathKey)
+    rootFolder: str
+        The relative root folder of the sub-tree to extract, "" for the whole tree
+
+    Returns
+    -------
+    tuple[dict[str, set[str]], Exception | None]
+        A dict of the relative root folder and its subfolders, each folder bound to the set of names of the files it contains 
+        Exception | None: 
+            ValueError if the file tree, the sorted folders or the root folder are None
+            FileNotFoundError if the root folder is not in the file tree
+            None in case of success (no error happens)
+    """
+    logger: logging.Logger = logging.getLogger(__name__)
+    
+    subTree : dict[str, set[str]] = dict()
+    error: Exception | None = None
+    
+    if fileTree is None or sortedFolders is None or rootFolder is None:
+        error = ValueError("file tree, sorted folders and root folder are required")
+        logger.error(f"Expected a file tree to slice: {error}")
+        return subTree, error
+    
+    if rootFolder not in fileTree:
+        logger.error(f"folder doesn't exists in the file tree:{rootFolder}")
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), rootFolder)
+        return subTree, error
+    
+    if len(rootFolder) == 0:
+        return fileTree, error
+    
+    prefix: str = rootFolder + "/"
+    rootParts: tuple[str, ...] = tuple(rootFolder.split("/"))
+    
+    index: int = bisect_left(sortedFolders, rootParts, key=lambda folder: tuple(folder.split("/")))
+    while index < len(sortedFolders) and (sortedFolders[index] == rootFolder or sortedFolders[index].startswith(prefix)):
+        folder: str = sortedFolders[index]
+        subTree[folder[len(prefix):] if folder != rootFolder else ""] = fileTree[folder]
+        index = index + 1
+    
+    logger.debug(f"sliced {len(subTree)} folders from the file tree of {rootFolder}")
+    
+    return subTree, error
+
+
+def groupSubtreeFiles(fileTree: dict[str, set[str]], folders: set[str]) -> dict[str, list[str]]:
+    """
+    Group the files of a relative file tree by the folders whose sub-tree contains them
+    
+    Each folder is bound to the relative paths of all the files in its sub-tree, like the rows of an hash file of the folder, checked against the whole sub-tree of its folder.
+    Each file is bound to each of its parent folders in the given folders, walking up its folder, so the tree is read once.
+    
+    Parameters
+    ----------
+    fileTree: dict[str, set[str]]
+        A dict of relative folders, each folder bound to the set of names of the files it contains (see scanRelativeTree)
+    folders: set[str]
+        The relative folders to group the files by, "" for the root folder
+
+    Returns
+    -------
+    dict[str, list[str]]
+        Each folder bound to the relative paths of the files in its sub-tree, sorted by their components
+    """
+    
+    groups: dict[str, list[str]] = {folder: [] for folder in folders}
+    
+    folder: str
+    names: set[str]
+    for folder, names in fileTree.items():
+        parent: str | None = folder
+        while parent is not None:
+            if parent in groups:
+                relativeFolder: str = folder[len(parent) + 1:] if len(parent) > 0 else folder
+                prefix: str = relativeFolder + "/" if len(relativeFolder) > 0 else ""
+                groups[parent].extend(prefix + name for name in names)
+            parent = parent.rpartition("/")[0] if len(parent) > 0 else None
+    
+    filepaths: list[str]
+    for filepaths in groups.values():
+        filepaths.sort(key=lambda filepath: tuple(filepath.split("/")))
+    
+    return groups
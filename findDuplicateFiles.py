@@ -0,0 +1,95 @@
+from argparse import ArgumentParser
+from pathlib import Path
+import sys
+from config import initLogger
+from statsUtils import startInstrumentation
+import logging
+from fileUtils import searchHashFiles
+from duplicateUtils import findDuplicateFiles, measureDuplicateFiles, printDuplicateFiles
+
+if __name__ == "__main__":
+    """
+    Print the files with the same content in the folder and its subfolders, with the bytes wasted by the copies.
+
+    The contents are compared by the digests of the hash files found in the folder and its subfolders, so the files aren't read;
+    the files not listed in an hash file aren't compared.
+    """
+    arg_parser = ArgumentParser(prog='findDuplicateFiles', allow_abbrev=False, description="find the duplicated files listed in the hash files of a directory and its sub-directories")
+    arg_parser.add_argument(
+            "-f",               # short parameter name
+            "--folder",         # long parameter name
+            type=Path,          # argument type
+            required=True,
+            action="store",     # store the value in memory
+            metavar='folder',   # displayed name (in help messages)
+            help="Option to select the folder where to search the hash files."
+        )
+    arg_parser.add_argument(
+            "--cache",          # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='cache',    # displayed name (in help messages)
+            help="Option to select a cache file, so that only the folders changed since the previous run are listed again."
+        )
+    arg_parser.add_argument(
+            "--scan-workers",   # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of folders listed at the same time, useful on network file systems."
+        )
+    arg_parser.add_argument(
+            "--stats",          # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to print on the standard error the wall and CPU time of each stage, the folders and the files listed per second, the bytes hashed and the peak memory."
+        )
+    arg_parser.add_argument(
+            "--profile",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='profile',  # displayed name (in help messages)
+            help="Option to profile the main thread with cProfile, dumping the statistics in a file readable by the pstats module."
+        )
+    arg_parser.add_argument(
+            "--metrics",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='metrics',  # displayed name (in help messages)
+            help="Option to write the statistics of the run, as with --stats, in a JSON file."
+        )
+    parsed_args = arg_parser.parse_args()
+
+    initLogger()
+
+    startInstrumentation(Path(__file__).stem, parsed_args.stats, parsed_args.profile, parsed_args.metrics)
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    missingHashFiles : set[Path]
+    existentHashFiles : set[Path]
+    error : Exception | None
+    missingHashFiles, existentHashFiles, error = searchHashFiles(parsed_args.folder, parsed_args.cache, parsed_args.scan_workers)
+
+    if error is not None:
+        sys.exit(1)
+
+    logger.debug(f"found hash files: {len(existentHashFiles)}, folders without hash files: {len(missingHashFiles)}")
+
+    duplicates : dict[str, list[Path]]
+    duplicates, error = findDuplicateFiles(sorted(existentHashFiles))
+
+    printDuplicateFiles(measureDuplicateFiles(duplicates))
+
+    if error is not None:
+        logger.error(f"Error reading the hash files, their files aren't compared: {error}")
+        sys.exit(1)
@@ -0,0 +1,10 @@
+#!/bin/bash
+
+# PYTHONDONTWRITEBYTECODE=1 -> don't create the folder __pycache__ running python3
+# mypy --cache-dir=/dev/null -> don't create the folder __mypy_cache__ running mypy
+
+FOLDER_TO_CHECK="$HOME/SyncV2/AllDevices/Foto/"
+
+echo "duplicated files: "
+
+docker run -it --rm --name findDuplicateFiles -v "$PWD":/usr/src/myapp -v "$FOLDER_TO_CHECK":"$FOLDER_TO_CHECK" -e PYTHONDONTWRITEBYTECODE=1 -w /usr/src/myapp python:3.10-slim /bin/bash -c "python /usr/src/myapp/findDuplicateFiles.py --folder $FOLDER_TO_CHECK"
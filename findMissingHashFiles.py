@@ -1,9 +1,13 @@
 from argparse import ArgumentParser
 from pathlib import Path
 import sys
+import os
 from config import initLogger
+from statsUtils import startInstrumentation
+from throttleUtils import setThrottle, parseByteSize
 import logging
-from fileUtils import searchHashFiles
+from fileUtils import searchHashFiles, scanRelativeTree, groupSubtreeFiles
+from digestUtils import generateHashFiles, HASH_ALGORITHMS
 
 if __name__ == "__main__":
     """
@@ -12,9 +16,10 @@ if __name__ == "__main__":
     Starting from the folder path, recursively iterating in the directories and subdirectories, it will create a first set of folders with missing hash file inside and a second set of existent hash files.
     
     The printed items depends from the command line options chosen:
-    With the --show-missing option, it will print a list of folders with a missing hash file (*.md5, *.sha) inside.
+    With the --show-missing option, it will print a list of folders with a missing hash file (*.md5, *.sha1, *.sha256, *.b2, ...) inside.
     With the --show files option, it will print a list of existent hash file.
     Without --show-missing option and with --show none option, it will print nothing.
+    With the --generate option, it will write an hash file in each folder with a missing hash file and print the hash files written.
     """
     arg_parser = ArgumentParser(prog='findMissingHashFiles', allow_abbrev=False, description="find hash files in the current directory and each sub-directories")
     arg_parser.add_argument(
@@ -44,23 +49,190 @@ if __name__ == "__main__":
             action="store",     # store the value in memory
             help="Option to show the files, the folder or none of them."
         )
+    arg_parser.add_argument(
+            "--cache",          # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='cache',    # displayed name (in help messages)
+            help="Option to select a cache file, so that only the folders changed since the previous run are listed again."
+        )
+    arg_parser.add_argument(
+            "--scan-workers",   # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of folders listed at the same time, useful on network file systems."
+        )
+    arg_parser.add_argument(
+            "-g",               # short parameter name
+            "--generate",       # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to write an hash file, with the hash of the files in the folder, in each folder with a missing hash file."
+        )
+    arg_parser.add_argument(
+            "-w",               # short parameter name
+            "--workers",        # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=os.cpu_count() or 1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of workers hashing the files."
+        )
+    arg_parser.add_argument(
+            "-p",               # short parameter name
+            "--pool",           # long parameter name
+            required=False,
+            default='thread',
+            choices=['thread', 'process'],
+            action="store",     # store the value in memory
+            help="Option to hash the files in a pool of threads or in a pool of processes."
+        )
+    arg_parser.add_argument(
+            "-a",               # short parameter name
+            "--algorithm",      # long parameter name
+            required=False,
+            default='md5',
+            choices=HASH_ALGORITHMS,
+            action="store",     # store the value in memory
+            help="Option to select the hash algorithm of the generated hash files, blake2b is usually faster than md5 and sha256."
+        )
+    arg_parser.add_argument(
+            "--max-bytes-per-second",   # long parameter name
+            type=parseByteSize, # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='bytes',    # displayed name (in help messages)
+            help="Option to limit the bytes read per second, with an optional suffix K, M, G (for example 50M), 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-files-per-second",   # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='files',    # displayed name (in help messages)
+            help="Option to limit the files opened and the folders listed per second, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-open-files", # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='files',    # displayed name (in help messages)
+            help="Option to limit the files open and the folders listed at the same time, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--max-latency",    # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=0,
+            action="store",     # store the value in memory
+            metavar='ms',       # displayed name (in help messages)
+            help="Option to slow down the reads when their latency, in milliseconds, is over this limit, 0 for no limit."
+        )
+    arg_parser.add_argument(
+            "--stats",          # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to print on the standard error the wall and CPU time of each stage, the folders and the files listed per second, the bytes hashed and the peak memory."
+        )
+    arg_parser.add_argument(
+            "--profile",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='profile',  # displayed name (in help messages)
+            help="Option to profile the main thread with cProfile, dumping the statistics in a file readable by the pstats module."
+        )
+    arg_parser.add_argument(
+            "--metrics",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='metrics',  # displayed name (in help messages)
+            help="Option to write the statistics of the run, as with --stats, in a JSON file."
+        )
     parsed_args = arg_parser.parse_args()
     
     initLogger()
     
+    startInstrumentation(Path(__file__).stem, parsed_args.stats, parsed_args.profile, parsed_args.metrics)
+    
+    try:
+        setThrottle(parsed_args.max_bytes_per_second, parsed_args.max_files_per_second, parsed_args.max_open_files, parsed_args.max_latency / 1000)
+    except ValueError as ex:
+        arg_parser.error(f"invalid throttling limits: {ex}")
+    
     logger : logging.Logger = logging.getLogger(__name__)
     
     logger.info(f"searching file in folder {parsed_args.folder}")
     
+    error : Exception | None
+    filename : Path
+    
+    if parsed_args.generate:
+        # the files of each folder without an hash file are hashed in a single pass
+        fileTree: dict[str, set[str]]
+        missingRelativeFolders: set[str]
+        existentRelativeHashFiles: set[str]
+        ignoredFiles: set[str] = set()
+        fileTree, missingRelativeFolders, existentRelativeHashFiles, error = scanRelativeTree(parsed_args.folder, parsed_args.cache, parsed_args.scan_workers, ignoredFiles)
+        
+        if error is not None:
+            sys.exit(1)
+        
+        # an hash file is checked against the whole sub-tree of its folder, so it lists the files of the subfolders too;
+        # folders without files in their sub-tree don't get an empty hash file
+        subtreeFiles : dict[str, list[str]] = groupSubtreeFiles(fileTree, missingRelativeFolders)
+        foldersToHash : dict[Path, list[str]] = {parsed_args.folder.joinpath(relativeFolder): subtreeFiles[relativeFolder] for relativeFolder in sorted(missingRelativeFolders) if len(subtreeFiles[relativeFolder]) > 0}
+        
+        # the files without an extension aren't checked (see fileUtils.scanRelativeTree), so they aren't listed in the hash files
+        ignoredFile : str
+        for ignoredFile in sorted(ignoredFiles):
+            parentFolder : str | None = ignoredFile.rpartition("/")[0]
+            while parentFolder is not None and parentFolder not in missingRelativeFolders:
+                parentFolder = parentFolder.rpartition("/")[0] if len(parentFolder) > 0 else None
+            if parentFolder is not None:
+                logger.warning(f"file without an extension not listed in the hash files: {parsed_args.folder.joinpath(ignoredFile)}")
+        
+        logger.debug(f"generating hash files in {len(foldersToHash)} folders")
+        
+        writtenHashFiles : set[Path]
+        failedFolders : set[Path]
+        writtenHashFiles, failedFolders, error = generateHashFiles(foldersToHash, parsed_args.workers, parsed_args.pool == 'process', parsed_args.cache, parsed_args.algorithm)
+        
+        if error is not None:
+            logger.error(f"Error generating the hash files: {error}")
+            sys.exit(1)
+        
+        for filename in sorted(writtenHashFiles):
+            print(f"{filename}")
+        
+        if len(failedFolders) > 0:
+            logger.error(f"hash files not written in {len(failedFolders)} folders")
+            sys.exit(1)
+        
+        sys.exit(0)
+    
     missingHashFiles: set[Path]
     existentHashFiles: set[Path]
-    error : Exception | None
-    missingHashFiles, existentHashFiles, error = searchHashFiles(parsed_args.folder)
+    missingHashFiles, existentHashFiles, error = searchHashFiles(parsed_args.folder, parsed_args.cache, parsed_args.scan_workers)
     
     if error is not None:
         sys.exit(1)
     
-    filename : Path
     if parsed_args.show_missing:
         logger.debug(f"found missing hash files: {len(missingHashFiles)}")
         for filename in missingHashFiles:
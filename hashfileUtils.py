@@ -1,9 +1,42 @@
 from config import initLogger
 from pathlib import Path
-from os import strerror
+from os import strerror, fsdecode, fsencode, fsync, replace, remove
+from shutil import copymode
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, TypeVar
+from contextlib import ExitStack
+from tempfile import TemporaryFile
+from fileUtils import iterSortedFileTree, HASH_FILE_EXTENSIONS
+from statsUtils import measureStage, addCounter
 import errno
+import heapq
+import re
 import logging
 
+# size of the blocks read from the hash file
+HASH_FILE_BUFFER_SIZE : int = 1024 * 1024
+
+# number of file paths sorted in memory at once by iterSortedHashFile, before spilling them to a temporary file
+SORT_RUN_SIZE : int = 1000000
+
+# side of an item merged from two sorted streams (see mergeSortedStreams)
+ONLY_IN_FIRST : int = -1
+IN_BOTH : int = 0
+ONLY_IN_SECOND : int = 1
+
+T = TypeVar("T")
+
+# a BSD-style row of an hash file: ALG (path) = hash
+BSD_ROW_PATTERN : re.Pattern[bytes] = re.compile(rb"([A-Za-z0-9-]+) \((.*)\) = ([0-9A-Fa-f]+)")
+
+# tags of the BSD-style rows, each one bound to the name of its hash algorithm
+BSD_ROW_TAGS : dict[str, str] = {"MD5": "md5", "SHA1": "sha1", "SHA256": "sha256", "SHA512": "sha512", "BLAKE2B": "blake2b", "BLAKE2B-512": "blake2b", "XXH64": "xxh64", "XXH128": "xxh128"}
+
+# size of the hexadecimal digests, each one bound to the name of the hash algorithm producing it
+DIGEST_SIZES : dict[int, str] = {32: "md5", 40: "sha1", 64: "sha256"}
+
+# size of the hexadecimal digests produced by more hash algorithms (sha512 and blake2b), that can't be detected by the size
+AMBIGUOUS_DIGEST_SIZES : set[int] = {128}
+
 def loadHashFile(filename: Path) -> tuple[dict[str, str], Exception | None]:
     """
     Load the hash file
@@ -52,28 +85,239 @@ def loadHashFile(filename: Path) -> tuple[dict[str, str], Exception | None]:
         logger.error(f"file doesn't exists: {filename}")
         return fileAndHashes, error
     
-    lines : list[str] = []
-    
     try:
         logger.debug(f"loading file {filename}")
-        with open(filename) as f:
-            lines = f.readlines()
+        filepath : str
+        hash : str
+        with measureStage("parse"):
+            for filepath, hash in iterHashFile(filename):
+                fileAndHashes[filepath] = hash
     except OSError as ex:
         error = ex
+        fileAndHashes = {}
         logger.exception(f"Error loading file {filename}: {error}")
 
-    HASH : int = 0
-    FILENAME : int = 1
-
-    logger.debug(f"lines read: {len(lines)}")
-    line : str
-    for line in lines:
-        lineParts :list[str] = line.replace("\r", "").replace("\n", "").split('  ')
-        fileAndHashes[lineParts[FILENAME]] = lineParts[HASH]
+    logger.debug(f"rows read: {len(fileAndHashes)}")
 
     return fileAndHashes, error
 
 
+def iterHashFile(filename: Path) -> Iterator[tuple[str, str]]:
+    """
+    Iterate the rows of the hash file
+    
+    The hash file is read in binary mode, in large blocks, and each row is yielded as soon as it's read, so the memory used doesn't depend on the size of the hash file.
+    A row has a hash, a double space separator and a relative file path, or the BSD format with the tag of the algorithm (see parseHashFileRow); empty rows and invalid rows are skipped.
+    The file path is decoded like the file names returned by the operating system (os.fsdecode).
+    The hash files and their bytes read to the end are counted in the statistics of this process (see statsUtils.addCounter).
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to read
+
+    Yields
+    ------
+    tuple[str, str]:
+        The relative file path and its hash
+    
+    Raises
+    ------
+    OSError
+        in case of IO error reading the file
+    """
+    
+    logger : logging.Logger = logging.getLogger(__name__)
+    
+    line : bytes
+    with open(filename, "rb", buffering=HASH_FILE_BUFFER_SIZE) as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            row : tuple[str, str, str] | None = parseHashFileRow(line)
+            if row is None:
+                if len(line) > 0:
+                    logger.warning(f"skipping invalid row in {filename}: {line!r}")
+                continue
+            yield row[0], row[1]
+        addCounter("hash_files_read")
+        addCounter("hash_file_bytes", f.tell())
+
+
+def parseHashFileRow(line: bytes) -> tuple[str, str, str] | None:
+    """
+    Parse a row of an hash file
+    
+    A row can have the format of md5sum and of the other GNU tools (a hash, a double space separator and a relative file path)
+    or the BSD format of the same tools with the --tag option (the name of the algorithm, the relative file path in parenthesis, an equal and a hash).
+    
+    Parameters
+    ----------
+    line : bytes
+        The row, without the line terminator
+    
+    Returns
+    -------
+    tuple[str, str, str] | None
+        The relative file path, its hash and the tag of the algorithm (an empty string in the GNU format), None if the row is invalid
+    """
+    
+    # the first bytes of a GNU row are hexadecimal digits, so the BSD pattern is matched only when they can be a tag
+    if b" (" in line[:16]:
+        match : re.Match[bytes] | None = BSD_ROW_PATTERN.fullmatch(line)
+        if match is not None:
+            return fsdecode(match.group(2)), match.group(3).decode("ascii"), match.group(1).decode("ascii")
+    
+    hash : bytes
+    separator : bytes
+    filepath : bytes
+    hash, separator, filepath = line.partition(b"  ")
+    if len(separator) == 0:
+        return None
+    return fsdecode(filepath), hash.decode("ascii", "replace"), ""
+
+
+def hashFileAlgorithm(filename: Path) -> tuple[str, Exception | None]:
+    """
+    Detect the hash algorithm of an hash file
+    
+    The algorithm is chosen by the extension of the hash file (see fileUtils.HASH_FILE_EXTENSIONS);
+    with an unknown extension, by the tag of the first row in the BSD format or by the size of its hash.
+    A hash of 128 hexadecimal digits can be both sha512 and blake2b, so it's an error instead of a guess.
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file
+    
+    Returns
+    -------
+    tuple[str, Exception | None]
+        The name of the hash algorithm, md5 if it can't be detected
+        Exception | None :
+            OSError in case of IO error reading the file
+            ValueError if the size of the hash matches more algorithms
+            None in case of success (no error happens)
+    """
+    
+    logger : logging.Logger = logging.getLogger(__name__)
+    
+    algorithm : str | None = HASH_FILE_EXTENSIONS.get(filename.suffix.lower())
+    if algorithm is not None:
+        return algorithm, None
+    
+    try:
+        line : bytes
+        with open(filename, "rb") as f:
+            for line in f:
+                row : tuple[str, str, str] | None = parseHashFileRow(line.rstrip(b"\r\n"))
+                if row is None:
+                    continue
+                if len(row[2]) == 0 and len(row[1]) in AMBIGUOUS_DIGEST_SIZES:
+                    error : Exception = ValueError(f"can't detect the algorithm of hash file {filename}: a hash of {len(row[1])} digits can be sha512 or blake2b, rename it with the extension .sha512 or .b2")
+                    logger.error(f"{error}")
+                    return "md5", error
+                algorithm = BSD_ROW_TAGS.get(row[2].upper()) if len(row[2]) > 0 else DIGEST_SIZES.get(len(row[1]))
+                break
+    except OSError as ex:
+        logger.error(f"Error reading file {filename}: {ex}")
+        return "md5", ex
+    
+    logger.debug(f"detected algorithm {algorithm} of hash file {filename}")
+    return algorithm if algorithm is not None else "md5", None
+
+
+def writeHashFile(filename: Path, rows: Iterable[tuple[str, str]]) -> Exception | None:
+    """
+    Write the rows of an hash file
+    
+    Each row has a hash, a double space separator and a relative file path, like the rows read by iterHashFile (see formatHashFileRow), written by writeHashFileLines.
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to write
+    rows : Iterable[tuple[str, str]]
+        The relative file paths and their hashes
+    
+    Returns
+    -------
+    Exception | None :
+        OSError in case of IO error writing the file
+        UnicodeEncodeError if a hash isn't made of ASCII characters
+        None in case of success (no error happens)
+    """
+    
+    filepath : str
+    hash : str
+    return writeHashFileLines(filename, (formatHashFileRow(filepath, hash) for filepath, hash in rows))
+
+
+def formatHashFileRow(filepath: str, hash: str, tag: str = "") -> bytes:
+    """
+    Format a row of an hash file, with its line terminator
+    
+    The row has the format of md5sum (a hash, a double space separator and a relative file path), or the BSD format if the tag of the algorithm is given (see parseHashFileRow);
+    the file path is encoded like the file names of the operating system (os.fsencode).
+    
+    Raises
+    ------
+    UnicodeEncodeError
+        if the hash or the tag aren't made of ASCII characters
+    """
+    
+    if len(tag) > 0:
+        return tag.encode("ascii") + b" (" + fsencode(filepath) + b") = " + hash.encode("ascii") + b"\n"
+    return hash.encode("ascii") + b"  " + fsencode(filepath) + b"\n"
+
+
+def writeHashFileLines(filename: Path, lines: Iterable[bytes]) -> Exception | None:
+    """
+    Write the lines of an hash file, as they are
+    
+    The lines are written in a temporary file in the same folder, renamed to the hash file only when complete, so a reader never sees a partially written hash file.
+    The temporary file is synced to the disk before the rename, so a crash can't leave an empty hash file in place of the previous one, and it gets the permissions of the previous hash file.
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to write
+    lines : Iterable[bytes]
+        The lines of the hash file, each one with its line terminator
+    
+    Returns
+    -------
+    Exception | None :
+        OSError in case of IO error writing the file
+        UnicodeEncodeError in case of error encoding a line (see formatHashFileRow), the hash file is left as it is
+        None in case of success (no error happens)
+    """
+    
+    logger : logging.Logger = logging.getLogger(__name__)
+    
+    error : Exception | None = None
+    temporaryFile : Path = filename.with_name(f".{filename.name}.tmp")
+    
+    try:
+        with open(temporaryFile, "wb", buffering=HASH_FILE_BUFFER_SIZE) as f:
+            line : bytes
+            for line in lines:
+                f.write(line)
+            f.flush()
+            fsync(f.fileno())
+        if filename.exists():
+            copymode(filename, temporaryFile)
+        replace(temporaryFile, filename)
+    except (OSError, UnicodeEncodeError) as ex:
+        error = ex
+        logger.exception(f"Error writing file {filename}: {error}")
+        try:
+            remove(temporaryFile)
+        except OSError:
+            pass
+    
+    return error
+
+
 def splitHashFileItemsByFolder(filename: Path) -> tuple[dict[Path, set[Path]], Exception | None]:
     """
     Split all the items inside the hash file by folder
@@ -113,41 +357,89 @@ def splitHashFileItemsByFolder(filename: Path) -> tuple[dict[Path, set[Path]], E
         logger.error(f"filename doesn't exists: {error}")
         return mapOfFileByFolder, error
 
-    fileAndHashes: dict[str, str]
-    fileAndHashes, error = loadHashFile(filename)
+    rootFolder : Path = filename.parent
+    fileCounter : int = 0
     
-    if error is not None:
+    try:
+        logger.debug(f"loading file {filename}")
+        filepath : str
+        hash: str
+        with measureStage("parse"):
+            for filepath, hash in iterHashFile(filename):
+                fullPath : Path = rootFolder.joinpath(filepath)
+            
+                # creating a map with a set of file, like the following:
+                #   folder1 -> { filenameA, filenameB }
+                #   folder3 -> { filename1, filename2, filename3 }
+                mapOfFileByFolder.setdefault(fullPath.parent, set()).add(fullPath)
+                fileCounter = fileCounter + 1
+    except OSError as ex:
+        error = ex
+        mapOfFileByFolder = dict()
         logger.exception(f"error loading hashfile:{error}")
+    
+    logger.debug (f"Filenames in hash file: {fileCounter}")
+
+    return mapOfFileByFolder, error
+
+
+def splitHashFileRowsByFolder(filename: Path) -> tuple[dict[str, set[str]], Exception | None]:
+    """
+    Split all the items inside the hash file by relative folder
+    
+    Like splitHashFileItemsByFolder, but folders and files are plain strings instead of Path objects, like in the trees returned by fileUtils.scanRelativeTree:
+    the folders are relative to the folder of the hash file ("" is the folder itself) and each folder is bound to the names of the files listed in the hash file.
+    
+    dict: {
+      ""->{file1, file2}
+      "folder1"->{file3, file4}
+      "folder1/folder2"->{file5}
+    }
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to load
+
+    Returns
+    -------
+    tuple[dict[str, set[str]], Exception | None]
+        A dict of relative folders, each folder bound to the set of names of the files it contains
+        Exception | None :
+            FileNotFoundError if the filename is None or is not a valid file
+            OSError in case of IO error loading the file
+            None in case of success (no error happens)
+    """
+    
+    mapOfFileByFolder: dict[str, set[str]] = dict()
+    error : Exception | None = None
+    
+    logger : logging.Logger = logging.getLogger(__name__)
+    
+    if filename is None or not filename.is_file():
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), filename)
+        logger.error(f"filename doesn't exists: {error}")
         return mapOfFileByFolder, error
     
-    rootFolder : Path = filename.parent
+    fileCounter : int = 0
     
-    if len(fileAndHashes) > 0:
-        logger.debug (f"Filenames in hash file: {len(fileAndHashes)}")
-        
+    try:
+        logger.debug(f"loading file {filename}")
         filepath : str
         hash: str
-        for filepath, hash in fileAndHashes.items():
-            fullPath : Path = rootFolder.joinpath(filepath)
-            folder : Path = fullPath.parent
-            
-            # creating a map with a set of file, like the following:
-            #   folder1 -> { filenameA, filenameB }
-            #   folder3 -> { filename1, filename2, filename3 }
-            
-            # if the set of file exists, get the set
-            # otherwise create a new set of files
-            setOfFiles : set[Path]
-            if folder in mapOfFileByFolder:
-                setOfFiles = mapOfFileByFolder[folder]
-            else:
-                setOfFiles = set()
-            
-            # add the filename to the set
-            setOfFiles.add(fullPath)
-            
-            # add the new set to the map
-            mapOfFileByFolder[folder] = setOfFiles
+        with measureStage("parse"):
+            for filepath, hash in iterHashFile(filename):
+                folder : str
+                name : str
+                folder, separator, name = normalizeRelativePath(filepath).rpartition("/")
+                mapOfFileByFolder.setdefault(folder, set()).add(name)
+                fileCounter = fileCounter + 1
+    except OSError as ex:
+        error = ex
+        mapOfFileByFolder = dict()
+        logger.exception(f"error loading hashfile:{error}")
+    
+    logger.debug (f"Filenames in hash file: {fileCounter}")
 
     return mapOfFileByFolder, error
 
@@ -193,46 +485,513 @@ def checkDifferencesBetweenTrees(mapOfFileByFolder: dict[Path, set[Path]], fileI
         logger.error(f"Expected to load a map of folders from a root folder: {error}")
         return missingInHashFileNotInDir, missingInDirNotInHashFile, error
 
-    # Common folders between the hash file and the root folder
-    commonPaths : set[Path] = set(fileInFolders.keys()).intersection(set(mapOfFileByFolder.keys()))
+    # the records of each folder are formatted only when the debug level is enabled
+    debugEnabled : bool = logger.isEnabledFor(logging.DEBUG)
+
+    with measureStage("diff"):
+        # Common folders between the hash file and the root folder
+        commonPaths : set[Path] = fileInFolders.keys() & mapOfFileByFolder.keys()
     
-    logger.debug(f"common folders between the root folder and the hash file: {len(commonPaths)}")
+        logger.debug(f"common folders between the root folder and the hash file: {len(commonPaths)}")
 
-    folder: Path
-    for folder in commonPaths:
-        filesInHashFileSet : set[Path] = mapOfFileByFolder[folder]
-        fileInFolderSet : set[Path] = fileInFolders[folder];
+        folder: Path
+        for folder in commonPaths:
+            filesInHashFileSet : set[Path] = mapOfFileByFolder[folder]
+            fileInFolderSet : set[Path] = fileInFolders[folder]
         
-        filenameInHashFileNotInDirSet : set[Path] = filesInHashFileSet - fileInFolderSet
-        filenameInDirNotInHashFileSet : set[Path] = fileInFolderSet - filesInHashFileSet
+            filenameInHashFileNotInDirSet : set[Path] = filesInHashFileSet - fileInFolderSet
+            filenameInDirNotInHashFileSet : set[Path] = fileInFolderSet - filesInHashFileSet
 
-        logger.debug(f"Differences in common folder {folder}: {len(filenameInHashFileNotInDirSet)} items in hashfile - {len(filenameInDirNotInHashFileSet)} items in root folder")
+            if debugEnabled:
+                logger.debug(f"Differences in common folder {folder}: {len(filenameInHashFileNotInDirSet)} items in hashfile - {len(filenameInDirNotInHashFileSet)} items in root folder")
         
-        if len(filenameInHashFileNotInDirSet) > 0:
-            missingInHashFileNotInDir[folder] = filenameInHashFileNotInDirSet
+            if len(filenameInHashFileNotInDirSet) > 0:
+                missingInHashFileNotInDir[folder] = filenameInHashFileNotInDirSet
         
-        if len(filenameInDirNotInHashFileSet) > 0:
-            missingInDirNotInHashFile[folder] = filenameInDirNotInHashFileSet
+            if len(filenameInDirNotInHashFileSet) > 0:
+                missingInDirNotInHashFile[folder] = filenameInDirNotInHashFileSet
     
-    # folders missing only in the root directory, not in the hash file
-    foldersOnlyInHashFile = set(mapOfFileByFolder.keys()) - set(fileInFolders.keys())
-    logger.debug(f"not common folders missing only in the root directory, not in the hash file: {len(foldersOnlyInHashFile)}")
+        # folders missing only in the root directory, not in the hash file: their files are in the hash file and NOT in the root folder
+        foldersOnlyInHashFile : set[Path] = mapOfFileByFolder.keys() - fileInFolders.keys()
+        logger.debug(f"not common folders missing only in the root directory, not in the hash file: {len(foldersOnlyInHashFile)}")
     
-    for folder in foldersOnlyInHashFile:
-        logger.debug(f"OnlyInHashFile: {folder}")
-        missingInDirNotInHashFile[folder] = mapOfFileByFolder[folder]
+        for folder in foldersOnlyInHashFile:
+            if debugEnabled:
+                logger.debug(f"OnlyInHashFile: {folder}")
+            missingInHashFileNotInDir[folder] = mapOfFileByFolder[folder]
     
-    # folders missing only in the hash file, not in the root directory
-    foldersOnlyInRootDir = set(fileInFolders.keys()) - set(mapOfFileByFolder.keys())
-    logger.debug(f"not common folders missing only in the hash file, not in the root directory: {len(foldersOnlyInRootDir)}")
+        # folders missing only in the hash file, not in the root directory: their files are in the root folder and NOT in the hash file
+        foldersOnlyInRootDir : set[Path] = fileInFolders.keys() - mapOfFileByFolder.keys()
+        logger.debug(f"not common folders missing only in the hash file, not in the root directory: {len(foldersOnlyInRootDir)}")
     
-    for folder in foldersOnlyInRootDir:
-        logger.debug(f"OnlyInRootDir: {folder}")
-        missingInHashFileNotInDir[folder] = fileInFolders[folder]
+        for folder in foldersOnlyInRootDir:
+            if debugEnabled:
+                logger.debug(f"OnlyInRootDir: {folder}")
+            missingInDirNotInHashFile[folder] = fileInFolders[folder]
     
     return missingInHashFileNotInDir, missingInDirNotInHashFile, error
 
 
+def checkDifferencesBetweenRelativeTrees(mapOfFileByFolder: dict[str, set[str]], fileInFolders: dict[str, set[str]]) -> tuple[dict[str, set[str]], dict[str, set[str]], Exception | None]:
+    """
+    Check the differences between the two relative trees
+    
+    Like checkDifferencesBetweenTrees, with the same results, but for the relative trees returned by splitHashFileRowsByFolder and fileUtils.scanRelativeTree:
+    folders and file names are plain strings, so the differences are computed by set operations on strings, without building or hashing Path objects.
+    The results can be converted to Path objects for reporting by fileUtils.relativeTreeToPaths.
+    
+    Parameters
+    ----------
+    mapOfFileByFolder: dict[str, set[str]]
+        contains the names of all the file listed in the hash file, indexed by relative folder
+    fileInFolders: dict[str, set[str]]
+        contains the names of all the file listed in the root directory, indexed by relative folder
+
+    Returns
+    -------
+    tuple[dict[str, set[str]], dict[str, set[str]], Exception | None]
+        A first dict of relative folders with files in the hash file and NOT in the root folder
+        A second dict of relative folders with files in the root folder and NOT in the hash file
+        Exception | None : 
+            ValueError if the param mapOfFileByFolder is None or the param fileInFolders is None
+            None in case of success (no error happens)
+    """
+    logger : logging.Logger = logging.getLogger(__name__)
+    
+    missingInHashFileNotInDir : dict[str, set[str]] = dict()
+    missingInDirNotInHashFile : dict[str, set[str]] = dict()
+    error : Exception | None = None
+    
+    if mapOfFileByFolder is None:
+        error = ValueError("map of folders from the hash file has an illegal value")
+        logger.error(f"Expected to load a map of folders from the hash file: {error}.")
+        return missingInHashFileNotInDir, missingInDirNotInHashFile, error
+    
+    if fileInFolders is None:
+        error = ValueError("map of folders from a root folder has an illegal value")
+        logger.error(f"Expected to load a map of folders from a root folder: {error}")
+        return missingInHashFileNotInDir, missingInDirNotInHashFile, error
+    
+    with measureStage("diff"):
+        folder : str
+        filesInHashFileSet : set[str]
+        for folder, filesInHashFileSet in mapOfFileByFolder.items():
+            fileInFolderSet : set[str] | None = fileInFolders.get(folder)
+            if fileInFolderSet is None:
+                # folder missing only in the root directory, not in the hash file: its files are in the hash file and NOT in the root folder
+                missingInHashFileNotInDir[folder] = filesInHashFileSet
+                continue
+        
+            filenameInHashFileNotInDirSet : set[str] = filesInHashFileSet - fileInFolderSet
+            filenameInDirNotInHashFileSet : set[str] = fileInFolderSet - filesInHashFileSet
+        
+            if len(filenameInHashFileNotInDirSet) > 0:
+                missingInHashFileNotInDir[folder] = filenameInHashFileNotInDirSet
+        
+            if len(filenameInDirNotInHashFileSet) > 0:
+                missingInDirNotInHashFile[folder] = filenameInDirNotInHashFileSet
+    
+        filenamesInFolder : set[str]
+        for folder, filenamesInFolder in fileInFolders.items():
+            if folder not in mapOfFileByFolder:
+                # folder missing only in the hash file, not in the root directory: its files are in the root folder and NOT in the hash file
+                missingInDirNotInHashFile[folder] = filenamesInFolder
+    
+    logger.debug(f"folders with differences: {len(missingInHashFileNotInDir)} in hashfile - {len(missingInDirNotInHashFile)} in root folder")
+    
+    return missingInHashFileNotInDir, missingInDirNotInHashFile, error
+
+
+def checkHashFileRows(filename: Path, fileInFolders: dict[str, set[str]]) -> tuple[dict[str, set[str]], dict[str, set[str]], Exception | None]:
+    """
+    Check the differences between the rows of the hash file and the relative tree of its folder
+    
+    This function loads the hash file (see splitHashFileRowsByFolder) and compares it with the tree (see checkDifferencesBetweenRelativeTrees).
+    It doesn't use any state of the caller, so it can run in a pool of processes, one hash file for each task.
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to check
+    fileInFolders: dict[str, set[str]]
+        contains the names of all the file listed in the folder of the hash file, indexed by relative folder
+
+    Returns
+    -------
+    tuple[dict[str, set[str]], dict[str, set[str]], Exception | None]
+        A first dict of relative folders with files in the hash file and NOT in the root folder
+        A second dict of relative folders with files in the root folder and NOT in the hash file
+        Exception | None : 
+            FileNotFoundError if the filename is None or is not a valid file
+            OSError in case of IO error loading the file
+            ValueError if the param fileInFolders is None
+            None in case of success (no error happens)
+    """
+    mapOfFileByFolder : dict[str, set[str]]
+    error : Exception | None
+    mapOfFileByFolder, error = splitHashFileRowsByFolder(filename)
+    
+    if error is not None:
+        return dict(), dict(), error
+    
+    mapOfFileByFolder, fileInFolders = excludeHashFile(filename, mapOfFileByFolder, fileInFolders)
+    
+    return checkDifferencesBetweenRelativeTrees(mapOfFileByFolder, fileInFolders)
+
+
+def excludeHashFile(filename: Path, mapOfFileByFolder: dict[str, set[str]], fileInFolders: dict[str, set[str]]) -> tuple[dict[str, set[str]], dict[str, set[str]]]:
+    """
+    Exclude the hash file itself from the relative tree of the hash file and from the relative tree of its folder
+    
+    An hash file can't list its own digest, so it's not a difference if the hash file isn't listed by itself, or if it's listed (like the output of md5sum * > files.md5).
+    The trees aren't changed, the root folder of each tree is copied without the hash file, and left out if it has no other files.
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file
+    mapOfFileByFolder: dict[str, set[str]]
+        contains a map of relative folders of the hash file, each folder is bound to a set of folder's file (see splitHashFileRowsByFolder)
+    fileInFolders: dict[str, set[str]]
+        contains a map of relative folders of the folder of the hash file, each folder is bound to a set of folder's file (see loadRelativeFileTree)
+    
+    Returns
+    -------
+    tuple[dict[str, set[str]], dict[str, set[str]]]
+        The tree of the hash file and the tree of its folder, without the hash file
+    """
+    
+    tree : dict[str, set[str]]
+    excludedTrees : list[dict[str, set[str]]] = []
+    for tree in (mapOfFileByFolder, fileInFolders):
+        if filename.name in tree.get("", set()):
+            tree = dict(tree)
+            tree[""] = tree[""] - {filename.name}
+            # a root folder holding only the hash file isn't a folder with differences
+            if len(tree[""]) == 0:
+                del tree[""]
+        excludedTrees.append(tree)
+    
+    return excludedTrees[0], excludedTrees[1]
+
+
+def mergeSortedStreams(first: Iterable[T], second: Iterable[T], key: Callable[[T], Any]) -> Iterator[tuple[int, T]]:
+    """
+    Merge two sorted streams of items, marking each item as in the first stream only, in the second stream only or in both
+    
+    The streams are consumed in a single linear pass, one item at a time, so the memory used doesn't depend on the size of the streams.
+    Both streams must be sorted by the key and must not contain duplicated keys.
+    
+    first:  a, b,    d
+    second:    b, c, d
+    result: (ONLY_IN_FIRST, a), (IN_BOTH, b), (ONLY_IN_SECOND, c), (IN_BOTH, d)
+    
+    Parameters
+    ----------
+    first : Iterable[T]
+        The first sorted stream
+    second : Iterable[T]
+        The second sorted stream
+    key : Callable[[T], Any]
+        The key the streams are sorted by
+
+    Yields
+    ------
+    tuple[int, T]:
+        ONLY_IN_FIRST, IN_BOTH or ONLY_IN_SECOND and the item (from the first stream, for the items in both)
+    """
+    
+    firstIterator : Iterator[T] = iter(first)
+    secondIterator : Iterator[T] = iter(second)
+    
+    firstItem : T | None = next(firstIterator, None)
+    secondItem : T | None = next(secondIterator, None)
+    
+    while firstItem is not None and secondItem is not None:
+        firstKey : Any = key(firstItem)
+        secondKey : Any = key(secondItem)
+        if firstKey < secondKey:
+            yield ONLY_IN_FIRST, firstItem
+            firstItem = next(firstIterator, None)
+        elif secondKey < firstKey:
+            yield ONLY_IN_SECOND, secondItem
+            secondItem = next(secondIterator, None)
+        else:
+            yield IN_BOTH, firstItem
+            firstItem = next(firstIterator, None)
+            secondItem = next(secondIterator, None)
+    
+    while firstItem is not None:
+        yield ONLY_IN_FIRST, firstItem
+        firstItem = next(firstIterator, None)
+    
+    while secondItem is not None:
+        yield ONLY_IN_SECOND, secondItem
+        secondItem = next(secondIterator, None)
+
+
+def relativePathKey(filepath: str) -> tuple[str, ...]:
+    """
+    Return the sort key of a relative file path: its components, so that the files of a folder are sorted together
+    """
+    return tuple(filepath.split("/"))
+
+
+def normalizeRelativePath(filepath: str) -> str:
+    """
+    Normalize a relative file path of an hash file, removing the "." components and the duplicated separators, like pathlib does
+    """
+    return "/".join(part for part in filepath.split("/") if part != "" and part != ".")
+
+
+def iterSortedHashFile(filename: Path) -> Iterator[str]:
+    """
+    Iterate the relative file paths of the hash file, sorted by their components (see relativePathKey)
+    
+    A first pass over the hash file checks if the rows are already sorted: in this case the file paths are yielded by a second pass, one at a time, and the memory used doesn't depend on the size of the hash file.
+    Otherwise the file paths are sorted by an external merge sort: they are sorted in runs of SORT_RUN_SIZE paths, each run is written to a temporary file,
+    then the runs are merged (see heapq.merge), so at most SORT_RUN_SIZE paths are in memory. An hash file with less rows is sorted in memory, without temporary files.
+    Duplicated file paths are yielded once.
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to read
+
+    Yields
+    ------
+    str:
+        The normalized relative file path (see normalizeRelativePath)
+    
+    Raises
+    ------
+    OSError
+        in case of IO error reading the file or writing the temporary files
+    """
+    
+    logger : logging.Logger = logging.getLogger(__name__)
+    
+    isSorted : bool = True
+    previousKey : tuple[str, ...] | None = None
+    filepath : str
+    hash : str
+    for filepath, hash in iterHashFile(filename):
+        currentKey : tuple[str, ...] = relativePathKey(normalizeRelativePath(filepath))
+        if previousKey is not None and currentKey < previousKey:
+            isSorted = False
+            break
+        previousKey = currentKey
+    
+    with ExitStack() as runFiles:
+        filepaths : Iterable[str]
+        if isSorted:
+            filepaths = (normalizeRelativePath(filepath) for filepath, hash in iterHashFile(filename))
+        else:
+            runs : list[Iterable[str]] = []
+            run : set[str] = set()
+            for filepath, hash in iterHashFile(filename):
+                run.add(normalizeRelativePath(filepath))
+                if len(run) >= SORT_RUN_SIZE:
+                    runs.append(writeSortedRun(runFiles.enter_context(TemporaryFile()), run))
+                    run = set()
+            
+            if len(runs) == 0:
+                logger.warning(f"hash file {filename} isn't sorted, sorting it in memory")
+                filepaths = sorted(run, key=relativePathKey)
+            else:
+                if len(run) > 0:
+                    runs.append(writeSortedRun(runFiles.enter_context(TemporaryFile()), run))
+                logger.warning(f"hash file {filename} isn't sorted, sorting it in {len(runs)} runs of temporary files")
+                filepaths = heapq.merge(*runs, key=relativePathKey)
+        
+        previousPath : str | None = None
+        for filepath in filepaths:
+            if filepath != previousPath:
+                yield filepath
+            previousPath = filepath
+
+
+def writeSortedRun(runFile: BinaryIO, filepaths: set[str]) -> Iterator[str]:
+    """
+    Write a run of file paths, sorted, to a temporary file, and return an iterator reading them back one at a time
+    
+    Each file path is encoded like the file names of the operating system (os.fsencode) and terminated by a NUL byte, that can't be in a file path.
+    """
+    
+    filepath : str
+    for filepath in sorted(filepaths, key=relativePathKey):
+        runFile.write(fsencode(filepath) + b"\0")
+    runFile.seek(0)
+    
+    return iterSortedRun(runFile)
+
+
+def iterSortedRun(runFile: BinaryIO) -> Iterator[str]:
+    """
+    Iterate the file paths of a run written by writeSortedRun, reading the file in blocks
+    """
+    
+    pending : bytes = b""
+    while True:
+        block : bytes = runFile.read(HASH_FILE_BUFFER_SIZE)
+        if len(block) == 0:
+            break
+        records : list[bytes] = (pending + block).split(b"\0")
+        pending = records.pop()
+        record : bytes
+        for record in records:
+            yield fsdecode(record)
+
+
+def iterSortedDifferences(filename: Path) -> Iterator[tuple[int, str]]:
+    """
+    Iterate the differences between the hash file and the tree of its folder, using a sorted merge
+    
+    The relative file paths in the hash file (see iterSortedHashFile) and in the folder of the hash file (see fileUtils.iterSortedFileTree) are merged as two sorted streams,
+    so that the trees don't need to be loaded in memory, like checkDifferencesBetweenTrees does.
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to check
+
+    Yields
+    ------
+    tuple[int, str]:
+        ONLY_IN_FIRST for a file in the hash file and NOT in the root folder, ONLY_IN_SECOND for a file in the root folder and NOT in the hash file, and its relative file path
+    
+    Raises
+    ------
+    OSError
+        in case of IO error reading the hash file or listing the root folder
+    """
+    
+    side : int
+    filepath : str
+    for side, filepath in mergeSortedStreams(iterSortedHashFile(filename), iterSortedFileTree(filename.parent), relativePathKey):
+        # the hash file itself isn't a difference (see excludeHashFile)
+        if side != IN_BOTH and filepath != filename.name:
+            yield side, filepath
+
+
+def iterTreeDifferences(mapOfFileByFolder: dict[str, set[str]], fileInFolders: dict[str, set[str]]) -> Iterator[tuple[int, str]]:
+    """
+    Iterate the differences between the tree of the hash file and the tree of the root folder, like iterSortedDifferences, but from trees already in memory
+    
+    The differences are sorted by folder and by name, so that the report doesn't depend on the order of the sets.
+    
+    Parameters
+    ----------
+    mapOfFileByFolder: dict[str, set[str]]
+        contains a map of relative folders of the hash file, each folder is bound to a set of folder's file (see splitHashFileRowsByFolder)
+    fileInFolders: dict[str, set[str]]
+        contains a map of relative folders of the root folder, each folder is bound to a set of folder's file (see loadRelativeFileTree)
+    
+    Yields
+    ------
+    tuple[int, str]:
+        ONLY_IN_FIRST for a file in the hash file and NOT in the root folder, ONLY_IN_SECOND for a file in the root folder and NOT in the hash file, and its relative file path
+    """
+    
+    emptySet : set[str] = set()
+    
+    folder : str
+    for folder in sorted(mapOfFileByFolder.keys() | fileInFolders.keys(), key=relativePathKey):
+        filesInHashFile : set[str] = mapOfFileByFolder.get(folder, emptySet)
+        filesInDir : set[str] = fileInFolders.get(folder, emptySet)
+        prefix : str = f"{folder}/" if len(folder) > 0 else ""
+    
+        name : str
+        for name in sorted(filesInHashFile ^ filesInDir):
+            yield ONLY_IN_FIRST if name in filesInHashFile else ONLY_IN_SECOND, prefix + name
+
+
+def listHashFileDifferences(filename: Path, fileInFolders: dict[str, set[str]]) -> tuple[list[tuple[int, str]], Exception | None]:
+    """
+    List the differences between the hash file and a tree of relative paths of its folder (see iterTreeDifferences)
+    
+    The hash file is loaded in the worker and only the differences are returned, so the function can run in a pool of processes, like checkHashFileRows.
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to check
+    fileInFolders: dict[str, set[str]]
+        contains a map of relative folders of the folder of the hash file, each folder is bound to a set of folder's file
+    
+    Returns
+    -------
+    tuple[list[tuple[int, str]], Exception | None]
+        The differences, sorted by folder and by name
+        Exception | None :
+            FileNotFoundError if the filename is None or is not a valid file
+            OSError in case of IO error loading the file
+            None in case of success (no error happens)
+    """
+    
+    mapOfFileByFolder : dict[str, set[str]]
+    error : Exception | None
+    mapOfFileByFolder, error = splitHashFileRowsByFolder(filename)
+    
+    if error is not None:
+        return [], error
+    
+    mapOfFileByFolder, fileInFolders = excludeHashFile(filename, mapOfFileByFolder, fileInFolders)
+    
+    return list(iterTreeDifferences(mapOfFileByFolder, fileInFolders)), None
+
+
+def printSortedDifferences(filename: Path) -> tuple[int, Exception | None]:
+    """
+    Print the differences between the hash file and the tree of its folder, as soon as they are found by a sorted merge (see iterSortedDifferences)
+    
+    Parameters
+    ----------
+    filename : Path
+        The hash file to check
+
+    Returns
+    -------
+    tuple[int, Exception | None]
+        The number of differences printed
+        Exception | None :
+            FileNotFoundError if the filename is None or is not a valid file
+            OSError in case of IO error reading the hash file or listing the root folder
+            None in case of success (no error happens)
+    """
+    
+    logger : logging.Logger = logging.getLogger(__name__)
+    
+    differenceCounter : int = 0
+    error : Exception | None = None
+    
+    if filename is None or not filename.is_file():
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), filename)
+        logger.error(f"filename doesn't exists: {error}")
+        return differenceCounter, error
+    
+    rootFolder : Path = filename.parent
+    
+    try:
+        side : int
+        filepath : str
+        with measureStage("diff"):
+            for side, filepath in iterSortedDifferences(filename):
+                if side == ONLY_IN_FIRST:
+                    print(f"in hash file but NOT in the root directory: {rootFolder.joinpath(filepath)}")
+                else:
+                    print(f"in directory but NOT in hash file: {rootFolder.joinpath(filepath)}")
+                differenceCounter = differenceCounter + 1
+    except OSError as ex:
+        error = ex
+        logger.exception(f"Error checking the differences of {filename}: {error}")
+    
+    if error is None and differenceCounter == 0:
+        print ("All files in hash file are in the root directory and all files in directory are in the hash file.")
+    
+    return differenceCounter, error
+
+
 def printDifferencesBetweenTrees(missingInHashFileNotInDir: dict[Path, set[Path]], missingInDirNotInHashFile: dict[Path, set[Path]]) -> None:
     """
     Print the two trees
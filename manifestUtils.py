@@ -0,0 +1,238 @@
+from config import initLogger
+from pathlib import Path
+from os import strerror, fsencode, fsdecode
+from array import array
+from bisect import bisect_right
+from typing import Iterator
+from hashfileUtils import iterHashFile
+import errno
+import logging
+
+class HashManifest:
+    """
+    Compact representation of the rows of an hash file
+
+    Instead of a dict of strings, the rows are stored in a few contiguous arrays:
+      folders   : the table of the (interned) relative folders
+      entries   : for each row, the index of its folder in the table
+      names     : the file names of all the rows, encoded and concatenated, with the offset of each name
+      digests   : the raw digests of all the rows, concatenated (16 bytes for a md5 digest)
+
+    The manifest offers a dict-like lookup by relative file path and the iteration of the rows by folder.
+    The rows are sorted by folder and by name the first time they are looked up, so that a lookup is a binary search.
+    """
+
+    def __init__(self) -> None:
+        self.folders : list[str] = []
+        self.folderIndexes : dict[str, int] = {}
+        self.entries : array[int] = array("L")
+        self.nameOffsets : array[int] = array("Q", [0])
+        self.names : bytearray = bytearray()
+        self.digests : bytearray = bytearray()
+        self.digestSize : int = 0
+        # rows sorted by folder and name, and the position of the first row of each folder in the sorted rows
+        self.order : array[int] | None = None
+        self.folderStarts : array[int] = array("Q")
+
+    def add(self, filepath: str, hash: str) -> None:
+        """
+        Add a row to the manifest
+
+        Parameters
+        ----------
+        filepath : str
+            The relative file path
+        hash : str
+            The hexadecimal hash of the file
+
+        Raises
+        ------
+        ValueError
+            if the hash isn't hexadecimal or its size differs from the size of the other hashes in the manifest
+        """
+        digest : bytes = bytes.fromhex(hash)
+        if self.digestSize == 0:
+            self.digestSize = len(digest)
+        elif len(digest) != self.digestSize:
+            raise ValueError(f"expected a hash of {self.digestSize} bytes: {hash}")
+
+        folder : str
+        name : str
+        folder, separator, name = filepath.rpartition("/")
+
+        folderIndex : int | None = self.folderIndexes.get(folder)
+        if folderIndex is None:
+            folderIndex = len(self.folders)
+            self.folders.append(folder)
+            self.folderIndexes[folder] = folderIndex
+
+        self.entries.append(folderIndex)
+        self.names += fsencode(name)
+        self.nameOffsets.append(len(self.names))
+        self.digests += digest
+        self.order = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, filepath: object) -> bool:
+        return isinstance(filepath, str) and self.find(filepath) >= 0
+
+    def __getitem__(self, filepath: str) -> str:
+        row : int = self.find(filepath)
+        if row < 0:
+            raise KeyError(filepath)
+        return self.hash(row)
+
+    def get(self, filepath: str, default: str | None = None) -> str | None:
+        row : int = self.find(filepath)
+        return self.hash(row) if row >= 0 else default
+
+    def name(self, row: int) -> str:
+        """
+        Return the file name of a row
+        """
+        return fsdecode(self.encodedName(row))
+
+    def hash(self, row: int) -> str:
+        """
+        Return the hexadecimal hash of a row
+        """
+        return self.digests[row * self.digestSize:(row + 1) * self.digestSize].hex()
+
+    def filepath(self, row: int) -> str:
+        """
+        Return the relative file path of a row
+        """
+        folder : str = self.folders[self.entries[row]]
+        return f"{folder}/{self.name(row)}" if len(folder) > 0 else self.name(row)
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        """
+        Iterate the relative file paths and their hashes, in the order of the hash file
+        """
+        row : int
+        for row in range(len(self.entries)):
+            yield self.filepath(row), self.hash(row)
+
+    def folderItems(self, folder: str) -> Iterator[tuple[str, str]]:
+        """
+        Iterate the file names and their hashes in a relative folder, sorted by name
+        """
+        order : array[int] = self.sort()
+        folderIndex : int | None = self.folderIndexes.get(folder)
+        if folderIndex is None:
+            return
+        position : int
+        for position in range(self.folderStarts[folderIndex], self.folderStarts[folderIndex + 1]):
+            yield self.name(order[position]), self.hash(order[position])
+
+    def find(self, filepath: str) -> int:
+        """
+        Return the row of a relative file path, -1 if the file path isn't in the manifest
+        """
+        order : array[int] = self.sort()
+        folder : str
+        name : str
+        folder, separator, name = filepath.rpartition("/")
+        folderIndex : int | None = self.folderIndexes.get(folder)
+        if folderIndex is None:
+            return -1
+
+        start : int = self.folderStarts[folderIndex]
+        end : int = self.folderStarts[folderIndex + 1]
+        encodedName : bytes = fsencode(name)
+        # the last row with the name wins, like in the dict returned by loadHashFile
+        position : int = bisect_right(range(start, end), encodedName, key=lambda position: self.encodedName(order[position])) - 1
+        if position >= 0 and self.encodedName(order[start + position]) == encodedName:
+            return order[start + position]
+        return -1
+
+    def encodedName(self, row: int) -> bytes:
+        """
+        Return the file name of a row, as it's stored in the manifest
+        """
+        return bytes(self.names[self.nameOffsets[row]:self.nameOffsets[row + 1]])
+
+    def sort(self) -> "array[int]":
+        """
+        Sort the rows by folder and by name, if they aren't sorted yet, and return the sorted rows
+        """
+        if self.order is not None:
+            return self.order
+
+        # counting sort of the rows by folder
+        folderStarts : array[int] = array("Q", [0]) * (len(self.folders) + 1)
+        folderIndex : int
+        for folderIndex in self.entries:
+            folderStarts[folderIndex + 1] += 1
+        for folderIndex in range(len(self.folders)):
+            folderStarts[folderIndex + 1] += folderStarts[folderIndex]
+
+        order : array[int] = array("Q", [0]) * len(self.entries)
+        nextPositions : array[int] = array("Q", folderStarts)
+        row : int
+        for row, folderIndex in enumerate(self.entries):
+            order[nextPositions[folderIndex]] = row
+            nextPositions[folderIndex] += 1
+
+        # sort by name the rows of each folder
+        for folderIndex in range(len(self.folders)):
+            start : int = folderStarts[folderIndex]
+            end : int = folderStarts[folderIndex + 1]
+            order[start:end] = array("Q", sorted(order[start:end], key=self.encodedName))
+
+        self.order = order
+        self.folderStarts = folderStarts
+        return order
+
+
+def loadHashManifest(filename: Path) -> tuple[HashManifest, Exception | None]:
+    """
+    Load the hash file in a compact manifest
+
+    Like loadHashFile, but the rows are stored in a HashManifest instead of a dict of strings, so a manifest with tens of millions of rows fits in a modest amount of memory.
+    Rows with an invalid hash are skipped.
+
+    Parameters
+    ----------
+    filename : Path
+        The hash file to load
+
+    Returns
+    -------
+    tuple[HashManifest, Exception | None]:
+        The manifest with the rows of the hash file
+        Exception | None :
+            FileNotFoundError if the filename is None or is not a valid file
+            OSError in case of IO error loading the file
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    manifest : HashManifest = HashManifest()
+    error : Exception | None = None
+
+    if filename is None or not filename.is_file():
+        error = FileNotFoundError(errno.ENOENT, strerror(errno.ENOENT), filename)
+        logger.error(f"file doesn't exists: {filename}")
+        return manifest, error
+
+    try:
+        logger.debug(f"loading file {filename}")
+        filepath : str
+        hash : str
+        for filepath, hash in iterHashFile(filename):
+            try:
+                manifest.add(filepath, hash)
+            except ValueError as ex:
+                logger.warning(f"skipping invalid row in {filename}: {ex}")
+    except OSError as ex:
+        error = ex
+        manifest = HashManifest()
+        logger.exception(f"Error loading file {filename}: {error}")
+
+    logger.debug(f"rows read: {len(manifest)} in {len(manifest.folders)} folders")
+
+    return manifest, error
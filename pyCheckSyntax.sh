@@ -6,5 +6,5 @@ echo "Syntax checking..."
 # pip install --no-cache-dir -> don't create the folder __pycache__ running pip3
 # mypy --cache-dir=/dev/null -> don't create the folder __mypy_cache__ running mypy
 
-docker run -it --rm --name mypy -v "$PWD":/usr/src/myapp -v "$FOLDER_TO_CHECK":"$FOLDER_TO_CHECK" -e PYTHONDONTWRITEBYTECODE=1 -w /usr/src/myapp python:3.10-slim /bin/bash -c 'pip install --no-cache-dir mypy pyyaml types-PyYAML && python -m mypy --cache-dir=/dev/null --warn-unreachable --strict /usr/src/myapp/config.py /usr/src/myapp/hashfileUtils.py /usr/src/myapp/fileUtils.py /usr/src/myapp/findMissingHashFiles.py /usr/src/myapp/checkMissingItemsInHashFile.py /usr/src/myapp/checkMissingItemsInASetOfFile.py /usr/src/myapp/checkMissingItemsFromOneSource.py /usr/src/myapp/tests/CheckDifferencesBetweenTreesTest.py'
+docker run -it --rm --name mypy -v "$PWD":/usr/src/myapp -v "$FOLDER_TO_CHECK":"$FOLDER_TO_CHECK" -e PYTHONDONTWRITEBYTECODE=1 -w /usr/src/myapp python:3.10-slim /bin/bash -c 'pip install --no-cache-dir mypy pyyaml types-PyYAML && python -m mypy --cache-dir=/dev/null --warn-unreachable --strict /usr/src/myapp/config.py /usr/src/myapp/hashfileUtils.py /usr/src/myapp/digestUtils.py /usr/src/myapp/cacheUtils.py /usr/src/myapp/manifestUtils.py /usr/src/myapp/reportUtils.py /usr/src/myapp/throttleUtils.py /usr/src/myapp/checkpointUtils.py /usr/src/myapp/statsUtils.py /usr/src/myapp/benchmarkUtils.py /usr/src/myapp/watchUtils.py /usr/src/myapp/queryUtils.py /usr/src/myapp/duplicateUtils.py /usr/src/myapp/fileUtils.py /usr/src/myapp/findMissingHashFiles.py /usr/src/myapp/checkMissingItemsInHashFile.py /usr/src/myapp/checkMissingItemsInASetOfFile.py /usr/src/myapp/checkMissingItemsFromOneSource.py /usr/src/myapp/benchmarkHashFiles.py /usr/src/myapp/watchHashFiles.py /usr/src/myapp/findDuplicateFiles.py /usr/src/myapp/tests/CheckDifferencesBetweenTreesTest.py /usr/src/myapp/tests/VerifyHashFileTest.py /usr/src/myapp/tests/ScanTreeTest.py /usr/src/myapp/tests/LoadHashFileTest.py /usr/src/myapp/tests/HashManifestTest.py /usr/src/myapp/tests/SortedDifferencesTest.py /usr/src/myapp/tests/ReportTest.py /usr/src/myapp/tests/ThrottleTest.py /usr/src/myapp/tests/CheckpointTest.py /usr/src/myapp/tests/BenchmarkTest.py /usr/src/myapp/tests/StatsTest.py /usr/src/myapp/tests/ConfigTest.py /usr/src/myapp/tests/WatchTest.py /usr/src/myapp/tests/QueryTest.py /usr/src/myapp/tests/DuplicateTest.py'
 
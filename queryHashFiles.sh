@@ -0,0 +1,19 @@
+#!/bin/bash
+
+# queries to the daemon started by watchHashFiles.sh, answered from its index without starting a container or scanning the folder
+
+QUERY_URL="http://127.0.0.1:8765/"
+
+echo "missing hash files: "
+
+curl -s "${QUERY_URL}search"
+
+echo "choosing an hash file:"
+
+hashFile=$(curl -s "${QUERY_URL}random_hash_file" | python3 -c 'import json, sys; print(json.load(sys.stdin)["result"])')
+
+echo "choosing by random: -> $hashFile <-"
+
+echo "differences and verification of the hash file, in a batch: "
+
+curl -s -d "[{\"query\": \"differences\", \"hash_file\": \"$hashFile\"}, {\"query\": \"verify\", \"hash_file\": \"$hashFile\", \"workers\": 4}]" "$QUERY_URL"
@@ -0,0 +1,296 @@
+from config import initLogger
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+from typing import Any, Callable
+from urllib.parse import SplitResult, urlsplit, parse_qsl
+from hashfileUtils import ONLY_IN_FIRST, relativePathKey
+from digestUtils import verifyHashFile
+from reportUtils import MISSING_IN_DIR, MISSING_IN_HASH_FILE
+from watchUtils import TreeIndex
+import json
+import random
+import logging
+
+# address of the query server: on localhost, so only the local scripts can query it
+DEFAULT_QUERY_HOST : str = "127.0.0.1"
+DEFAULT_QUERY_PORT : int = 8765
+
+# largest body of a request, in bytes
+MAX_REQUEST_SIZE : int = 1024 * 1024
+
+# threads hashing the files of a verify query, unless the server allows more
+DEFAULT_QUERY_WORKERS : int = 1
+
+def searchQuery(index: TreeIndex, parameters: dict[str, Any], maxWorkers: int) -> Any:
+    """
+    The hash files and the folders without hash files in a folder and its subfolders, like fileUtils.searchHashFiles
+    """
+    folder : str = relativeIndexPath(index, parameters.get("folder"))
+    with index.lock:
+        if folder not in index.files:
+            raise FileNotFoundError(f"folder not in the index: {parameters.get('folder')}")
+        folders : list[str] = sorted(index.subtreeFolders(folder), key=relativePathKey)
+        return {
+            "hash_files": [str(index.rootFolder.joinpath(currentFolder, name)) for currentFolder in folders for name in sorted(index.hashFiles[currentFolder])],
+            "missing_hash_files": [str(index.rootFolder.joinpath(currentFolder)) for currentFolder in folders if currentFolder in index.missingHashFiles],
+        }
+
+
+def randomHashFileQuery(index: TreeIndex, parameters: dict[str, Any], maxWorkers: int) -> Any:
+    """
+    An hash file chosen at random in a folder and its subfolders, None if there are no hash files
+    """
+    hashFiles : list[str] = searchQuery(index, parameters, maxWorkers)["hash_files"]
+    return random.choice(hashFiles) if len(hashFiles) > 0 else None
+
+
+def differencesQuery(index: TreeIndex, parameters: dict[str, Any], maxWorkers: int) -> Any:
+    """
+    The differences between an hash file and its folder, or of all the hash files with differences, as the status and the path of each file
+    """
+    hashFile : str | None = relativeIndexPath(index, parameters["hash_file"]) if "hash_file" in parameters else None
+    with index.lock:
+        if hashFile is not None and hashFile not in index.differences:
+            raise FileNotFoundError(f"hash file not in the index: {parameters['hash_file']}")
+        hashFiles : list[str] = [hashFile] if hashFile is not None else sorted((name for name, differences in index.differences.items() if len(differences) > 0), key=relativePathKey)
+        result : dict[str, list[dict[str, str]]] = {}
+        currentHashFile : str
+        for currentHashFile in hashFiles:
+            hashFilePath : Path = index.rootFolder.joinpath(currentHashFile)
+            result[str(hashFilePath)] = [{"status": MISSING_IN_DIR if side == ONLY_IN_FIRST else MISSING_IN_HASH_FILE, "path": str(hashFilePath.parent.joinpath(filepath))} for side, filepath in index.differences[currentHashFile]]
+        return result
+
+
+def verifyQuery(index: TreeIndex, parameters: dict[str, Any], maxWorkers: int) -> Any:
+    """
+    Verify the hashes of an hash file of the index (see digestUtils.verifyHashFile), reading its files
+
+    The files are hashed by the threads asked by the parameter "workers", at most maxWorkers, so a client can't make the server read more files at once than it's configured for.
+    """
+    # the workers are a JSON number, or a string in the query string of a GET request
+    workersParameter : Any = parameters.get("workers", 1)
+    if isinstance(workersParameter, bool) or not isinstance(workersParameter, (int, str)):
+        raise ValueError(f"invalid number of workers: {workersParameter}")
+    workers : int = int(workersParameter)
+    if workers < 1:
+        raise ValueError(f"invalid number of workers: {workersParameter}")
+
+    hashFile : str = relativeIndexPath(index, parameters.get("hash_file"))
+    with index.lock:
+        folder : str
+        name : str
+        folder, separator, name = hashFile.rpartition("/")
+        if name not in index.hashFiles.get(folder, set()):
+            raise FileNotFoundError(f"hash file not in the index: {parameters.get('hash_file')}")
+
+    # the files are read without holding the index, so the other queries and the updates aren't blocked
+    okFiles : set[Path]
+    mismatchedFiles : set[Path]
+    unreadableFiles : set[Path]
+    error : Exception | None
+    okFiles, mismatchedFiles, unreadableFiles, error = verifyHashFile(index.rootFolder.joinpath(hashFile), min(workers, maxWorkers))
+    if error is not None:
+        raise error
+
+    return {
+        "ok": len(okFiles),
+        "mismatched": sorted(str(filepath) for filepath in mismatchedFiles),
+        "unreadable": sorted(str(filepath) for filepath in unreadableFiles),
+    }
+
+
+def statusQuery(index: TreeIndex, parameters: dict[str, Any], maxWorkers: int) -> Any:
+    """
+    The root folder of the index and the number of its folders, of its hash files, of the folders without hash files and of the hash files with differences
+    """
+    with index.lock:
+        return {
+            "root": str(index.rootFolder),
+            "folders": len(index.files),
+            "hash_files": sum(len(names) for names in index.hashFiles.values()),
+            "missing_hash_files": len(index.missingHashFiles),
+            "hash_files_with_differences": sum(1 for differences in index.differences.values() if len(differences) > 0),
+        }
+
+
+# each query bound to the function answering it from the index, the parameters of the query and the largest number of threads reading the files
+QUERIES : dict[str, Callable[[TreeIndex, dict[str, Any], int], Any]] = {
+    "search": searchQuery,
+    "random_hash_file": randomHashFileQuery,
+    "differences": differencesQuery,
+    "verify": verifyQuery,
+    "status": statusQuery,
+}
+
+def relativeIndexPath(index: TreeIndex, filepath: Any) -> str:
+    """
+    Return a path, absolute or relative to the root folder of the index, as a relative path of the index ("" for the root folder)
+
+    Raises
+    ------
+    ValueError
+        if the path isn't a string or is outside the root folder
+    """
+    if filepath is None:
+        return ""
+    if not isinstance(filepath, str):
+        raise ValueError(f"invalid path: {filepath}")
+
+    relativePath : Path = Path(filepath)
+    if relativePath.is_absolute():
+        if not relativePath.is_relative_to(index.rootFolder):
+            raise ValueError(f"path outside the folder {index.rootFolder}: {filepath}")
+        relativePath = relativePath.relative_to(index.rootFolder)
+    if ".." in relativePath.parts:
+        raise ValueError(f"path outside the folder {index.rootFolder}: {filepath}")
+
+    return relativePath.as_posix() if relativePath.parts else ""
+
+
+def answerQuery(index: TreeIndex, query: Any, maxWorkers: int = DEFAULT_QUERY_WORKERS) -> dict[str, Any]:
+    """
+    Answer a query on the index
+
+    A query is a JSON object with the name of the query in the key "query" and its parameters in the other keys:
+      search           : the hash files and the folders without hash files, in the folder of the parameter "folder" (the root folder by default)
+      random_hash_file : an hash file chosen at random, in the folder of the parameter "folder" (the root folder by default)
+      differences      : the differences of the hash file of the parameter "hash_file", or of all the hash files with differences
+      verify           : the files of the hash file of the parameter "hash_file" NOT matching their hashes, or that can't be read, hashed by "workers" threads, at most maxWorkers
+      status           : the number of folders, of hash files and of differences in the index
+    The paths are absolute or relative to the root folder of the index.
+
+    Returns
+    -------
+    dict[str, Any]
+        The answer, with the name of the query in the key "query" and its result in the key "result", or the error in the key "error"
+    """
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    if not isinstance(query, dict) or not isinstance(query.get("query"), str):
+        return {"query": None, "error": "a query must be an object with the name of the query in the key 'query'"}
+
+    name : str = query["query"]
+    if name not in QUERIES:
+        return {"query": name, "error": f"unknown query, expected one of: {', '.join(QUERIES)}"}
+
+    try:
+        return {"query": name, "result": QUERIES[name](index, query, maxWorkers)}
+    except (OSError, ValueError) as ex:
+        logger.debug(f"Error answering the query {query}: {ex}")
+        return {"query": name, "error": str(ex)}
+
+
+def answerQueries(index: TreeIndex, request: Any, maxWorkers: int = DEFAULT_QUERY_WORKERS) -> Any:
+    """
+    Answer a query, or a batch of queries as a JSON array, returning an array with the answer of each query in the same order
+    """
+    if isinstance(request, list):
+        return [answerQuery(index, query, maxWorkers) for query in request]
+    return answerQuery(index, request, maxWorkers)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the HTTP requests to the query server
+
+    A query (or a batch of queries as a JSON array) is sent as the JSON body of a POST request, like
+        curl -s -d '[{"query": "status"}, {"query": "random_hash_file"}]' http://127.0.0.1:8765/
+    or as a GET request with the name of the query in the path and its parameters in the query string, like
+        curl -s 'http://127.0.0.1:8765/differences?hash_file=album/album.md5'
+    """
+
+    server : "QueryServer"
+
+    def do_GET(self) -> None:
+        url : SplitResult = urlsplit(self.path)
+        query : dict[str, Any] = dict(parse_qsl(url.query))
+        query["query"] = url.path.strip("/")
+        self.sendJson(200, answerQueries(self.server.index, query, self.server.workers))
+
+    def do_POST(self) -> None:
+        length : int
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.sendJson(400, {"query": None, "error": f"invalid Content-Length: {self.headers.get('Content-Length')}"})
+            return None
+        if length > MAX_REQUEST_SIZE:
+            self.sendJson(413, {"query": None, "error": f"request larger than {MAX_REQUEST_SIZE} bytes"})
+            return None
+
+        request : Any
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as ex:
+            self.sendJson(400, {"query": None, "error": f"invalid JSON: {ex}"})
+            return None
+
+        self.sendJson(200, answerQueries(self.server.index, request, self.server.workers))
+        return None
+
+    def sendJson(self, status: int, answer: Any) -> None:
+        body : bytes = json.dumps(answer).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger : logging.Logger = logging.getLogger(__name__)
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class QueryServer(ThreadingHTTPServer):
+    """
+    HTTP server answering the queries on a tree index, each request in its own thread (see QueryHandler)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, index: TreeIndex, host: str = DEFAULT_QUERY_HOST, port: int = DEFAULT_QUERY_PORT, workers: int = DEFAULT_QUERY_WORKERS) -> None:
+        self.index : TreeIndex = index
+        self.workers : int = workers
+        super().__init__((host, port), QueryHandler)
+
+
+def startQueryServer(index: TreeIndex, host: str = DEFAULT_QUERY_HOST, port: int = DEFAULT_QUERY_PORT, workers: int = DEFAULT_QUERY_WORKERS) -> tuple[QueryServer | None, Exception | None]:
+    """
+    Start a server answering the queries on a tree index in a background thread
+
+    Parameters
+    ----------
+    index : TreeIndex
+        The tree index to query
+    host : str
+        The address to listen on, localhost by default
+    port : int
+        The port to listen on, 0 to choose a free port
+    workers : int
+        The largest number of threads hashing the files of a verify query
+
+    Returns
+    -------
+    tuple[QueryServer | None, Exception | None]:
+        The server, stopped by its method shutdown, or None in case of error
+        Exception | None :
+            OSError in case of error listening on the address (i.e. the port is already used)
+            None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    server : QueryServer
+    try:
+        server = QueryServer(index, host, port, workers)
+    except OSError as ex:
+        logger.error(f"Error listening on {host}:{port}: {ex}")
+        return None, ex
+
+    Thread(target=server.serve_forever, name="queryServer", daemon=True).start()
+    logger.info(f"answering the queries on http://{host}:{server.server_address[1]}/")
+
+    return server, None
@@ -0,0 +1,149 @@
+from config import initLogger
+from pathlib import Path
+from typing import Iterable, TextIO
+from types import TracebackType
+from hashfileUtils import ONLY_IN_FIRST
+from statsUtils import measureStage
+import sys
+import csv
+import json
+
+# size of the buffer collecting the records before they are written to the output
+REPORT_BUFFER_SIZE : int = 1024 * 1024
+
+# formats of the report: text is the human readable output printed by printDifferencesBetweenTrees
+REPORT_FORMATS : list[str] = ["text", "jsonl", "csv", "nul"]
+
+# status of a record in the report
+MISSING_IN_DIR : str = "missing_in_directory"
+MISSING_IN_HASH_FILE : str = "missing_in_hash_file"
+HASH_MISMATCH : str = "hash_mismatch"
+UNREADABLE : str = "unreadable"
+
+class ReportWriter:
+    """
+    Writer of a machine-readable report of the differences between hash files and folders
+
+    Each record has three fields: the hash file, the status of the file and the file path.
+    The records are written as soon as they are produced, through a buffer, in one of the formats:
+      jsonl : a JSON object for each line, with the keys hash_file, status and path
+      csv   : a header line, then a line for each record with the columns hash_file, status and path
+      nul   : each field of a record terminated by a NUL character, like the output of find -print0 (file paths can contain tabs and new lines, but not NUL characters),
+              so a record is three consecutive fields
+
+    The writer is a context manager, the buffer is flushed when the context exits.
+    """
+
+    def __init__(self, outputFormat: str, stream: TextIO | None = None, bufferSize: int = REPORT_BUFFER_SIZE, header: bool = True) -> None:
+        if outputFormat not in REPORT_FORMATS or outputFormat == "text":
+            raise ValueError(f"expected a machine-readable report format: {outputFormat}")
+
+        self.outputFormat : str = outputFormat
+        self.closeStream : bool = stream is None
+        # file names that aren't valid UTF-8 are written back as the original bytes
+        self.stream : TextIO = stream if stream is not None else open(sys.stdout.fileno(), "w", buffering=bufferSize, encoding="utf-8", errors="surrogateescape", newline="", closefd=False)
+        self.csvWriter = csv.writer(self.stream, lineterminator="\n") if outputFormat == "csv" else None
+        self.counter : int = 0
+
+        # the header is omitted writing a part of a report, to be appended to another report
+        if self.csvWriter is not None and header:
+            self.csvWriter.writerow(["hash_file", "status", "path"])
+
+    def write(self, hashFile: Path, status: str, filepath: Path) -> None:
+        """
+        Write a record of the report
+
+        Parameters
+        ----------
+        hashFile : Path
+            The hash file the record refers to
+        status : str
+            The status of the file, one of MISSING_IN_DIR, MISSING_IN_HASH_FILE, HASH_MISMATCH, UNREADABLE
+        filepath : Path
+            The file path
+        """
+        if self.outputFormat == "jsonl":
+            self.stream.write(json.dumps({"hash_file": str(hashFile), "status": status, "path": str(filepath)}))
+            self.stream.write("\n")
+        elif self.csvWriter is not None:
+            self.csvWriter.writerow([hashFile, status, filepath])
+        else:
+            self.stream.write(f"{hashFile}\0{status}\0{filepath}\0")
+        self.counter = self.counter + 1
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self.closeStream:
+            self.stream.close()
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, excType: type[BaseException] | None, excValue: BaseException | None, traceback: TracebackType | None) -> None:
+        self.close()
+
+
+def writeDifferences(report: ReportWriter, hashFile: Path, differences: Iterable[tuple[int, str]]) -> int:
+    """
+    Write the differences between an hash file and the tree of its folder in the report, as soon as they are produced
+
+    Parameters
+    ----------
+    report : ReportWriter
+        The report
+    hashFile : Path
+        The hash file
+    differences : Iterable[tuple[int, str]]
+        The differences, as produced by iterSortedDifferences or iterTreeDifferences
+
+    Returns
+    -------
+    int
+        The number of differences written
+
+    Raises
+    ------
+    OSError
+        in case of IO error producing the differences or writing the report
+    """
+
+    rootFolder : Path = hashFile.parent
+    differenceCounter : int = 0
+
+    side : int
+    filepath : str
+    # the differences are produced while they are written
+    with measureStage("diff"):
+        for side, filepath in differences:
+            report.write(hashFile, MISSING_IN_DIR if side == ONLY_IN_FIRST else MISSING_IN_HASH_FILE, rootFolder.joinpath(filepath))
+            differenceCounter = differenceCounter + 1
+
+    return differenceCounter
+
+
+def writeVerificationResults(report: ReportWriter, hashFile: Path, mismatchedFiles: set[Path], unreadableFiles: set[Path]) -> None:
+    """
+    Write the files of an hash file NOT matching their hash and the files that can't be read in the report, like printVerificationResults
+
+    Parameters
+    ----------
+    report : ReportWriter
+        The report
+    hashFile : Path
+        The hash file
+    mismatchedFiles: set[Path]
+        contains the files NOT matching the hash in the hash file
+    unreadableFiles: set[Path]
+        contains the files that can't be read
+    """
+
+    filename : Path
+    for filename in sorted(mismatchedFiles):
+        report.write(hashFile, HASH_MISMATCH, filename)
+    for filename in sorted(unreadableFiles):
+        report.write(hashFile, UNREADABLE, filename)
+
+    return None
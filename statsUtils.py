@@ -0,0 +1,266 @@
+from config import initLogger
+from pathlib import Path
+from os import replace, register_at_fork
+from threading import Lock, local
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator
+import sys
+import json
+import time
+import atexit
+import cProfile
+import resource
+import logging
+
+class Stats:
+    """
+    Statistics of a run: the wall and CPU time of each stage and the counters of the items processed
+
+    A stage is a phase of the pipeline, like the scan of the folders, the parsing of the hash files, the diff of the trees or the hashing of the files.
+    Stages can nest, like the parsing of an hash file while verifying it, and each stage is timed on its own; a stage nested in itself is timed once.
+    The CPU time is the CPU time of this process, all threads included, and of its terminated child processes, so it includes the other threads running at the same time.
+    The counters of the worker processes of a pool aren't collected, their CPU time is.
+    Stats can be shared by several threads.
+    """
+
+    def __init__(self) -> None:
+        self.lock : Lock = Lock()
+        self.threadStages : local = local()
+        self.startTime : float = time.time()
+        self.startWallTime : float = time.perf_counter()
+        self.startCpuTime : float = cpuTime()
+        # each stage bound to its number of calls, its wall time and its CPU time
+        self.stages : dict[str, list[float]] = {}
+        self.counters : dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a stage until the context exits
+        """
+        activeStages : set[str] | None = getattr(self.threadStages, "active", None)
+        if activeStages is None:
+            activeStages = set()
+            self.threadStages.active = activeStages
+        if name in activeStages:
+            yield None
+            return
+
+        activeStages.add(name)
+        wallStart : float = time.perf_counter()
+        cpuStart : float = cpuTime()
+        try:
+            yield None
+        finally:
+            wallTime : float = time.perf_counter() - wallStart
+            stageCpuTime : float = cpuTime() - cpuStart
+            activeStages.discard(name)
+            with self.lock:
+                measures : list[float] = self.stages.setdefault(name, [0, 0.0, 0.0])
+                measures[0] = measures[0] + 1
+                measures[1] = measures[1] + wallTime
+                measures[2] = measures[2] + stageCpuTime
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Add an amount to a counter
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Return the metrics of the run, as a dict that can be written as JSON
+
+        The metrics have the total wall and CPU time, the peak RSS, the time of each stage, the counters and the rates of the stages:
+          folders_per_second and files_per_second   : the folders and the files listed per second of the scan stage
+          hash_file_bytes_per_second                : the bytes of the hash files read per second of the parse stage
+          bytes_hashed_per_second                   : the bytes hashed per second of the hash stage
+        """
+        with self.lock:
+            stages : dict[str, dict[str, float]] = {name: {"calls": int(measures[0]), "wall_seconds": measures[1], "cpu_seconds": measures[2]} for name, measures in self.stages.items()}
+            counters : dict[str, int] = dict(self.counters)
+
+        rates : dict[str, float] = {}
+        rateName : str
+        counterName : str
+        stageName : str
+        for rateName, counterName, stageName in RATES:
+            if counterName in counters and stageName in stages and stages[stageName]["wall_seconds"] > 0:
+                rates[rateName] = counters[counterName] / stages[stageName]["wall_seconds"]
+
+        return {
+            "started_at": self.startTime,
+            "wall_seconds": time.perf_counter() - self.startWallTime,
+            "cpu_seconds": cpuTime() - self.startCpuTime,
+            "peak_rss_bytes": peakRss(),
+            "stages": stages,
+            "counters": counters,
+            "rates": rates,
+        }
+
+
+# the rates of the metrics, each one as the name of the rate, the counter and the stage whose wall time divides the counter
+RATES : list[tuple[str, str, str]] = [
+    ("folders_per_second", "folders_listed", "scan"),
+    ("files_per_second", "files_listed", "scan"),
+    ("hash_file_bytes_per_second", "hash_file_bytes", "parse"),
+    ("bytes_hashed_per_second", "bytes_hashed", "hash"),
+]
+
+# the statistics of this process, None when they are disabled
+currentStats : Stats | None = None
+
+def enableStats() -> Stats:
+    """
+    Start collecting the statistics of this process
+    """
+    global currentStats
+    currentStats = Stats()
+    return currentStats
+
+
+def disableStats() -> None:
+    """
+    Stop collecting the statistics of this process
+    """
+    global currentStats
+    currentStats = None
+
+
+# a forked worker process doesn't count in a copy of the statistics of its parent, that would be lost
+register_at_fork(after_in_child=disableStats)
+
+def getStats() -> Stats | None:
+    """
+    Return the statistics of this process, None if they are disabled
+    """
+    return currentStats
+
+
+def measureStage(name: str) -> ContextManager[None]:
+    """
+    Return a context timing a stage in the statistics of this process, doing nothing when they are disabled
+    """
+    stats : Stats | None = currentStats
+    return stats.stage(name) if stats is not None else nullcontext()
+
+
+def addCounter(name: str, amount: int = 1) -> None:
+    """
+    Add an amount to a counter of the statistics of this process, doing nothing when they are disabled
+    """
+    stats : Stats | None = currentStats
+    if stats is not None:
+        stats.count(name, amount)
+
+
+def cpuTime() -> float:
+    """
+    Return the CPU time, in seconds, of this process and of its terminated child processes
+    """
+    children : resource.struct_rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def peakRss() -> int:
+    """
+    Return the peak resident set size, in bytes, of this process
+    """
+    maxRss : int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # the peak RSS is in kilobytes on Linux, in bytes on macOS
+    return maxRss if sys.platform == "darwin" else maxRss * 1024
+
+
+def writeMetrics(filename: Path, metrics: dict[str, Any]) -> Exception | None:
+    """
+    Write the metrics of a run as a JSON file
+
+    The metrics are written in a temporary file in the same folder, renamed to the metrics file only when complete, so a monitoring job never reads a partially written file.
+
+    Returns
+    -------
+    Exception | None :
+        OSError in case of IO error writing the file
+        None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    error : Exception | None = None
+    temporaryFile : Path = filename.with_name(f".{filename.name}.tmp")
+
+    try:
+        temporaryFile.write_text(json.dumps(metrics, indent=2))
+        replace(temporaryFile, filename)
+    except OSError as ex:
+        error = ex
+        logger.exception(f"Error writing the metrics {filename}: {error}")
+
+    return error
+
+
+def printStats(metrics: dict[str, Any]) -> None:
+    """
+    Print a summary of the metrics of a run on the standard error, so it isn't mixed with the report on the standard output
+    """
+
+    print(f"wall time {metrics['wall_seconds']:.3f} s, CPU time {metrics['cpu_seconds']:.3f} s, peak RSS {metrics['peak_rss_bytes'] / 2 ** 20:.1f} MiB", file=sys.stderr)
+
+    name : str
+    measures : dict[str, float]
+    for name, measures in metrics["stages"].items():
+        print(f"  stage {name:<10} {measures['calls']:>8} calls {measures['wall_seconds']:>10.3f} s wall {measures['cpu_seconds']:>10.3f} s CPU", file=sys.stderr)
+
+    value : float
+    for name, value in metrics["counters"].items():
+        print(f"  {name:<30} {value:>14}", file=sys.stderr)
+    for name, value in metrics["rates"].items():
+        print(f"  {name:<30} {value:>14.1f}", file=sys.stderr)
+
+    return None
+
+
+def startInstrumentation(program: str, showStats: bool = False, profileFile: Path | None = None, metricsFile: Path | None = None) -> None:
+    """
+    Start the instrumentation of a run, reported when the program exits, even by sys.exit
+
+    Parameters
+    ----------
+    program : str
+        The name of the program, written in the metrics
+    showStats : bool
+        True to print a summary of the statistics on the standard error (see printStats)
+    profileFile : Path | None
+        The file where the cProfile statistics of the main thread are dumped, readable by the pstats module, None to not profile
+    metricsFile : Path | None
+        The JSON file where the metrics are written (see Stats.metrics), None to not write them
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    stats : Stats | None = enableStats() if showStats or metricsFile is not None else None
+    profiler : cProfile.Profile | None = None
+    if profileFile is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def report() -> None:
+        if profiler is not None and profileFile is not None:
+            profiler.disable()
+            try:
+                profiler.dump_stats(profileFile)
+            except OSError as ex:
+                logger.exception(f"Error writing the profile {profileFile}: {ex}")
+
+        if stats is not None:
+            metrics : dict[str, Any] = {"program": program}
+            metrics.update(stats.metrics())
+            if metricsFile is not None:
+                writeMetrics(metricsFile, metrics)
+            if showStats:
+                printStats(metrics)
+
+    atexit.register(report)
+
+    return None
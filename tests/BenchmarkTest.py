@@ -0,0 +1,83 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+import unittest
+from benchmarkUtils import BENCHMARK_STAGES, generateSyntheticTree, runBenchmark, saveBaseline, loadBaseline, compareWithBaseline
+from hashfileUtils import splitHashFileRowsByFolder, iterTreeDifferences, ONLY_IN_FIRST, ONLY_IN_SECOND
+from fileUtils import loadRelativeFileTree
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_synthetic_tree(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir).joinpath("tree")
+
+            hashFile : Path | None
+            error : Exception | None
+            hashFile, error = generateSyntheticTree(vRoot, 40, depth=2, fanOut=2, missingRatio=0.1, extraRatio=0.1, fileSize=8)
+            self.assertIsNone(error)
+            assert hashFile is not None
+
+            mapOfFileByFolder : dict[str, set[str]]
+            mapOfFileByFolder, error = splitHashFileRowsByFolder(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(sum(len(files) for files in mapOfFileByFolder.values()), 36)
+            self.assertIn("file000000001.dat", mapOfFileByFolder["d001/d000"])
+
+            fileInFolders : dict[str, set[str]]
+            fileInFolders, error = loadRelativeFileTree(vRoot)
+            self.assertIsNone(error)
+
+            # the files missing in the tree, the extra files and, in the root folder, the hash file and the parameters file
+            sides : list[int] = [side for side, filepath in iterTreeDifferences(mapOfFileByFolder, fileInFolders)]
+            self.assertEqual(sides.count(ONLY_IN_FIRST), 4)
+            self.assertEqual(sides.count(ONLY_IN_SECOND), 6)
+
+            # the tree is reused with the same parameters, a different tree needs an empty folder
+            hashFile, error = generateSyntheticTree(vRoot, 40, depth=2, fanOut=2, missingRatio=0.1, extraRatio=0.1, fileSize=8)
+            self.assertIsNone(error)
+            hashFile, error = generateSyntheticTree(vRoot, 50, depth=2, fanOut=2)
+            self.assertIsNone(hashFile)
+            self.assertIsInstance(error, ValueError)
+        return None
+
+    def test_baseline(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            hashFile : Path | None
+            error : Exception | None
+            hashFile, error = generateSyntheticTree(Path(tmpdir).joinpath("tree"), 30, depth=1, fanOut=3)
+            assert hashFile is not None
+
+            results : dict[str, dict[str, float]]
+            results, error = runBenchmark(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(list(results), BENCHMARK_STAGES)
+
+            baselineFile : Path = Path(tmpdir).joinpath("baseline.json")
+            error = saveBaseline(baselineFile, {"files": 30}, results)
+            self.assertIsNone(error)
+
+            baseline : dict[str, Any]
+            baseline, error = loadBaseline(baselineFile)
+            self.assertIsNone(error)
+            self.assertEqual(baseline["parameters"], {"files": 30})
+            self.assertEqual(compareWithBaseline(results, baseline), [])
+
+            slowerResults : dict[str, dict[str, float]] = {"loadHashFile": {"seconds": results["loadHashFile"]["seconds"] + 1, "peak_rss": results["loadHashFile"]["peak_rss"]}}
+            self.assertEqual(len(compareWithBaseline(slowerResults, baseline)), 1)
+
+            results, error = runBenchmark(hashFile, stages=["missingStage"])
+            self.assertIsInstance(error, ValueError)
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
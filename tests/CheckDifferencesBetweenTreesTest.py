@@ -7,7 +7,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
 from config import initLogger
 from pathlib import Path
 import unittest
-from hashfileUtils import checkDifferencesBetweenTrees, printDifferencesBetweenTrees
+from fileUtils import relativeTreeToPaths
+from hashfileUtils import checkDifferencesBetweenTrees, checkDifferencesBetweenRelativeTrees, printDifferencesBetweenTrees
 
 class CheckDifferencesBetweenTreesTest(unittest.TestCase):
 
@@ -49,8 +50,8 @@ class CheckDifferencesBetweenTreesTest(unittest.TestCase):
         error : Exception | None
         missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenTrees(mapOfFileByFolder, fileInFolders)
         self.assertIsNone(error)
-        self.assertEqual(len(missingInHashFileNotInDir), 0)
-        self.assertEqual(len(missingInDirNotInHashFile), 1)
+        self.assertEqual(len(missingInHashFileNotInDir), 1)
+        self.assertEqual(len(missingInDirNotInHashFile), 0)
         
         mapOfFileByFolder = dict()
         fileInFolders = dict()
@@ -58,8 +59,8 @@ class CheckDifferencesBetweenTreesTest(unittest.TestCase):
 
         missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenTrees(mapOfFileByFolder, fileInFolders)
         self.assertIsNone(error)
-        self.assertEqual(len(missingInHashFileNotInDir), 1)
-        self.assertEqual(len(missingInDirNotInHashFile), 0)
+        self.assertEqual(len(missingInHashFileNotInDir), 0)
+        self.assertEqual(len(missingInDirNotInHashFile), 1)
         return None
         
     def test_missing_file(self) -> None:
@@ -75,8 +76,8 @@ class CheckDifferencesBetweenTreesTest(unittest.TestCase):
         error : Exception | None
         missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenTrees(mapOfFileByFolder, fileInFolders)
         self.assertIsNone(error)
-        self.assertEqual(len(missingInHashFileNotInDir), 0)
-        self.assertEqual(len(missingInDirNotInHashFile), 1)
+        self.assertEqual(len(missingInHashFileNotInDir), 1)
+        self.assertEqual(len(missingInDirNotInHashFile), 0)
         
         mapOfFileByFolder = dict()
         fileInFolders = dict()
@@ -84,8 +85,8 @@ class CheckDifferencesBetweenTreesTest(unittest.TestCase):
 
         missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenTrees(mapOfFileByFolder, fileInFolders)
         self.assertIsNone(error)
-        self.assertEqual(len(missingInHashFileNotInDir), 1)
-        self.assertEqual(len(missingInDirNotInHashFile), 0)
+        self.assertEqual(len(missingInHashFileNotInDir), 0)
+        self.assertEqual(len(missingInDirNotInHashFile), 1)
         return None
     
     def test_common_folder(self) -> None:
@@ -143,6 +144,30 @@ class CheckDifferencesBetweenTreesTest(unittest.TestCase):
         
         printDifferencesBetweenTrees(missingInHashFileNotInDir, missingInDirNotInHashFile)
         return None
+    
+    def test_relative_trees(self) -> None:
+        vRoot: Path = Path("root")
+        
+        mapOfFileByFolder : dict[str, set[str]] = {"": {"file1", "file2"}, "onlyInHashFile": {"file3"}, "common": {"file4"}}
+        fileInFolders : dict[str, set[str]] = {"": {"file1", "file5"}, "onlyInRootDir": {"file6"}, "common": {"file4"}}
+        
+        missingInHashFileNotInDir : dict[str, set[str]]
+        missingInDirNotInHashFile : dict[str, set[str]]
+        error : Exception | None
+        missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenRelativeTrees(mapOfFileByFolder, fileInFolders)
+        self.assertIsNone(error)
+        
+        # same results of the trees of Path objects
+        expectedMissingInHashFileNotInDir : dict[Path, set[Path]]
+        expectedMissingInDirNotInHashFile : dict[Path, set[Path]]
+        expectedMissingInHashFileNotInDir, expectedMissingInDirNotInHashFile, error = checkDifferencesBetweenTrees(relativeTreeToPaths(vRoot, mapOfFileByFolder), relativeTreeToPaths(vRoot, fileInFolders))
+        self.assertIsNone(error)
+        self.assertEqual(relativeTreeToPaths(vRoot, missingInHashFileNotInDir), expectedMissingInHashFileNotInDir)
+        self.assertEqual(relativeTreeToPaths(vRoot, missingInDirNotInHashFile), expectedMissingInDirNotInHashFile)
+        
+        missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkDifferencesBetweenRelativeTrees(None, dict())
+        self.assertIsNotNone(error)
+        return None
 
 
 if __name__ == '__main__':
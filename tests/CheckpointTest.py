@@ -0,0 +1,57 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+from checkpointUtils import Checkpoint, openCheckpoint
+
+class CheckpointTest(unittest.TestCase):
+
+    def test_missing_state_file(self) -> None:
+        checkpoint : Checkpoint | None
+        error : Exception | None
+        checkpoint, error = openCheckpoint(None, "", False)
+        self.assertIsNone(checkpoint)
+        self.assertIsNotNone(error)
+        return None
+
+    def test_resume(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            stateFile : Path = Path(tmpdir).joinpath("state.sqlite")
+
+            checkpoint : Checkpoint | None
+            error : Exception | None
+            checkpoint, error = openCheckpoint(stateFile, "options", False)
+            self.assertIsNone(error)
+            assert checkpoint is not None
+            checkpoint.store("/root/a.md5", b"output of a")
+            checkpoint.close()
+
+            # resuming with the same options, the checked hash files are kept
+            checkpoint, error = openCheckpoint(stateFile, "options", True)
+            self.assertIsNone(error)
+            assert checkpoint is not None
+            self.assertEqual(checkpoint.load(), {"/root/a.md5": b"output of a"})
+            checkpoint.close()
+
+            # resuming with other options fails, starting a new check discards the previous one
+            checkpoint, error = openCheckpoint(stateFile, "other options", True)
+            self.assertIsNone(checkpoint)
+            self.assertIsNotNone(error)
+
+            checkpoint, error = openCheckpoint(stateFile, "other options", False)
+            self.assertIsNone(error)
+            assert checkpoint is not None
+            self.assertEqual(checkpoint.load(), {})
+            checkpoint.close()
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
@@ -0,0 +1,50 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import json
+import subprocess
+import unittest
+
+class ConfigTest(unittest.TestCase):
+
+    def runInitLogger(self, environment: dict[str, str], workingDirectory: str) -> subprocess.CompletedProcess[str]:
+        """
+        Initialize the logger in a new process, so the logger of the tests isn't changed, and log a debug and a warning record
+        """
+        script : str = "import sys, logging; from config import initLogger; initLogger(); logging.getLogger('test').debug('debug record'); logging.getLogger('test').warning('warning record'); print('yaml' in sys.modules)"
+        return subprocess.run([sys.executable, "-c", script], env={**os.environ, "PYTHONPATH": os.path.abspath(os.path.join(testdir, srcdir)), **environment}, cwd=workingDirectory, capture_output=True, text=True)
+
+    def test_quiet_profile(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            result : subprocess.CompletedProcess[str] = self.runInitLogger({"LOGGER_CONFIG": "", "LOGGER_LEVEL": ""}, tmpdir)
+            self.assertEqual(result.returncode, 0)
+            self.assertEqual(result.stdout.strip(), "False")
+            self.assertIn("warning record", result.stderr)
+            self.assertNotIn("debug record", result.stderr)
+            self.assertEqual(list(Path(tmpdir).iterdir()), [])
+
+            result = self.runInitLogger({"LOGGER_CONFIG": "", "LOGGER_LEVEL": "debug"}, tmpdir)
+            self.assertIn("debug record", result.stderr)
+        return None
+
+    def test_json_config(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            configFile : Path = Path(tmpdir).joinpath("logger.json")
+            configFile.write_text(json.dumps({"version": 1, "handlers": {"file": {"class": "logging.FileHandler", "filename": "test.log"}}, "root": {"handlers": ["file"], "level": "DEBUG"}}))
+
+            result : subprocess.CompletedProcess[str] = self.runInitLogger({"LOGGER_CONFIG": str(configFile)}, tmpdir)
+            self.assertEqual(result.returncode, 0)
+            self.assertEqual(result.stdout.strip(), "False")
+            self.assertIn("debug record", Path(tmpdir).joinpath("test.log").read_text())
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
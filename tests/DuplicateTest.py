@@ -0,0 +1,74 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import hashlib
+import unittest
+from duplicateUtils import findDuplicateFiles, measureDuplicateFiles
+
+def writeFile(filename: Path, content: str) -> None:
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    filename.write_text(content)
+    return None
+
+
+def writeHashFile(filename: Path, algorithm: str, files: list[str]) -> None:
+    filename.write_text("".join(f"{hashlib.new(algorithm, filename.parent.joinpath(name).read_bytes()).hexdigest()}  {name}\n" for name in files))
+    return None
+
+
+class DuplicateTest(unittest.TestCase):
+
+    def test_find_duplicate_files(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            writeFile(rootFolder.joinpath("album1/photo.jpg"), "photo" * 100)
+            writeFile(rootFolder.joinpath("album1/other.jpg"), "other")
+            writeFile(rootFolder.joinpath("album1/sub/same.jpg"), "photo" * 100)
+            writeFile(rootFolder.joinpath("album2/copy.jpg"), "photo" * 100)
+            writeFile(rootFolder.joinpath("album2/empty.txt"), "")
+            writeFile(rootFolder.joinpath("album2/lost.txt"), "lost")
+            writeFile(rootFolder.joinpath("album3/empty.txt"), "")
+            writeFile(rootFolder.joinpath("album3/lost.txt"), "lost")
+            writeFile(rootFolder.joinpath("album4/other.jpg"), "other")
+            os.link(rootFolder.joinpath("album1/other.jpg"), rootFolder.joinpath("album1/link.jpg"))
+
+            # the subfolder is listed by the hash file of its parent folder and by its own hash file
+            writeHashFile(rootFolder.joinpath("album1/album1.md5"), "md5", ["photo.jpg", "other.jpg", "link.jpg", "sub/same.jpg"])
+            writeHashFile(rootFolder.joinpath("album1/sub/sub.md5"), "md5", ["same.jpg"])
+            writeHashFile(rootFolder.joinpath("album2/album2.md5"), "md5", ["copy.jpg", "empty.txt", "lost.txt"])
+            writeHashFile(rootFolder.joinpath("album3/album3.md5"), "md5", ["empty.txt", "lost.txt"])
+            # the same content with another algorithm isn't compared
+            writeHashFile(rootFolder.joinpath("album4/album4.sha1"), "sha1", ["other.jpg"])
+            rootFolder.joinpath("album3/lost.txt").unlink()
+
+            duplicates : dict[str, list[Path]]
+            error : Exception | None
+            duplicates, error = findDuplicateFiles(sorted(rootFolder.glob("**/*.md5")) + [rootFolder.joinpath("album4/album4.sha1"), rootFolder.joinpath("missing.md5")])
+            self.assertIsInstance(error, FileNotFoundError)
+
+            photoDigest : str = "md5:" + hashlib.md5(("photo" * 100).encode()).hexdigest()
+            self.assertEqual(duplicates, {
+                photoDigest: [rootFolder.joinpath("album1/photo.jpg"), rootFolder.joinpath("album1/sub/same.jpg"), rootFolder.joinpath("album2/copy.jpg")],
+                "md5:" + hashlib.md5(b"other").hexdigest(): [rootFolder.joinpath("album1/other.jpg"), rootFolder.joinpath("album1/link.jpg")],
+                "md5:" + hashlib.md5(b"").hexdigest(): [rootFolder.joinpath("album2/empty.txt"), rootFolder.joinpath("album3/empty.txt")],
+                "md5:" + hashlib.md5(b"lost").hexdigest(): [rootFolder.joinpath("album2/lost.txt"), rootFolder.joinpath("album3/lost.txt")],
+            })
+
+            # the hard links and the files removed aren't copies, the empty files waste no bytes
+            groups : list[tuple[str, int, list[Path]]] = measureDuplicateFiles(duplicates)
+            self.assertEqual(groups, [
+                (photoDigest, 500, [rootFolder.joinpath("album1/photo.jpg"), rootFolder.joinpath("album1/sub/same.jpg"), rootFolder.joinpath("album2/copy.jpg")]),
+                ("md5:" + hashlib.md5(b"").hexdigest(), 0, [rootFolder.joinpath("album2/empty.txt"), rootFolder.joinpath("album3/empty.txt")]),
+            ])
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
@@ -0,0 +1,74 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+from hashfileUtils import loadHashFile
+from manifestUtils import HashManifest, loadHashManifest
+
+class HashManifestTest(unittest.TestCase):
+
+    def test_empty_manifest(self) -> None:
+        manifest : HashManifest = HashManifest()
+        self.assertEqual(len(manifest), 0)
+        self.assertNotIn("photo.jpg", manifest)
+        self.assertIsNone(manifest.get("photo.jpg"))
+        self.assertEqual(list(manifest.folderItems("")), [])
+        return None
+
+    def test_invalid_hash(self) -> None:
+        manifest : HashManifest = HashManifest()
+        manifest.add("photo.jpg", "d41d8cd98f00b204e9800998ecf8427e")
+        with self.assertRaises(ValueError):
+            manifest.add("photo2.jpg", "not an hash")
+        with self.assertRaises(ValueError):
+            manifest.add("photo3.jpg", "d41d8cd9")
+        self.assertEqual(len(manifest), 1)
+        return None
+
+    def test_load_hash_manifest(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            hashFile : Path = Path(tmpdir).joinpath("root.md5")
+            hashFile.write_bytes(
+                b"900150983cd24fb0d6963f7d28e17f72  album/b.jpg\n"
+                b"d41d8cd98f00b204e9800998ecf8427e  photo.jpg\n"
+                b"c4ca4238a0b923820dcc509a6f75849b  album/a.jpg\n"
+                b"c81e728d9d4c2f636f067f89cc14862c  album/b.jpg\n"
+            )
+
+            fileAndHashes : dict[str, str]
+            error : Exception | None
+            fileAndHashes, error = loadHashFile(hashFile)
+            self.assertIsNone(error)
+
+            manifest : HashManifest
+            manifest, error = loadHashManifest(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(len(manifest), 4)
+            self.assertEqual(manifest.folders, ["album", ""])
+
+            filepath : str
+            for filepath in fileAndHashes:
+                self.assertIn(filepath, manifest)
+                self.assertEqual(manifest[filepath], fileAndHashes[filepath])
+            self.assertNotIn("album/c.jpg", manifest)
+            with self.assertRaises(KeyError):
+                manifest["missing/photo.jpg"]
+
+            self.assertEqual(list(manifest.folderItems("album")), [
+                ("a.jpg", "c4ca4238a0b923820dcc509a6f75849b"),
+                ("b.jpg", "900150983cd24fb0d6963f7d28e17f72"),
+                ("b.jpg", "c81e728d9d4c2f636f067f89cc14862c"),
+            ])
+            self.assertEqual([filepath for filepath, hash in manifest.items()], ["album/b.jpg", "photo.jpg", "album/a.jpg", "album/b.jpg"])
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
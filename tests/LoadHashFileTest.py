@@ -0,0 +1,105 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+from hashfileUtils import loadHashFile, iterHashFile, splitHashFileItemsByFolder, hashFileAlgorithm
+
+class LoadHashFileTest(unittest.TestCase):
+
+    def test_missing_hash_file(self) -> None:
+        fileAndHashes : dict[str, str]
+        error : Exception | None
+        fileAndHashes, error = loadHashFile(Path("virtualFolder/missing.md5"))
+        self.assertIsNotNone(error)
+        self.assertEqual(len(fileAndHashes), 0)
+
+        mapOfFileByFolder : dict[Path, set[Path]]
+        mapOfFileByFolder, error = splitHashFileItemsByFolder(Path("virtualFolder/missing.md5"))
+        self.assertIsNotNone(error)
+        self.assertEqual(len(mapOfFileByFolder), 0)
+        return None
+
+    def test_load_hash_file(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir)
+            hashFile : Path = vRoot.joinpath("root.md5")
+            hashFile.write_bytes(
+                b"d41d8cd98f00b204e9800998ecf8427e  photo.jpg\r\n"
+                b"\n"
+                b"900150983cd24fb0d6963f7d28e17f72  album/two  spaces.jpg\n"
+                b"c4ca4238a0b923820dcc509a6f75849b  album/last.jpg"
+            )
+
+            rows : list[tuple[str, str]] = list(iterHashFile(hashFile))
+            self.assertEqual(rows, [
+                ("photo.jpg", "d41d8cd98f00b204e9800998ecf8427e"),
+                ("album/two  spaces.jpg", "900150983cd24fb0d6963f7d28e17f72"),
+                ("album/last.jpg", "c4ca4238a0b923820dcc509a6f75849b"),
+            ])
+
+            fileAndHashes : dict[str, str]
+            error : Exception | None
+            fileAndHashes, error = loadHashFile(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(fileAndHashes, dict(rows))
+
+            mapOfFileByFolder : dict[Path, set[Path]]
+            mapOfFileByFolder, error = splitHashFileItemsByFolder(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(mapOfFileByFolder, {
+                vRoot: {vRoot.joinpath("photo.jpg")},
+                vRoot.joinpath("album"): {vRoot.joinpath("album/two  spaces.jpg"), vRoot.joinpath("album/last.jpg")},
+            })
+        return None
+
+    def test_bsd_rows_and_algorithms(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir)
+            hashFile : Path = vRoot.joinpath("root.list")
+            hashFile.write_bytes(
+                b"SHA256 (photo.jpg) = 87428fc522803d31065e7bce3cf03fe475096631e5e07bbd7a0fde60c4cf25c7\n"
+                b"SHA256 (album/with (parenthesis) = 2.jpg) = 87428fc522803d31065e7bce3cf03fe475096631e5e07bbd7a0fde60c4cf25c7\n"
+            )
+
+            self.assertEqual(list(iterHashFile(hashFile)), [
+                ("photo.jpg", "87428fc522803d31065e7bce3cf03fe475096631e5e07bbd7a0fde60c4cf25c7"),
+                ("album/with (parenthesis) = 2.jpg", "87428fc522803d31065e7bce3cf03fe475096631e5e07bbd7a0fde60c4cf25c7"),
+            ])
+
+            algorithm : str
+            error : Exception | None
+            algorithm, error = hashFileAlgorithm(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(algorithm, "sha256")
+
+            # the extension wins over the content
+            algorithm, error = hashFileAlgorithm(vRoot.joinpath("missing.b2"))
+            self.assertIsNone(error)
+            self.assertEqual(algorithm, "blake2b")
+
+            hashFile.write_text("da39a3ee5e6b4b0d3255bfef95601890afd80709  empty.txt\n")
+            algorithm, error = hashFileAlgorithm(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(algorithm, "sha1")
+
+            # 128 digits are both sha512 and blake2b
+            hashFile.write_text(f"{'0' * 128}  empty.txt\n")
+            algorithm, error = hashFileAlgorithm(hashFile)
+            self.assertIsInstance(error, ValueError)
+
+            hashFile.write_text(f"SHA512 (empty.txt) = {'0' * 128}\n")
+            algorithm, error = hashFileAlgorithm(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(algorithm, "sha512")
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
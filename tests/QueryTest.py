@@ -0,0 +1,149 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+from unittest.mock import MagicMock, patch
+from urllib.request import Request, urlopen
+from http.client import HTTPConnection
+import json
+import unittest
+from watchUtils import TreeIndex
+from queryUtils import QueryServer, answerQueries, startQueryServer
+from digestUtils import verifyHashFile
+
+def writeFile(filename: Path, content: str) -> None:
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    filename.write_text(content)
+    return None
+
+
+class QueryTest(unittest.TestCase):
+
+    def buildIndex(self, rootFolder: Path) -> TreeIndex:
+        # the digest of "one" and a wrong digest of "two"
+        writeFile(rootFolder.joinpath("a/one.txt"), "one")
+        writeFile(rootFolder.joinpath("a/two.txt"), "two")
+        writeFile(rootFolder.joinpath("a/a.md5"), "f97c5d29941bfb1b2fdab0874906ab82  one.txt\nd41d8cd98f00b204e9800998ecf8427e  two.txt\nd41d8cd98f00b204e9800998ecf8427e  lost.txt\n")
+        writeFile(rootFolder.joinpath("a/b/three.txt"), "three")
+        writeFile(rootFolder.joinpath("c/four.txt"), "four")
+
+        index : TreeIndex = TreeIndex(rootFolder)
+        self.assertIsNone(index.build())
+        index.refreshDifferences()
+        return index
+
+    def test_queries(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            index : TreeIndex = self.buildIndex(rootFolder)
+            hashFile : str = str(rootFolder.joinpath("a/a.md5"))
+
+            answers : Any = answerQueries(index, [
+                {"query": "search"},
+                {"query": "search", "folder": "a"},
+                {"query": "random_hash_file", "folder": "c"},
+                {"query": "differences", "hash_file": "a/a.md5"},
+                {"query": "verify", "hash_file": hashFile},
+                {"query": "status"},
+            ])
+
+            self.assertEqual(answers[0]["result"], {"hash_files": [hashFile], "missing_hash_files": [str(rootFolder), str(rootFolder.joinpath("a/b")), str(rootFolder.joinpath("c"))]})
+            self.assertEqual(answers[1]["result"], {"hash_files": [hashFile], "missing_hash_files": [str(rootFolder.joinpath("a/b"))]})
+            self.assertIsNone(answers[2]["result"])
+            self.assertEqual(sorted((difference["status"], difference["path"]) for difference in answers[3]["result"][hashFile]), [
+                ("missing_in_directory", str(rootFolder.joinpath("a/lost.txt"))),
+                ("missing_in_hash_file", str(rootFolder.joinpath("a/b/three.txt"))),
+            ])
+            self.assertEqual(answers[4]["result"], {"ok": 1, "mismatched": [str(rootFolder.joinpath("a/two.txt"))], "unreadable": [str(rootFolder.joinpath("a/lost.txt"))]})
+            self.assertEqual(answers[5]["result"], {"root": str(rootFolder), "folders": 4, "hash_files": 1, "missing_hash_files": 3, "hash_files_with_differences": 1})
+        return None
+
+    def test_invalid_queries(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            index : TreeIndex = self.buildIndex(rootFolder)
+
+            answers : Any = answerQueries(index, [
+                {"query": "unknown"},
+                {"name": "status"},
+                {"query": "search", "folder": "../"},
+                {"query": "search", "folder": "/"},
+                {"query": "search", "folder": "missing"},
+                {"query": "verify", "hash_file": "c/four.txt"},
+                {"query": "verify", "hash_file": "a/a.md5", "workers": 0},
+                {"query": "verify", "hash_file": "a/a.md5", "workers": [2]},
+                {"query": "verify", "hash_file": "a/a.md5", "workers": None},
+            ])
+
+            self.assertEqual([answer["query"] for answer in answers], ["unknown", None, "search", "search", "search", "verify", "verify", "verify", "verify"])
+            answer : dict[str, Any]
+            for answer in answers:
+                self.assertNotIn("result", answer)
+                self.assertIsInstance(answer["error"], str)
+        return None
+
+    def test_verify_workers(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            index : TreeIndex = self.buildIndex(rootFolder)
+
+            # the workers asked by the query are capped to the ones of the server
+            verifyMock : MagicMock
+            with patch("queryUtils.verifyHashFile", wraps=verifyHashFile) as verifyMock:
+                answers : Any = answerQueries(index, [
+                    {"query": "verify", "hash_file": "a/a.md5", "workers": 64},
+                    {"query": "verify", "hash_file": "a/a.md5"},
+                ], maxWorkers=2)
+
+            self.assertEqual(answers[0]["result"]["ok"], 1)
+            self.assertEqual([verifyCall.args[1] for verifyCall in verifyMock.call_args_list], [2, 1])
+        return None
+
+    def test_server(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            index : TreeIndex = self.buildIndex(rootFolder)
+
+            server : QueryServer | None
+            error : Exception | None
+            server, error = startQueryServer(index, port=0)
+            self.assertIsNone(error)
+            assert server is not None
+
+            try:
+                url : str = f"http://127.0.0.1:{server.server_address[1]}/"
+                with urlopen(f"{url}search?folder=a") as response:
+                    self.assertEqual(json.load(response)["result"]["hash_files"], [str(rootFolder.joinpath("a/a.md5"))])
+
+                request : Request = Request(url, data=json.dumps([{"query": "status"}, {"query": "random_hash_file"}]).encode())
+                with urlopen(request) as response:
+                    answers : Any = json.load(response)
+                self.assertEqual(answers[0]["result"]["hash_files"], 1)
+                self.assertEqual(answers[1]["result"], str(rootFolder.joinpath("a/a.md5")))
+
+                # a Content-Length that isn't a size is a bad request
+                length : str
+                for length in ("abc", "-1"):
+                    connection : HTTPConnection = HTTPConnection("127.0.0.1", server.server_address[1])
+                    try:
+                        connection.putrequest("POST", "/")
+                        connection.putheader("Content-Length", length)
+                        connection.endheaders()
+                        self.assertEqual(connection.getresponse().status, 400)
+                    finally:
+                        connection.close()
+            finally:
+                server.shutdown()
+                server.server_close()
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
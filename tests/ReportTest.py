@@ -0,0 +1,134 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from io import StringIO
+from contextlib import redirect_stdout
+import json
+import unittest
+from hashfileUtils import ONLY_IN_FIRST, ONLY_IN_SECOND, iterTreeDifferences, iterSortedDifferences, listHashFileDifferences, checkHashFileRows, printDifferencesBetweenTrees
+from fileUtils import loadRelativeFileTree, relativeTreeToPaths
+from reportUtils import ReportWriter, writeDifferences, MISSING_IN_DIR, MISSING_IN_HASH_FILE
+
+class ReportTest(unittest.TestCase):
+
+    def test_tree_differences(self) -> None:
+        mapOfFileByFolder : dict[str, set[str]] = {"": {"file1", "file2"}, "onlyInHashFile": {"file3"}, "common": {"file4"}}
+        fileInFolders : dict[str, set[str]] = {"": {"file1", "file5"}, "onlyInRootDir": {"file6"}, "common": {"file4"}}
+
+        differences : list[tuple[int, str]] = list(iterTreeDifferences(mapOfFileByFolder, fileInFolders))
+        self.assertEqual(differences, [
+            (ONLY_IN_FIRST, "file2"),
+            (ONLY_IN_SECOND, "file5"),
+            (ONLY_IN_FIRST, "onlyInHashFile/file3"),
+            (ONLY_IN_SECOND, "onlyInRootDir/file6"),
+        ])
+        return None
+
+    def test_same_differences_of_sorted_merge(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir)
+            vRoot.joinpath("album").mkdir()
+            vRoot.joinpath("album/photo.jpg").write_bytes(b"photo")
+            vRoot.joinpath("new.txt").write_bytes(b"new")
+            hashFile : Path = vRoot.joinpath("root.md5")
+            hashFile.write_text("d41d8cd98f00b204e9800998ecf8427e  album/photo.jpg\nd41d8cd98f00b204e9800998ecf8427e  lost/file.txt\n")
+
+            fileInFolders : dict[str, set[str]]
+            error : Exception | None
+            fileInFolders, error = loadRelativeFileTree(vRoot)
+            self.assertIsNone(error)
+
+            differences : list[tuple[int, str]]
+            differences, error = listHashFileDifferences(hashFile, fileInFolders)
+            self.assertIsNone(error)
+            self.assertEqual(sorted(differences), sorted(iterSortedDifferences(hashFile)))
+
+            differences, error = listHashFileDifferences(vRoot.joinpath("missing.md5"), fileInFolders)
+            self.assertIsNotNone(error)
+        return None
+
+    def test_same_sides_of_text_and_report(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir)
+            vRoot.joinpath("album/new").mkdir(parents=True)
+            vRoot.joinpath("album/photo.jpg").write_bytes(b"photo")
+            vRoot.joinpath("album/new/added.jpg").write_bytes(b"added")
+            hashFile : Path = vRoot.joinpath("root.md5")
+            # a folder only in the hash file and a folder only in the root folder
+            hashFile.write_text("d41d8cd98f00b204e9800998ecf8427e  album/photo.jpg\nd41d8cd98f00b204e9800998ecf8427e  lost/file.txt\n")
+
+            fileInFolders : dict[str, set[str]]
+            error : Exception | None
+            fileInFolders, error = loadRelativeFileTree(vRoot)
+            self.assertIsNone(error)
+
+            missingInHashFileNotInDir : dict[str, set[str]]
+            missingInDirNotInHashFile : dict[str, set[str]]
+            missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkHashFileRows(hashFile, fileInFolders)
+            self.assertIsNone(error)
+            self.assertEqual(missingInHashFileNotInDir, {"lost": {"file.txt"}})
+            self.assertEqual(missingInDirNotInHashFile, {"album/new": {"added.jpg"}})
+
+            text : StringIO = StringIO()
+            with redirect_stdout(text):
+                printDifferencesBetweenTrees(relativeTreeToPaths(vRoot, missingInHashFileNotInDir), relativeTreeToPaths(vRoot, missingInDirNotInHashFile))
+            self.assertEqual(text.getvalue(), f"Files in directory but NOT in hash file:\n{vRoot.joinpath('album/new')}\n\t added.jpg\nFiles in hash file but NOT in the root directory:\n{vRoot.joinpath('lost')}\n\t file.txt\n")
+
+            differences : list[tuple[int, str]]
+            differences, error = listHashFileDifferences(hashFile, fileInFolders)
+            self.assertIsNone(error)
+            stream : StringIO = StringIO()
+            report : ReportWriter
+            with ReportWriter("jsonl", stream) as report:
+                writeDifferences(report, hashFile, differences)
+            self.assertEqual([json.loads(line) for line in stream.getvalue().splitlines()], [
+                {"hash_file": str(hashFile), "status": MISSING_IN_HASH_FILE, "path": str(vRoot.joinpath("album/new/added.jpg"))},
+                {"hash_file": str(hashFile), "status": MISSING_IN_DIR, "path": str(vRoot.joinpath("lost/file.txt"))},
+            ])
+        return None
+
+    def test_report_formats(self) -> None:
+        hashFile : Path = Path("root/root.md5")
+        differences : list[tuple[int, str]] = [(ONLY_IN_FIRST, "lost.txt"), (ONLY_IN_SECOND, "new,\nline.txt")]
+
+        stream : StringIO = StringIO()
+        report : ReportWriter
+        with ReportWriter("jsonl", stream) as report:
+            self.assertEqual(writeDifferences(report, hashFile, differences), 2)
+        self.assertEqual([json.loads(line) for line in stream.getvalue().splitlines()], [
+            {"hash_file": "root/root.md5", "status": MISSING_IN_DIR, "path": "root/lost.txt"},
+            {"hash_file": "root/root.md5", "status": MISSING_IN_HASH_FILE, "path": "root/new,\nline.txt"},
+        ])
+
+        stream = StringIO()
+        with ReportWriter("csv", stream) as report:
+            writeDifferences(report, hashFile, differences)
+        self.assertEqual(stream.getvalue(), f"hash_file,status,path\nroot/root.md5,{MISSING_IN_DIR},root/lost.txt\nroot/root.md5,{MISSING_IN_HASH_FILE},\"root/new,\nline.txt\"\n")
+
+        stream = StringIO()
+        with ReportWriter("nul", stream) as report:
+            writeDifferences(report, hashFile, differences)
+        self.assertEqual(stream.getvalue(), f"root/root.md5\0{MISSING_IN_DIR}\0root/lost.txt\0root/root.md5\0{MISSING_IN_HASH_FILE}\0root/new,\nline.txt\0")
+
+        # a path with a tab is parsed back splitting the fields on NUL
+        stream = StringIO()
+        with ReportWriter("nul", stream) as report:
+            writeDifferences(report, hashFile, [(ONLY_IN_SECOND, "tab\tname.txt")])
+        fields : list[str] = stream.getvalue().split("\0")
+        self.assertEqual(fields.pop(), "")
+        self.assertEqual([fields[index:index + 3] for index in range(0, len(fields), 3)], [["root/root.md5", MISSING_IN_HASH_FILE, "root/tab\tname.txt"]])
+
+        with self.assertRaises(ValueError):
+            ReportWriter("text", StringIO())
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
@@ -0,0 +1,209 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+from fileUtils import scanTree, scanRelativeTree, searchHashFiles, loadFileTree, sortFolders, sliceFileTree, sliceRelativeTree, loadFolderList
+from hashfileUtils import checkHashFileRows
+
+class ScanTreeTest(unittest.TestCase):
+
+    def test_missing_folder(self) -> None:
+        fileTree : dict[Path, set[Path]]
+        missingHashFiles : set[Path]
+        existentHashFiles : set[Path]
+        error : Exception | None
+        fileTree, missingHashFiles, existentHashFiles, error = scanTree(Path("virtualFolder/missing"))
+        self.assertIsNotNone(error)
+        self.assertEqual(len(fileTree), 0)
+        self.assertEqual(len(missingHashFiles), 0)
+        self.assertEqual(len(existentHashFiles), 0)
+        return None
+
+    def test_scan_tree(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir)
+            vAlbum : Path = vRoot.joinpath("album")
+            vAlbum.joinpath("empty.dir").mkdir(parents=True)
+            vAlbum.joinpath("photo.jpg").write_bytes(b"")
+            vAlbum.joinpath("album.md5").write_bytes(b"")
+            vRoot.joinpath("README").write_bytes(b"")
+
+            fileTree : dict[Path, set[Path]]
+            missingHashFiles : set[Path]
+            existentHashFiles : set[Path]
+            error : Exception | None
+            fileTree, missingHashFiles, existentHashFiles, error = scanTree(vRoot)
+            self.assertIsNone(error)
+            self.assertEqual(fileTree, {
+                vRoot: set(),
+                vAlbum: {vAlbum.joinpath("photo.jpg"), vAlbum.joinpath("album.md5")},
+                vAlbum.joinpath("empty.dir"): set(),
+            })
+            self.assertEqual(missingHashFiles, {vRoot, vAlbum.joinpath("empty.dir")})
+            self.assertEqual(existentHashFiles, {vAlbum.joinpath("album.md5")})
+
+            searchResult : tuple[set[Path], set[Path], Exception | None] = searchHashFiles(vRoot)
+            self.assertEqual(searchResult, (missingHashFiles, existentHashFiles, None))
+
+            loadResult : tuple[dict[Path, set[Path]], Exception | None] = loadFileTree(vRoot)
+            self.assertEqual(loadResult, (fileTree, None))
+
+            relativeResult : tuple[dict[str, set[str]], set[str], set[str], Exception | None] = scanRelativeTree(vRoot)
+            self.assertEqual(relativeResult, ({"": set(), "album": {"photo.jpg", "album.md5"}, "album/empty.dir": set()}, {"", "album/empty.dir"}, {"album/album.md5"}, None))
+
+            # the files without an extension are collected on request
+            ignoredFiles : set[str] = set()
+            relativeResult = scanRelativeTree(vRoot, ignoredFiles=ignoredFiles)
+            self.assertIsNone(relativeResult[3])
+            self.assertEqual(ignoredFiles, {"README"})
+        return None
+
+    def test_scan_tree_with_workers(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir).joinpath("root")
+            folder : int
+            for folder in range(20):
+                vFolder : Path = vRoot.joinpath(f"album{folder}", "sub")
+                vFolder.mkdir(parents=True)
+                vFolder.joinpath("photo.jpg").write_bytes(b"")
+            cacheFile : Path = Path(tmpdir).joinpath("cache.sqlite")
+
+            expected : tuple[dict[str, set[str]], set[str], set[str], Exception | None] = scanRelativeTree(vRoot)
+            result : tuple[dict[str, set[str]], set[str], set[str], Exception | None] = scanRelativeTree(vRoot, cacheFile, workers=4)
+            self.assertEqual(result, expected)
+            self.assertEqual(list(result[0].keys()), list(expected[0].keys()))
+
+            result = scanRelativeTree(vRoot, cacheFile, workers=4)
+            self.assertEqual(result, expected)
+
+            result = scanRelativeTree(vRoot, workers=0)
+            self.assertIsNotNone(result[3])
+        return None
+
+    def test_scan_tree_with_cache(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir).joinpath("root")
+            vAlbum : Path = vRoot.joinpath("album")
+            vAlbum.mkdir(parents=True)
+            vAlbum.joinpath("photo.jpg").write_bytes(b"")
+            cacheFile : Path = Path(tmpdir).joinpath("cache.sqlite")
+
+            fileTree : dict[Path, set[Path]]
+            error : Exception | None
+            fileTree, error = loadFileTree(vRoot, cacheFile)
+            self.assertIsNone(error)
+            self.assertEqual(fileTree, {vRoot: set(), vAlbum: {vAlbum.joinpath("photo.jpg")}})
+
+            # an unchanged folder is loaded from the cache, a changed folder is listed again
+            fileTree, error = loadFileTree(vRoot, cacheFile)
+            self.assertIsNone(error)
+            self.assertEqual(fileTree, {vRoot: set(), vAlbum: {vAlbum.joinpath("photo.jpg")}})
+
+            vAlbum.joinpath("photo2.jpg").write_bytes(b"")
+            os.utime(vAlbum, ns=(0, 1))
+            fileTree, error = loadFileTree(vRoot, cacheFile)
+            self.assertIsNone(error)
+            self.assertEqual(fileTree, {vRoot: set(), vAlbum: {vAlbum.joinpath("photo.jpg"), vAlbum.joinpath("photo2.jpg")}})
+        return None
+
+    def test_slice_file_tree(self) -> None:
+        vRoot : Path = Path("root")
+        vAlbum : Path = Path("root/album")
+        vSubAlbum : Path = Path("root/album/sub")
+        vOther : Path = Path("root/album2")
+        fileTree : dict[Path, set[Path]] = {
+            vRoot: set(),
+            vAlbum: {Path("root/album/photo.jpg")},
+            vOther: {Path("root/album2/photo.jpg")},
+            vSubAlbum: set(),
+        }
+
+        sortedFolders : list[Path] = sortFolders(fileTree)
+        subTree : dict[Path, set[Path]]
+        error : Exception | None
+        subTree, error = sliceFileTree(fileTree, sortedFolders, vAlbum)
+        self.assertIsNone(error)
+        self.assertEqual(subTree, {vAlbum: fileTree[vAlbum], vSubAlbum: set()})
+
+        subTree, error = sliceFileTree(fileTree, sortedFolders, vRoot)
+        self.assertIsNone(error)
+        self.assertEqual(subTree, fileTree)
+
+        subTree, error = sliceFileTree(fileTree, sortedFolders, Path("root/missing"))
+        self.assertIsNotNone(error)
+        self.assertEqual(len(subTree), 0)
+        return None
+
+    def test_slice_relative_tree(self) -> None:
+        fileTree : dict[str, set[str]] = {
+            "": set(),
+            "album": {"photo.jpg"},
+            "album2": {"photo.jpg"},
+            "album/sub": set(),
+        }
+        sortedFolders : list[str] = sorted(fileTree, key=lambda folder: tuple(folder.split("/")))
+
+        subTree : dict[str, set[str]]
+        error : Exception | None
+        subTree, error = sliceRelativeTree(fileTree, sortedFolders, "album")
+        self.assertIsNone(error)
+        self.assertEqual(subTree, {"": {"photo.jpg"}, "sub": set()})
+
+        subTree, error = sliceRelativeTree(fileTree, sortedFolders, "")
+        self.assertIsNone(error)
+        self.assertEqual(subTree, fileTree)
+
+        subTree, error = sliceRelativeTree(fileTree, sortedFolders, "missing")
+        self.assertIsNotNone(error)
+        return None
+
+    def test_batch_of_roots(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir).joinpath("root")
+            vRoot.joinpath("album").mkdir(parents=True)
+            vRoot.joinpath("album/photo.jpg").write_bytes(b"photo")
+            vRoot.joinpath("album/new.jpg").write_bytes(b"new")
+            vRoot.joinpath("album/album.md5").write_text("d41d8cd98f00b204e9800998ecf8427e  photo.jpg\nd41d8cd98f00b204e9800998ecf8427e  lost.jpg\n")
+            rootsFile : Path = Path(tmpdir).joinpath("roots.txt")
+            rootsFile.write_text(f"# roots to check\n{vRoot}\n\n{vRoot.joinpath('album')}\n")
+
+            rootFolders : list[Path]
+            error : Exception | None
+            rootFolders, error = loadFolderList(rootsFile)
+            self.assertIsNone(error)
+            self.assertEqual(rootFolders, [vRoot, vRoot.joinpath("album")])
+
+            rootFolders, error = loadFolderList(Path(tmpdir).joinpath("missing.txt"))
+            self.assertIsNotNone(error)
+
+            fileTree : dict[str, set[str]]
+            missingHashFiles : set[str]
+            existentHashFiles : set[str]
+            fileTree, missingHashFiles, existentHashFiles, error = scanRelativeTree(vRoot)
+            self.assertIsNone(error)
+
+            fileInFolders : dict[str, set[str]]
+            fileInFolders, error = sliceRelativeTree(fileTree, sorted(fileTree), "album")
+            self.assertIsNone(error)
+
+            missingInHashFileNotInDir : dict[str, set[str]]
+            missingInDirNotInHashFile : dict[str, set[str]]
+            missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkHashFileRows(vRoot.joinpath("album/album.md5"), fileInFolders)
+            self.assertIsNone(error)
+            self.assertEqual(missingInHashFileNotInDir, {"": {"lost.jpg"}})
+            self.assertEqual(missingInDirNotInHashFile, {"": {"new.jpg"}})
+
+            missingInHashFileNotInDir, missingInDirNotInHashFile, error = checkHashFileRows(vRoot.joinpath("missing.md5"), fileInFolders)
+            self.assertIsNotNone(error)
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
@@ -0,0 +1,63 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+import hashfileUtils
+from fileUtils import iterSortedFileTree
+from hashfileUtils import mergeSortedStreams, iterSortedHashFile, iterSortedDifferences, relativePathKey, ONLY_IN_FIRST, IN_BOTH, ONLY_IN_SECOND
+
+class SortedDifferencesTest(unittest.TestCase):
+
+    def test_merge_sorted_streams(self) -> None:
+        merged : list[tuple[int, str]] = list(mergeSortedStreams(["a", "b", "d"], ["b", "c", "d", "e"], relativePathKey))
+        self.assertEqual(merged, [(ONLY_IN_FIRST, "a"), (IN_BOTH, "b"), (ONLY_IN_SECOND, "c"), (IN_BOTH, "d"), (ONLY_IN_SECOND, "e")])
+
+        self.assertEqual(list(mergeSortedStreams([], ["a"], relativePathKey)), [(ONLY_IN_SECOND, "a")])
+        self.assertEqual(list(mergeSortedStreams(["a"], [], relativePathKey)), [(ONLY_IN_FIRST, "a")])
+        return None
+
+    def test_sorted_differences(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir)
+            vRoot.joinpath("a").mkdir()
+            vRoot.joinpath("a/x.jpg").write_bytes(b"")
+            vRoot.joinpath("a.jpg").write_bytes(b"")
+            vRoot.joinpath("b.jpg").write_bytes(b"")
+            hashFile : Path = vRoot.joinpath("root.md5")
+            # an unsorted hash file, with a "./" prefix like the output of find
+            hashFile.write_bytes(
+                b"d41d8cd98f00b204e9800998ecf8427e  ./c.jpg\n"
+                b"d41d8cd98f00b204e9800998ecf8427e  ./a/x.jpg\n"
+                b"d41d8cd98f00b204e9800998ecf8427e  ./a.jpg\n"
+            )
+
+            self.assertEqual(list(iterSortedFileTree(vRoot)), ["a/x.jpg", "a.jpg", "b.jpg", "root.md5"])
+            self.assertEqual(list(iterSortedHashFile(hashFile)), ["a/x.jpg", "a.jpg", "c.jpg"])
+            self.assertEqual(list(iterSortedDifferences(hashFile)), [(ONLY_IN_SECOND, "b.jpg"), (ONLY_IN_FIRST, "c.jpg")])
+        return None
+
+    def test_external_sort(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            hashFile : Path = Path(tmpdir).joinpath("root.md5")
+            # an unsorted hash file, with duplicated rows in different runs
+            names : list[str] = [f"f{index % 7}/n{(index * 37) % 50}.jpg" for index in range(100)]
+            hashFile.write_text("".join(f"d41d8cd98f00b204e9800998ecf8427e  ./{name}\n" for name in names))
+
+            savedRunSize : int = hashfileUtils.SORT_RUN_SIZE
+            hashfileUtils.SORT_RUN_SIZE = 8
+            try:
+                self.assertEqual(list(iterSortedHashFile(hashFile)), sorted(set(names), key=relativePathKey))
+            finally:
+                hashfileUtils.SORT_RUN_SIZE = savedRunSize
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
@@ -0,0 +1,69 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+import json
+import unittest
+from statsUtils import Stats, enableStats, disableStats, getStats, measureStage, addCounter, writeMetrics
+from fileUtils import scanRelativeTree
+
+class StatsTest(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        disableStats()
+        return None
+
+    def test_disabled_stats(self) -> None:
+        self.assertIsNone(getStats())
+        with measureStage("scan"):
+            addCounter("files_listed", 3)
+        self.assertIsNone(getStats())
+        return None
+
+    def test_stages_and_counters(self) -> None:
+        stats : Stats = enableStats()
+
+        # a stage nested in itself is timed once
+        with measureStage("parse"):
+            with measureStage("parse"):
+                addCounter("hash_file_bytes", 100)
+            addCounter("hash_file_bytes", 50)
+
+        metrics : dict[str, Any] = stats.metrics()
+        self.assertEqual(metrics["stages"]["parse"]["calls"], 1)
+        self.assertEqual(metrics["counters"], {"hash_file_bytes": 150})
+        self.assertGreater(metrics["rates"]["hash_file_bytes_per_second"], 0)
+        self.assertGreater(metrics["peak_rss_bytes"], 0)
+        return None
+
+    def test_scan_metrics(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir)
+            vRoot.joinpath("album").mkdir()
+            vRoot.joinpath("album", "photo.jpg").write_bytes(b"")
+            vRoot.joinpath("README.txt").write_bytes(b"")
+
+            stats : Stats = enableStats()
+            scanRelativeTree(vRoot)
+
+            metrics : dict[str, Any] = stats.metrics()
+            self.assertEqual(metrics["stages"]["scan"]["calls"], 1)
+            self.assertEqual(metrics["counters"]["folders_listed"], 2)
+            self.assertEqual(metrics["counters"]["files_listed"], 2)
+
+            metricsFile : Path = vRoot.joinpath("metrics.json")
+            error : Exception | None = writeMetrics(metricsFile, metrics)
+            self.assertIsNone(error)
+            self.assertEqual(json.loads(metricsFile.read_text())["counters"], metrics["counters"])
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
@@ -0,0 +1,87 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import hashlib
+import time
+import unittest
+from throttleUtils import Throttle, setThrottle, getThrottle, parseByteSize
+from digestUtils import computeFileHash
+
+class ThrottleTest(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        setThrottle()
+        return None
+
+    def test_parse_byte_size(self) -> None:
+        self.assertEqual(parseByteSize("512"), 512)
+        self.assertEqual(parseByteSize("50M"), 50 * 1024 * 1024)
+        self.assertEqual(parseByteSize("1.5k"), 1536)
+        self.assertEqual(parseByteSize("2GiB"), 2 * 1024 ** 3)
+        with self.assertRaises(ValueError):
+            parseByteSize("fast")
+        text : str
+        for text in ("inf", "1e400M", "nan", "-1"):
+            with self.assertRaises(ValueError):
+                parseByteSize(text)
+        return None
+
+    def test_rate_limits(self) -> None:
+        throttle : Throttle = Throttle(bytesPerSecond=1000, filesPerSecond=100)
+
+        start : float = time.monotonic()
+        # the third read starts after the time slots of the first two
+        throttle.read(50, 0)
+        throttle.read(50, 0)
+        throttle.read(50, 0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+        start = time.monotonic()
+        with throttle.openFile():
+            pass
+        with throttle.openFile():
+            pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.009)
+
+        with self.assertRaises(ValueError):
+            Throttle(bytesPerSecond=-1)
+        return None
+
+    def test_latency_backoff(self) -> None:
+        throttle : Throttle = Throttle(maxLatency=0.01)
+
+        throttle.read(0, 0.02)
+        throttle.read(0, 0.02)
+        self.assertEqual(throttle.slowdown, 4.0)
+
+        throttle.read(0, 0.001)
+        self.assertLess(throttle.slowdown, 4.0)
+        return None
+
+    def test_throttled_hash(self) -> None:
+        self.assertIsNone(setThrottle())
+        self.assertIsNone(getThrottle())
+        self.assertIsNotNone(setThrottle(bytesPerSecond=1024 * 1024 * 1024, maxOpenFiles=1, maxLatency=1))
+
+        with TemporaryDirectory() as tmpdir:
+            vFile : Path = Path(tmpdir).joinpath("file.txt")
+            content : bytes = os.urandom(300 * 1024)
+            vFile.write_bytes(content)
+
+            digest : str
+            error : Exception | None
+            digest, error = computeFileHash(vFile, chunkSize=4096)
+            self.assertIsNone(error)
+            self.assertEqual(digest, hashlib.md5(content).hexdigest())
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
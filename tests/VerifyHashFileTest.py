@@ -0,0 +1,252 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import hashlib
+import unittest
+from digestUtils import HASH_SMALL_FILE_SIZE, HASH_CHUNK_SIZE, computeFileHash, computeFileHashes, verifyHashFile, generateHashFiles, updateHashFile, sampleHashFiles
+from hashfileUtils import loadHashFile, iterSortedDifferences
+from fileUtils import scanRelativeTree, groupSubtreeFiles
+
+class VerifyHashFileTest(unittest.TestCase):
+
+    def test_missing_hash_file(self) -> None:
+        okFiles : set[Path]
+        mismatchedFiles : set[Path]
+        unreadableFiles : set[Path]
+        error : Exception | None
+        okFiles, mismatchedFiles, unreadableFiles, error = verifyHashFile(Path("virtualFolder/missing.md5"))
+        self.assertIsNotNone(error)
+        self.assertEqual(len(okFiles), 0)
+        self.assertEqual(len(mismatchedFiles), 0)
+        self.assertEqual(len(unreadableFiles), 0)
+        return None
+
+    def test_compute_file_hash(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vFile : Path = Path(tmpdir).joinpath("file.txt")
+            vFile.write_bytes(b"content")
+
+            digest : str
+            error : Exception | None
+            digest, error = computeFileHash(vFile, chunkSize=3)
+            self.assertIsNone(error)
+            self.assertEqual(digest, hashlib.md5(b"content").hexdigest())
+
+            # files read in blocks, the last one partially filled
+            size : int
+            for size in (HASH_SMALL_FILE_SIZE + 1, HASH_CHUNK_SIZE * 2 + 1):
+                content : bytes = os.urandom(size)
+                vFile.write_bytes(content)
+                digest, error = computeFileHash(vFile, "sha256")
+                self.assertIsNone(error)
+                self.assertEqual(digest, hashlib.sha256(content).hexdigest())
+        return None
+
+    def test_verify_hash_file(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vFolder : Path = Path(tmpdir)
+            vFolder.joinpath("ok.txt").write_bytes(b"ok")
+            vFolder.joinpath("changed.txt").write_bytes(b"changed")
+            hashFile : Path = vFolder.joinpath("folder.md5")
+            hashFile.write_text(
+                f"{hashlib.md5(b'ok').hexdigest()}  ok.txt\n"
+                f"{hashlib.md5(b'original').hexdigest()}  changed.txt\n"
+                f"{hashlib.md5(b'lost').hexdigest()}  lost.txt\n"
+            )
+
+            okFiles : set[Path]
+            mismatchedFiles : set[Path]
+            unreadableFiles : set[Path]
+            error : Exception | None
+            okFiles, mismatchedFiles, unreadableFiles, error = verifyHashFile(hashFile, workers=2)
+            self.assertIsNone(error)
+            self.assertEqual(okFiles, {vFolder.joinpath("ok.txt")})
+            self.assertEqual(mismatchedFiles, {vFolder.joinpath("changed.txt")})
+            self.assertEqual(unreadableFiles, {vFolder.joinpath("lost.txt")})
+        return None
+
+    def test_digest_cache(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vFile : Path = Path(tmpdir).joinpath("file.txt")
+            vFile.write_bytes(b"content")
+            cacheFile : Path = Path(tmpdir).joinpath("cache.sqlite")
+
+            results : list[tuple[str, Exception | None]]
+            error : Exception | None
+            results, error = computeFileHashes([vFile], cacheFile=cacheFile)
+            self.assertIsNone(error)
+            self.assertEqual(results, [(hashlib.md5(b"content").hexdigest(), None)])
+
+            # the unreadable file is not read, its digest comes from the cache
+            mode : int = vFile.stat().st_mode
+            vFile.chmod(0)
+            try:
+                results, error = computeFileHashes([vFile], cacheFile=cacheFile)
+                self.assertIsNone(error)
+                self.assertEqual(results, [(hashlib.md5(b"content").hexdigest(), None)])
+
+                # an expired digest is computed again reading the file
+                results, error = computeFileHashes([vFile], cacheFile=cacheFile, reverifyAge=-1)
+                self.assertIsNone(error)
+                if os.geteuid() != 0:
+                    self.assertIsNotNone(results[0][1])
+            finally:
+                vFile.chmod(mode)
+        return None
+
+    def test_generate_hash_files(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vFolder : Path = Path(tmpdir).joinpath("album")
+            vFolder.mkdir()
+            vFolder.joinpath("photo.jpg").write_bytes(b"photo")
+            vFolder.joinpath("two  spaces.jpg").write_bytes(b"spaces")
+            vMissing : Path = Path(tmpdir).joinpath("missing")
+            vMissing.mkdir()
+
+            writtenHashFiles : set[Path]
+            failedFolders : set[Path]
+            error : Exception | None
+            writtenHashFiles, failedFolders, error = generateHashFiles({vFolder: ["photo.jpg", "two  spaces.jpg"], vMissing: ["lost.jpg"]}, workers=2)
+            self.assertIsNone(error)
+            self.assertEqual(writtenHashFiles, {vFolder.joinpath("album.md5")})
+            self.assertEqual(failedFolders, {vMissing})
+            self.assertEqual(sorted(os.listdir(vMissing)), [])
+
+            fileAndHashes : dict[str, str]
+            fileAndHashes, error = loadHashFile(vFolder.joinpath("album.md5"))
+            self.assertIsNone(error)
+            self.assertEqual(fileAndHashes, {"photo.jpg": hashlib.md5(b"photo").hexdigest(), "two  spaces.jpg": hashlib.md5(b"spaces").hexdigest()})
+
+            okFiles : set[Path]
+            mismatchedFiles : set[Path]
+            unreadableFiles : set[Path]
+            okFiles, mismatchedFiles, unreadableFiles, error = verifyHashFile(vFolder.joinpath("album.md5"))
+            self.assertIsNone(error)
+            self.assertEqual(len(okFiles), 2)
+
+            # the hash file of another algorithm gets its extension, the algorithm is detected verifying it
+            writtenHashFiles, failedFolders, error = generateHashFiles({vFolder: ["photo.jpg"]}, algorithm="blake2b")
+            self.assertIsNone(error)
+            self.assertEqual(writtenHashFiles, {vFolder.joinpath("album.b2")})
+            okFiles, mismatchedFiles, unreadableFiles, error = verifyHashFile(vFolder.joinpath("album.b2"))
+            self.assertIsNone(error)
+            self.assertEqual(okFiles, {vFolder.joinpath("photo.jpg")})
+
+            writtenHashFiles, failedFolders, error = generateHashFiles({vFolder: ["photo.jpg"]}, algorithm="unknown")
+            self.assertIsNotNone(error)
+        return None
+
+    def test_generate_then_check(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vRoot : Path = Path(tmpdir)
+            vRoot.joinpath("album/sub").mkdir(parents=True)
+            vRoot.joinpath("root.jpg").write_bytes(b"root")
+            vRoot.joinpath("album/photo.jpg").write_bytes(b"photo")
+            vRoot.joinpath("album/sub/deep.jpg").write_bytes(b"deep")
+
+            fileTree : dict[str, set[str]]
+            error : Exception | None
+            fileTree, _, _, error = scanRelativeTree(vRoot)
+            self.assertIsNone(error)
+
+            # the hash file of each folder lists its whole sub-tree, with the hash files of its subfolders
+            groups : dict[str, list[str]] = groupSubtreeFiles(fileTree, {"", "album", "album/sub"})
+            writtenHashFiles : set[Path]
+            failedFolders : set[Path]
+            writtenHashFiles, failedFolders, error = generateHashFiles({vRoot.joinpath(folder): filepaths for folder, filepaths in groups.items()})
+            self.assertIsNone(error)
+            self.assertEqual(failedFolders, set())
+            self.assertEqual(len(writtenHashFiles), 3)
+
+            hashFile : Path
+            for hashFile in writtenHashFiles:
+                self.assertEqual(list(iterSortedDifferences(hashFile)), [])
+                okFiles : set[Path]
+                mismatchedFiles : set[Path]
+                unreadableFiles : set[Path]
+                okFiles, mismatchedFiles, unreadableFiles, error = verifyHashFile(hashFile)
+                self.assertIsNone(error)
+                self.assertEqual(mismatchedFiles | unreadableFiles, set())
+        return None
+
+    def test_update_hash_file(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vFolder : Path = Path(tmpdir)
+            vFolder.joinpath("kept.jpg").write_bytes(b"kept")
+            vFolder.joinpath("new.jpg").write_bytes(b"new")
+            vFolder.joinpath("sub").mkdir()
+            vFolder.joinpath("sub/sub.md5").write_text("")
+            hashFile : Path = vFolder.joinpath("folder.md5")
+            # the row of the kept file isn't verified, its hash is kept as it is
+            hashFile.write_text("00000000000000000000000000000000  kept.jpg\n00000000000000000000000000000001  gone.jpg\n")
+
+            addedFiles : set[Path]
+            removedFiles : set[Path]
+            unreadableFiles : set[Path]
+            error : Exception | None
+            addedFiles, removedFiles, unreadableFiles, error = updateHashFile(hashFile, workers=2)
+            self.assertIsNone(error)
+            self.assertEqual(addedFiles, {vFolder.joinpath("new.jpg")})
+            self.assertEqual(removedFiles, {vFolder.joinpath("gone.jpg")})
+            self.assertEqual(len(unreadableFiles), 0)
+            self.assertEqual(hashFile.read_text(), f"00000000000000000000000000000000  kept.jpg\n{hashlib.md5(b'new').hexdigest()}  new.jpg\n")
+
+            addedFiles, removedFiles, unreadableFiles, error = updateHashFile(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(len(addedFiles) + len(removedFiles), 0)
+
+            # the rows in the BSD format keep their text, the row of ./kept.jpg lists kept.jpg, the new rows get the same format
+            vFolder.joinpath("gone.jpg").write_bytes(b"gone")
+            hashFile.write_text("MD5 (./kept.jpg) = 00000000000000000000000000000000\nMD5 (new.jpg) = 00000000000000000000000000000001\n")
+            addedFiles, removedFiles, unreadableFiles, error = updateHashFile(hashFile)
+            self.assertIsNone(error)
+            self.assertEqual(addedFiles, {vFolder.joinpath("gone.jpg")})
+            self.assertEqual(len(removedFiles), 0)
+            self.assertEqual(hashFile.read_text(), f"MD5 (./kept.jpg) = 00000000000000000000000000000000\nMD5 (new.jpg) = 00000000000000000000000000000001\nMD5 (gone.jpg) = {hashlib.md5(b'gone').hexdigest()}\n")
+
+            addedFiles, removedFiles, unreadableFiles, error = updateHashFile(vFolder.joinpath("missing.md5"))
+            self.assertIsNotNone(error)
+        return None
+
+    def test_sample_hash_files(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            vFolder : Path = Path(tmpdir)
+            hashFiles : list[Path] = []
+            index : int
+            for index in range(4):
+                vFolder.joinpath(f"file{index}.txt").write_bytes(b"x" * 10)
+                hashFiles.append(vFolder.joinpath(f"folder{index}.md5"))
+                hashFiles[index].write_text(f"{hashlib.md5(b'x' * 10).hexdigest()}  file{index}.txt\n")
+
+            # the hash files never checked come first, then the ones checked longer ago
+            checkedAt : dict[str, float] = {str(hashFiles[0]): 200.0, str(hashFiles[1]): 100.0}
+
+            sample : list[Path]
+            error : Exception | None
+            sample, error = sampleHashFiles(hashFiles, checkedAt, fraction=0.75)
+            self.assertIsNone(error)
+            self.assertEqual(sample, [hashFiles[2], hashFiles[3], hashFiles[1]])
+
+            sample, error = sampleHashFiles(hashFiles, checkedAt, byteBudget=25)
+            self.assertIsNone(error)
+            self.assertEqual(sample, [hashFiles[2], hashFiles[3]])
+
+            # at least one hash file, even over the budget
+            sample, error = sampleHashFiles(hashFiles, checkedAt, byteBudget=1)
+            self.assertIsNone(error)
+            self.assertEqual(sample, [hashFiles[2]])
+
+            sample, error = sampleHashFiles(hashFiles, checkedAt)
+            self.assertIsNotNone(error)
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
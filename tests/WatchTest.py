@@ -0,0 +1,109 @@
+# Path configuration for unit test
+import sys, os
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+from config import initLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import json
+import shutil
+import unittest
+from hashfileUtils import ONLY_IN_FIRST, ONLY_IN_SECOND
+from watchUtils import TreeIndex, PollingWatcher, InotifyWatcher, writeIndexState
+
+def writeFile(filename: Path, content: str) -> None:
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    filename.write_text(content)
+    return None
+
+
+class WatchTest(unittest.TestCase):
+
+    def buildTree(self, rootFolder: Path) -> TreeIndex:
+        writeFile(rootFolder.joinpath("a/one.txt"), "one")
+        writeFile(rootFolder.joinpath("a/b/two.txt"), "two")
+        writeFile(rootFolder.joinpath("a/a.md5"), "d41d8cd98f00b204e9800998ecf8427e  one.txt\nd41d8cd98f00b204e9800998ecf8427e  b/two.txt\n")
+        writeFile(rootFolder.joinpath("c/three.txt"), "three")
+
+        index : TreeIndex = TreeIndex(rootFolder)
+        self.assertIsNone(index.build())
+        index.refreshDifferences()
+        return index
+
+    def test_build(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            index : TreeIndex = self.buildTree(rootFolder)
+
+            self.assertEqual(sorted(index.folders()), ["", "a", "a/b", "c"])
+            self.assertEqual(index.missingHashFileFolders(), [rootFolder, rootFolder.joinpath("a/b"), rootFolder.joinpath("c")])
+            self.assertEqual(index.hashFileDifferences(), {rootFolder.joinpath("a/a.md5"): []})
+        return None
+
+    def test_update_folders(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            index : TreeIndex = self.buildTree(rootFolder)
+
+            # a new folder without hash files, a file missing in the hash file, a subtree removed and an hash file added
+            writeFile(rootFolder.joinpath("a/new/deep/four.jpg"), "four")
+            writeFile(rootFolder.joinpath("a/five.txt"), "five")
+            shutil.rmtree(rootFolder.joinpath("a/b"))
+            writeFile(rootFolder.joinpath("c/c.md5"), "d41d8cd98f00b204e9800998ecf8427e  three.txt\nd41d8cd98f00b204e9800998ecf8427e  lost.txt\n")
+
+            addedFolders : set[str]
+            removedFolders : set[str]
+            addedFolders, removedFolders = index.updateFolders({"a", "a/b", "c"})
+            self.assertEqual(addedFolders, {"a/new", "a/new/deep"})
+            self.assertEqual(removedFolders, {"a/b"})
+            self.assertEqual(index.missingHashFileFolders(), [rootFolder, rootFolder.joinpath("a/new"), rootFolder.joinpath("a/new/deep")])
+
+            changedDifferences : dict[str, list[tuple[int, str]]] = index.refreshDifferences()
+            self.assertEqual(changedDifferences, {"a/a.md5": [], "c/c.md5": []})
+            self.assertEqual(sorted(index.differences["a/a.md5"], key=lambda difference: difference[1]),
+                             [(ONLY_IN_FIRST, "b/two.txt"), (ONLY_IN_SECOND, "five.txt"), (ONLY_IN_SECOND, "new/deep/four.jpg")])
+            self.assertEqual(sorted(index.differences["c/c.md5"]), [(ONLY_IN_FIRST, "lost.txt")])
+
+            # nothing changed, nothing to check
+            self.assertEqual(index.refreshDifferences(), {})
+
+            stateFile : Path = rootFolder.joinpath("state.json")
+            self.assertIsNone(writeIndexState(stateFile, index))
+            state : dict[str, object] = json.loads(stateFile.read_text())
+            self.assertEqual(state["missing_hash_files"], [str(rootFolder), str(rootFolder.joinpath("a/new")), str(rootFolder.joinpath("a/new/deep"))])
+        return None
+
+    def test_polling_watcher(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            index : TreeIndex = self.buildTree(rootFolder)
+            watcher : PollingWatcher = PollingWatcher(index, 0.01)
+
+            self.assertEqual(watcher.waitChanges(), set())
+            writeFile(rootFolder.joinpath("c/six.txt"), "six")
+            self.assertEqual(watcher.waitChanges(), {"c"})
+            watcher.close()
+        return None
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is available only on Linux")
+    def test_inotify_watcher(self) -> None:
+        with TemporaryDirectory() as folder:
+            rootFolder : Path = Path(folder)
+            index : TreeIndex = self.buildTree(rootFolder)
+            watcher : InotifyWatcher = InotifyWatcher(index)
+
+            try:
+                # an hash file written in place and a new folder
+                writeFile(rootFolder.joinpath("a/a.md5"), "d41d8cd98f00b204e9800998ecf8427e  one.txt\n")
+                rootFolder.joinpath("a/b/new").mkdir()
+                self.assertEqual(watcher.waitChanges(), {"a", "a/b"})
+            finally:
+                watcher.close()
+        return None
+
+
+if __name__ == '__main__':
+    initLogger()
+    unittest.main()
@@ -0,0 +1,182 @@
+from config import initLogger
+from threading import Lock, BoundedSemaphore
+from contextlib import contextmanager
+from typing import Iterator
+import math
+import time
+import logging
+
+# the highest slowdown applied when the latency of the reads is over the limit
+MAX_SLOWDOWN : float = 64.0
+
+# multipliers of the slowdown when the latency of a read is over the limit, and when it's under the limit
+SLOWDOWN_INCREASE : float = 2.0
+SLOWDOWN_DECREASE : float = 0.9
+
+# suffixes of the sizes accepted by parseByteSize
+SIZE_SUFFIXES : dict[str, int] = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+class Throttle:
+    """
+    Scheduler limiting the load of the scan and of the hashing of the files on the storage
+
+    The limits, each one disabled by a zero value, are:
+      bytesPerSecond : the bytes read per second
+      filesPerSecond : the files opened, or the folders listed, per second
+      maxOpenFiles   : the files open, or the folders being listed, at the same time
+      maxLatency     : the latency, in seconds, of a read; when a read is slower, the following reads are slowed down
+                       by a pause proportional to their latency, doubled at each slow read and reduced at each fast read
+
+    The rates are enforced by giving to each operation a time slot, so that the operations are spread over time instead of being done in bursts.
+    A throttle can be shared by several threads.
+    """
+
+    def __init__(self, bytesPerSecond: float = 0, filesPerSecond: float = 0, maxOpenFiles: int = 0, maxLatency: float = 0) -> None:
+        if bytesPerSecond < 0 or filesPerSecond < 0 or maxOpenFiles < 0 or maxLatency < 0:
+            raise ValueError("expected limits greater or equal to zero")
+
+        self.bytesPerSecond : float = bytesPerSecond
+        self.filesPerSecond : float = filesPerSecond
+        self.maxOpenFiles : int = maxOpenFiles
+        self.maxLatency : float = maxLatency
+        self.lock : Lock = Lock()
+        self.openFiles : BoundedSemaphore | None = BoundedSemaphore(maxOpenFiles) if maxOpenFiles > 0 else None
+        # the time when the next byte and the next file can be read
+        self.nextByteTime : float = 0.0
+        self.nextFileTime : float = 0.0
+        self.slowdown : float = 1.0
+
+    def limits(self) -> tuple[float, float, int, float]:
+        """
+        Return the limits of the throttle, as the arguments of its constructor
+        """
+        return self.bytesPerSecond, self.filesPerSecond, self.maxOpenFiles, self.maxLatency
+
+    def split(self, parts: int) -> tuple[float, float, int, float]:
+        """
+        Return the limits of a throttle in each of several processes, so that together they respect the limits of this throttle
+        """
+        return self.bytesPerSecond / parts, self.filesPerSecond / parts, max(1, self.maxOpenFiles // parts) if self.maxOpenFiles > 0 else 0, self.maxLatency
+
+    @contextmanager
+    def openFile(self) -> Iterator[None]:
+        """
+        Wait until a file can be opened, respecting the files per second and the open files limits, and hold the open file slot until the context exits
+        """
+        if self.openFiles is not None:
+            self.openFiles.acquire()
+        try:
+            if self.filesPerSecond > 0:
+                self.waitSlot(1 / self.filesPerSecond, isFile=True)
+            yield None
+        finally:
+            if self.openFiles is not None:
+                self.openFiles.release()
+
+    def read(self, size: int, latency: float) -> None:
+        """
+        Account a read of the given size and latency, waiting as needed to respect the bytes per second limit and to back off when the storage is slow
+
+        Parameters
+        ----------
+        size : int
+            The number of bytes read
+        latency : float
+            The time, in seconds, spent reading them
+        """
+        if self.bytesPerSecond > 0:
+            self.waitSlot(size / self.bytesPerSecond, isFile=False)
+
+        if self.maxLatency > 0:
+            pause : float
+            with self.lock:
+                if latency > self.maxLatency:
+                    self.slowdown = min(self.slowdown * SLOWDOWN_INCREASE, MAX_SLOWDOWN)
+                else:
+                    self.slowdown = max(self.slowdown * SLOWDOWN_DECREASE, 1.0)
+                pause = latency * (self.slowdown - 1)
+            if pause > 0:
+                time.sleep(pause)
+
+    def waitSlot(self, duration: float, isFile: bool) -> None:
+        """
+        Reserve the next time slot of the given duration for the bytes or for the files, and wait until it starts
+        """
+        now : float = time.monotonic()
+        start : float
+        with self.lock:
+            if isFile:
+                start = max(now, self.nextFileTime)
+                self.nextFileTime = start + duration
+            else:
+                start = max(now, self.nextByteTime)
+                self.nextByteTime = start + duration
+        if start > now:
+            time.sleep(start - now)
+
+
+# the throttle of the scan and of the hashing in this process, None to disable the throttling
+currentThrottle : Throttle | None = None
+
+def setThrottle(bytesPerSecond: float = 0, filesPerSecond: float = 0, maxOpenFiles: int = 0, maxLatency: float = 0) -> Throttle | None:
+    """
+    Set the throttle of the scan and of the hashing in this process
+
+    The function can be the initializer of a pool of processes, with the limits of Throttle.split as arguments.
+
+    Parameters
+    ----------
+    bytesPerSecond : float
+        The bytes read per second, 0 for no limit
+    filesPerSecond : float
+        The files opened, or the folders listed, per second, 0 for no limit
+    maxOpenFiles : int
+        The files open, or the folders being listed, at the same time, 0 for no limit
+    maxLatency : float
+        The latency, in seconds, of a read over which the reads are slowed down, 0 for no limit
+
+    Returns
+    -------
+    Throttle | None
+        The throttle, None if all the limits are disabled
+
+    Raises
+    ------
+    ValueError
+        if a limit is less than zero
+    """
+    global currentThrottle
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    if bytesPerSecond == 0 and filesPerSecond == 0 and maxOpenFiles == 0 and maxLatency == 0:
+        currentThrottle = None
+    else:
+        currentThrottle = Throttle(bytesPerSecond, filesPerSecond, maxOpenFiles, maxLatency)
+        logger.debug(f"throttling to {bytesPerSecond} bytes/s, {filesPerSecond} files/s, {maxOpenFiles} open files, {maxLatency} s latency")
+
+    return currentThrottle
+
+
+def getThrottle() -> Throttle | None:
+    """
+    Return the throttle of the scan and of the hashing in this process, None if the throttling is disabled
+    """
+    return currentThrottle
+
+
+def parseByteSize(text: str) -> int:
+    """
+    Parse a size in bytes, with an optional suffix K, M, G or T (powers of 1024), like 50M
+
+    Raises
+    ------
+    ValueError
+        if the text isn't a valid size
+    """
+    text = text.strip().upper().removesuffix("B").removesuffix("I")
+    suffix : str = text[-1:] if text[-1:] in SIZE_SUFFIXES else ""
+    size : float = float(text[:len(text) - len(suffix)]) * SIZE_SUFFIXES[suffix]
+    if not math.isfinite(size) or size < 0:
+        raise ValueError(f"expected a finite size greater or equal to zero: {text}")
+    return int(size)
@@ -0,0 +1,216 @@
+from argparse import ArgumentParser
+from pathlib import Path
+import sys
+import signal
+from config import initLogger
+from statsUtils import startInstrumentation
+import logging
+from hashfileUtils import ONLY_IN_FIRST
+from watchUtils import DEFAULT_POLL_INTERVAL, TreeIndex, InotifyWatcher, PollingWatcher, openWatcher, writeIndexState
+from queryUtils import DEFAULT_QUERY_HOST, DEFAULT_QUERY_WORKERS, QueryServer, startQueryServer
+
+def printChanges(index: TreeIndex, previousMissingHashFiles: set[Path], changedDifferences: dict[str, list[tuple[int, str]]]) -> set[Path]:
+    """
+    Print the folders that lost or got an hash file and the differences of the hash files that appeared or were resolved
+
+    Returns
+    -------
+    set[Path]
+        The folders without hash files
+    """
+    missingHashFiles : set[Path] = set(index.missingHashFileFolders())
+
+    folder : Path
+    for folder in sorted(missingHashFiles - previousMissingHashFiles):
+        print(f"missing hash file in folder: {folder}")
+    for folder in sorted(previousMissingHashFiles - missingHashFiles):
+        print(f"hash file found in folder: {folder}")
+
+    hashFile : str
+    previousDifferences : list[tuple[int, str]]
+    for hashFile, previousDifferences in changedDifferences.items():
+        rootFolder : Path = index.rootFolder.joinpath(hashFile).parent
+        differences : set[tuple[int, str]] = set(index.differences.get(hashFile, []))
+        side : int
+        filepath : str
+        for side, filepath in sorted(differences - set(previousDifferences), key=lambda difference: difference[1]):
+            if side == ONLY_IN_FIRST:
+                print(f"in hash file but NOT in the root directory: {rootFolder.joinpath(filepath)}")
+            else:
+                print(f"in directory but NOT in hash file: {rootFolder.joinpath(filepath)}")
+        for side, filepath in sorted(set(previousDifferences) - differences, key=lambda difference: difference[1]):
+            print(f"resolved difference of hash file {index.rootFolder.joinpath(hashFile)}: {rootFolder.joinpath(filepath)}")
+
+    sys.stdout.flush()
+    return missingHashFiles
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(prog='watchHashFiles', allow_abbrev=False, description="watch a folder, keeping current the folders without hash files and the differences between each hash file and its folder")
+    arg_parser.add_argument(
+            "-f",               # short parameter name
+            "--folder",         # long parameter name
+            type=Path,          # argument type
+            required=True,
+            action="store",     # store the value in memory
+            metavar='folder',   # displayed name (in help messages)
+            help="Option to select the folder to watch."
+        )
+    arg_parser.add_argument(
+            "--polling",        # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to poll the folders for changes even where the changes are notified by the kernel (inotify), i.e. on network file systems."
+        )
+    arg_parser.add_argument(
+            "--poll-interval",  # long parameter name
+            type=float,         # argument type
+            required=False,
+            default=DEFAULT_POLL_INTERVAL,
+            action="store",     # store the value in memory
+            metavar='seconds',  # displayed name (in help messages)
+            help="Option to select the interval, in seconds, between two polls of the folders."
+        )
+    arg_parser.add_argument(
+            "--state-file",     # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='state',    # displayed name (in help messages)
+            help="Option to write, after each change, a JSON file with the folders without hash files and the differences of each hash file."
+        )
+    arg_parser.add_argument(
+            "--query-port",     # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='port',     # displayed name (in help messages)
+            help="Option to answer the queries on the index (JSON over HTTP, see queryUtils.answerQuery) on this port, like curl -s http://127.0.0.1:8765/random_hash_file."
+        )
+    arg_parser.add_argument(
+            "--query-host",     # long parameter name
+            type=str,           # argument type
+            required=False,
+            default=DEFAULT_QUERY_HOST,
+            action="store",     # store the value in memory
+            metavar='host',     # displayed name (in help messages)
+            help="Option to select the address answering the queries, localhost by default; use 0.0.0.0 inside a container publishing the port only on the localhost of the host."
+        )
+    arg_parser.add_argument(
+            "--query-workers",  # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=DEFAULT_QUERY_WORKERS,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the largest number of threads hashing the files of a verify query, the workers asked by a query are capped to it."
+        )
+    arg_parser.add_argument(
+            "--scan-workers",   # long parameter name
+            type=int,           # argument type
+            required=False,
+            default=1,
+            action="store",     # store the value in memory
+            metavar='workers',  # displayed name (in help messages)
+            help="Option to select the number of folders listed at the same time, useful on network file systems."
+        )
+    arg_parser.add_argument(
+            "--stats",          # long parameter name
+            required=False,
+            default=False,
+            action="store_true",# store the value in memory
+            help="Option to print on the standard error the wall and CPU time of each stage, the folders and the files listed per second, the bytes hashed and the peak memory."
+        )
+    arg_parser.add_argument(
+            "--profile",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='profile',  # displayed name (in help messages)
+            help="Option to profile the main thread with cProfile, dumping the statistics in a file readable by the pstats module."
+        )
+    arg_parser.add_argument(
+            "--metrics",        # long parameter name
+            type=Path,          # argument type
+            required=False,
+            default=None,
+            action="store",     # store the value in memory
+            metavar='metrics',  # displayed name (in help messages)
+            help="Option to write the statistics of the run, as with --stats, in a JSON file."
+        )
+    parsed_args = arg_parser.parse_args()
+
+    initLogger()
+
+    startInstrumentation(Path(__file__).stem, parsed_args.stats, parsed_args.profile, parsed_args.metrics)
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    # the service is stopped by SIGTERM like by Ctrl+C, exiting normally
+    signal.signal(signal.SIGTERM, lambda signalNumber, frame: sys.exit(0))
+
+    index : TreeIndex = TreeIndex(parsed_args.folder, parsed_args.scan_workers)
+    error : Exception | None = index.build()
+
+    if error is not None:
+        logger.error(f"Error scanning folder {parsed_args.folder}: {error}")
+        sys.exit(1)
+
+    watcher : InotifyWatcher | PollingWatcher = openWatcher(index, parsed_args.poll_interval, parsed_args.polling)
+    logger.info(f"watching {len(index.folders())} folders in {parsed_args.folder} with {type(watcher).__name__}")
+
+    missingHashFiles : set[Path] = printChanges(index, set(), index.refreshDifferences())
+
+    queryServer : QueryServer | None = None
+    if parsed_args.query_port is not None:
+        queryServer, error = startQueryServer(index, parsed_args.query_host, parsed_args.query_port, parsed_args.query_workers)
+        if error is not None:
+            watcher.close()
+            sys.exit(1)
+
+    try:
+        while True:
+            if parsed_args.state_file is not None:
+                writeIndexState(parsed_args.state_file, index)
+
+            changedFolders : set[str] | None = watcher.waitChanges()
+
+            if changedFolders is None:
+                # the changes were lost, the index is built again
+                logger.warning(f"changes of folder {parsed_args.folder} lost, scanning it again")
+                watcher.removeFolders(set(index.folders()))
+                error = index.build()
+                if error is not None:
+                    logger.error(f"Error scanning folder {parsed_args.folder}: {error}")
+                    sys.exit(1)
+                watcher.addFolders(set(index.folders()))
+            elif len(changedFolders) > 0:
+                addedFolders : set[str]
+                removedFolders : set[str]
+                addedFolders, removedFolders = index.updateFolders(changedFolders)
+                if "" not in index.files:
+                    logger.error(f"folder {parsed_args.folder} removed")
+                    sys.exit(1)
+                watcher.removeFolders(removedFolders)
+                try:
+                    watcher.addFolders(addedFolders)
+                except OSError as ex:
+                    # the limit of watches is reached by the new folders
+                    logger.warning(f"Can't watch the new folders with inotify, polling the folders every {parsed_args.poll_interval} seconds: {ex}")
+                    watcher.close()
+                    watcher = PollingWatcher(index, parsed_args.poll_interval)
+            else:
+                continue
+
+            missingHashFiles = printChanges(index, missingHashFiles, index.refreshDifferences())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if queryServer is not None:
+            queryServer.shutdown()
+            queryServer.server_close()
+        watcher.close()
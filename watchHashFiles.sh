@@ -0,0 +1,12 @@
+#!/bin/bash
+
+# PYTHONDONTWRITEBYTECODE=1 -> don't create the folder __pycache__ running python3
+# mypy --cache-dir=/dev/null -> don't create the folder __mypy_cache__ running mypy
+
+# the daemon runs until stopped with Ctrl+C or 'docker stop watchHashFiles', printing each change;
+# the state of the folder is kept current in the file watchState.json, next to this script,
+# and the queries are answered on the port 8765 of localhost (see queryHashFiles.sh)
+
+FOLDER_TO_CHECK="$HOME/SyncV2/AllDevices/Foto/"
+
+docker run -it --rm --name watchHashFiles -p 127.0.0.1:8765:8765 -v "$PWD":/usr/src/myapp -v "$FOLDER_TO_CHECK":"$FOLDER_TO_CHECK" -e PYTHONDONTWRITEBYTECODE=1 -w /usr/src/myapp python:3.10-slim /bin/bash -c "python /usr/src/myapp/watchHashFiles.py --folder $FOLDER_TO_CHECK --state-file /usr/src/myapp/watchState.json --query-port 8765 --query-host 0.0.0.0"
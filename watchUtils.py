@@ -0,0 +1,596 @@
+from config import initLogger
+from pathlib import Path
+from os import path, stat, stat_result, strerror, fsencode, replace, read, close
+from threading import RLock
+from typing import Any
+from fileUtils import HASH_FILE_EXTENSIONS, listFolder, scanRelativeTree
+from hashfileUtils import ONLY_IN_FIRST, listHashFileDifferences, relativePathKey
+from reportUtils import MISSING_IN_DIR, MISSING_IN_HASH_FILE
+import sys
+import json
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+
+# interval, in seconds, between two polls of the folders when the changes aren't notified by the kernel
+DEFAULT_POLL_INTERVAL : float = 60.0
+
+# time, in seconds, without notifications after which a burst of changes (i.e. a sync from a camera) is processed, and the longest wait for the end of a burst
+SETTLE_TIME : float = 0.5
+MAX_SETTLE_TIME : float = 5.0
+
+# flags of inotify(7)
+IN_CLOSE_WRITE : int = 0x00000008
+IN_MOVED_FROM : int = 0x00000040
+IN_MOVED_TO : int = 0x00000080
+IN_CREATE : int = 0x00000100
+IN_DELETE : int = 0x00000200
+IN_DELETE_SELF : int = 0x00000400
+IN_MOVE_SELF : int = 0x00000800
+IN_Q_OVERFLOW : int = 0x00004000
+IN_IGNORED : int = 0x00008000
+IN_ONLYDIR : int = 0x01000000
+IN_DONT_FOLLOW : int = 0x02000000
+IN_NONBLOCK : int = 0o4000
+IN_CLOEXEC : int = 0o2000000
+
+# the changes of a folder notified by inotify: its entries created, deleted, renamed or written (i.e. an hash file written in place)
+INOTIFY_FOLDER_MASK : int = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW
+
+# header of an inotify event: watch descriptor, mask, cookie and length of the name following the header
+INOTIFY_EVENT : struct.Struct = struct.Struct("iIII")
+
+# size of the buffer reading the inotify events
+INOTIFY_BUFFER_SIZE : int = 64 * 1024
+
+class TreeIndex:
+    """
+    Index of the file tree of a root folder, of its hash files and of the differences between each hash file and the tree of its folder
+
+    The index is built by a full scan (see fileUtils.scanRelativeTree), then it's kept current listing again only the folders that changed (see updateFolders):
+    a new subfolder is scanned, a subfolder removed is dropped with its subtree, and the hash files of the folder and of its parent folders are marked to check again.
+    The differences of the hash files marked are computed again by refreshDifferences, each one on the subtree of its folder, without listing the folders again.
+    The folders and the files are relative to the root folder, like in the trees of scanRelativeTree ("" is the root folder, "/" is the separator).
+    The index can be shared by several threads.
+    """
+
+    def __init__(self, rootFolder: Path, workers: int = 1) -> None:
+        self.rootFolder : Path = rootFolder
+        self.rootFolderName : str = str(rootFolder)
+        self.workers : int = workers
+        self.lock : RLock = RLock()
+        self.hashFileSuffixes : tuple[str, ...] = tuple(HASH_FILE_EXTENSIONS)
+        # each folder bound to the names of its files with an extension, of its subfolders and of its hash files
+        self.files : dict[str, set[str]] = {}
+        self.subfolders : dict[str, set[str]] = {}
+        self.hashFiles : dict[str, set[str]] = {}
+        # the folders without hash files
+        self.missingHashFiles : set[str] = set()
+        # each hash file bound to its differences, as returned by hashfileUtils.listHashFileDifferences, and the hash files to check again
+        self.differences : dict[str, list[tuple[int, str]]] = {}
+        self.changedHashFiles : set[str] = set()
+
+    def build(self) -> Exception | None:
+        """
+        Build the index scanning the whole tree of the root folder, and mark all the hash files to check
+
+        Returns
+        -------
+        Exception | None :
+            FileNotFoundError if the root folder is not a valid directory
+            OSError in case of error listing the root folder
+            None in case of success (no error happens)
+        """
+        with self.lock:
+            self.files = {}
+            self.subfolders = {}
+            self.hashFiles = {}
+            self.missingHashFiles = set()
+            self.differences = {}
+            self.changedHashFiles = set()
+            return self.scanSubtree("")
+
+    def scanSubtree(self, folder: str) -> Exception | None:
+        """
+        Scan a folder and its subfolders and add them to the index, marking their hash files and the hash files of the parent folders to check
+        """
+        logger : logging.Logger = logging.getLogger(__name__)
+
+        fileTree : dict[str, set[str]]
+        missingHashFiles : set[str]
+        existentHashFiles : set[str]
+        error : Exception | None
+        fileTree, missingHashFiles, existentHashFiles, error = scanRelativeTree(self.absoluteFolder(folder), workers=self.workers)
+
+        if error is not None:
+            logger.warning(f"Error scanning folder {self.absoluteFolder(folder)}: {error}")
+            return error
+
+        relativeFolder : str
+        for relativeFolder in fileTree:
+            fullFolder : str = joinRelativePath(folder, relativeFolder)
+            self.files[fullFolder] = fileTree[relativeFolder]
+            self.subfolders.setdefault(fullFolder, set())
+            self.hashFiles[fullFolder] = set()
+            if len(fullFolder) > 0:
+                parent : str
+                name : str
+                parent, separator, name = fullFolder.rpartition("/")
+                self.subfolders.setdefault(parent, set()).add(name)
+
+        for relativeFolder in missingHashFiles:
+            self.missingHashFiles.add(joinRelativePath(folder, relativeFolder))
+
+        relativeHashFile : str
+        for relativeHashFile in existentHashFiles:
+            hashFile : str = joinRelativePath(folder, relativeHashFile)
+            hashFileFolder : str
+            hashFileName : str
+            hashFileFolder, separator, hashFileName = hashFile.rpartition("/")
+            self.hashFiles[hashFileFolder].add(hashFileName)
+            self.changedHashFiles.add(hashFile)
+
+        self.markHashFiles(folder)
+        return None
+
+    def removeSubtree(self, folder: str) -> set[str]:
+        """
+        Remove a folder and its subfolders from the index, marking the hash files of the parent folders to check
+
+        Returns
+        -------
+        set[str]
+            The folders removed
+        """
+        removedFolders : set[str] = set()
+        foldersToRemove : list[str] = [folder]
+        while len(foldersToRemove) > 0:
+            currentFolder : str = foldersToRemove.pop()
+            subfolder : str
+            for subfolder in self.subfolders.pop(currentFolder, set()):
+                foldersToRemove.append(joinRelativePath(currentFolder, subfolder))
+            self.files.pop(currentFolder, None)
+            self.missingHashFiles.discard(currentFolder)
+            hashFileName : str
+            for hashFileName in self.hashFiles.pop(currentFolder, set()):
+                hashFile : str = joinRelativePath(currentFolder, hashFileName)
+                self.differences.pop(hashFile, None)
+                self.changedHashFiles.discard(hashFile)
+            removedFolders.add(currentFolder)
+
+        if len(folder) > 0:
+            parent : str
+            name : str
+            parent, separator, name = folder.rpartition("/")
+            self.subfolders.get(parent, set()).discard(name)
+            self.markHashFiles(parent)
+        return removedFolders
+
+    def updateFolders(self, folders: set[str]) -> tuple[set[str], set[str]]:
+        """
+        List again the folders changed and update the index
+
+        A folder that can't be listed anymore is removed with its subtree. The folders that aren't in the index are skipped:
+        they are new folders, scanned when their parent folder is listed again, or folders already removed.
+
+        Parameters
+        ----------
+        folders : set[str]
+            The relative folders changed
+
+        Returns
+        -------
+        tuple[set[str], set[str]]
+            The folders added to the index
+            The folders removed from the index
+        """
+        logger : logging.Logger = logging.getLogger(__name__)
+
+        addedFolders : set[str] = set()
+        removedFolders : set[str] = set()
+
+        with self.lock:
+            folder : str
+            # the parent folders first, so the subfolders removed by their parent aren't listed
+            for folder in sorted(folders, key=relativePathKey):
+                if folder not in self.files:
+                    continue
+
+                files : list[str]
+                subfolders : list[str]
+                error : Exception | None
+                files, subfolders, error = listFolder(str(self.absoluteFolder(folder)))
+
+                if error is not None:
+                    logger.debug(f"folder {folder} can't be listed anymore: {error}")
+                    removedFolders.update(self.removeSubtree(folder))
+                    continue
+
+                self.files[folder] = {name for name in files if "." in name}
+                hashFileNames : set[str] = {name for name in files if name.endswith(self.hashFileSuffixes)}
+                hashFileName : str
+                for hashFileName in self.hashFiles[folder] - hashFileNames:
+                    self.differences.pop(joinRelativePath(folder, hashFileName), None)
+                    self.changedHashFiles.discard(joinRelativePath(folder, hashFileName))
+                self.hashFiles[folder] = hashFileNames
+                if len(hashFileNames) > 0:
+                    self.missingHashFiles.discard(folder)
+                else:
+                    self.missingHashFiles.add(folder)
+                # an hash file of the folder can be written in place, without changing the names of the files
+                self.markHashFiles(folder)
+
+                # the subfolders are linked to the folder when they are scanned, and unlinked when they are removed
+                subfolder : str
+                for subfolder in self.subfolders[folder] - set(subfolders):
+                    removedFolders.update(self.removeSubtree(joinRelativePath(folder, subfolder)))
+                for subfolder in set(subfolders) - self.subfolders[folder]:
+                    newFolder : str = joinRelativePath(folder, subfolder)
+                    if self.scanSubtree(newFolder) is None:
+                        addedFolders.update(self.subtreeFolders(newFolder))
+
+        # a folder removed and created again between two updates is in the index
+        removedFolders = removedFolders - addedFolders
+        return addedFolders, removedFolders
+
+    def markHashFiles(self, folder: str) -> None:
+        """
+        Mark to check the hash files of a folder and of its parent folders, the hash files whose tree includes the folder
+        """
+        currentFolder : str | None = folder
+        while currentFolder is not None:
+            hashFileName : str
+            for hashFileName in self.hashFiles.get(currentFolder, set()):
+                self.changedHashFiles.add(joinRelativePath(currentFolder, hashFileName))
+            currentFolder = currentFolder.rpartition("/")[0] if len(currentFolder) > 0 else None
+
+    def subtreeFolders(self, folder: str) -> list[str]:
+        """
+        Return a folder and its subfolders in the index
+        """
+        subtree : list[str] = []
+        foldersToVisit : list[str] = [folder]
+        while len(foldersToVisit) > 0:
+            currentFolder : str = foldersToVisit.pop()
+            subtree.append(currentFolder)
+            subfolder : str
+            for subfolder in self.subfolders.get(currentFolder, set()):
+                foldersToVisit.append(joinRelativePath(currentFolder, subfolder))
+        return subtree
+
+    def relativeTree(self, folder: str) -> dict[str, set[str]]:
+        """
+        Return the tree of a folder in the index, with the folders relative to it, like fileUtils.scanRelativeTree would return for the folder
+        """
+        prefixLength : int = len(folder) + 1 if len(folder) > 0 else 0
+        return {currentFolder[prefixLength:]: self.files[currentFolder] for currentFolder in self.subtreeFolders(folder)}
+
+    def refreshDifferences(self) -> dict[str, list[tuple[int, str]]]:
+        """
+        Compute again the differences of the hash files marked to check
+
+        Returns
+        -------
+        dict[str, list[tuple[int, str]]]
+            The hash files whose differences changed, each one bound to its previous differences (empty for an hash file new in the index)
+        """
+        logger : logging.Logger = logging.getLogger(__name__)
+
+        changedDifferences : dict[str, list[tuple[int, str]]] = {}
+
+        with self.lock:
+            hashFile : str
+            for hashFile in sorted(self.changedHashFiles, key=relativePathKey):
+                hashFileFolder : str = hashFile.rpartition("/")[0]
+                differences : list[tuple[int, str]]
+                error : Exception | None
+                differences, error = listHashFileDifferences(self.rootFolder.joinpath(hashFile), self.relativeTree(hashFileFolder))
+                if error is not None:
+                    # the hash file is removed or being written, it's checked again at its next change
+                    logger.warning(f"Error checking the hash file {hashFile}: {error}")
+                    continue
+
+                previousDifferences : list[tuple[int, str]] | None = self.differences.get(hashFile)
+                if previousDifferences != differences:
+                    changedDifferences[hashFile] = previousDifferences if previousDifferences is not None else []
+                    self.differences[hashFile] = differences
+            self.changedHashFiles = set()
+
+        return changedDifferences
+
+    def folders(self) -> list[str]:
+        """
+        Return the folders in the index
+        """
+        with self.lock:
+            return list(self.files)
+
+    def missingHashFileFolders(self) -> list[Path]:
+        """
+        Return the folders without hash files, sorted
+        """
+        with self.lock:
+            return [self.rootFolder.joinpath(folder) for folder in sorted(self.missingHashFiles, key=relativePathKey)]
+
+    def hashFileDifferences(self) -> dict[Path, list[tuple[int, Path]]]:
+        """
+        Return each hash file bound to its differences, as the side (see hashfileUtils.iterTreeDifferences) and the path of each file
+        """
+        with self.lock:
+            result : dict[Path, list[tuple[int, Path]]] = {}
+            hashFile : str
+            for hashFile in sorted(self.differences, key=relativePathKey):
+                hashFilePath : Path = self.rootFolder.joinpath(hashFile)
+                result[hashFilePath] = [(side, hashFilePath.parent.joinpath(filepath)) for side, filepath in self.differences[hashFile]]
+            return result
+
+    def absoluteFolder(self, folder: str) -> Path:
+        return Path(path.join(self.rootFolderName, folder)) if len(folder) > 0 else self.rootFolder
+
+
+def joinRelativePath(folder: str, name: str) -> str:
+    """
+    Join a relative folder ("" for the root folder) and a relative path
+    """
+    if len(folder) == 0:
+        return name
+    if len(name) == 0:
+        return folder
+    return f"{folder}/{name}"
+
+
+class PollingWatcher:
+    """
+    Watcher of the changes of the folders of a tree index, polling the modification time of the folders and of the hash files
+
+    The modification time of a folder changes when a file is created, removed or renamed in it; the hash files are polled too, since they can be written in place.
+    """
+
+    def __init__(self, index: TreeIndex, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.index : TreeIndex = index
+        self.interval : float = interval
+        # each folder bound to the status of the folder and of its hash files, as modification times and inodes
+        self.statuses : dict[str, tuple[int, ...]] = {}
+        self.addFolders(set(index.folders()))
+
+    def folderStatus(self, folder: str) -> tuple[int, ...]:
+        """
+        Return the status of a folder and of its hash files, empty if the folder can't be read
+        """
+        status : list[int] = []
+        try:
+            folderStat : stat_result = stat(self.index.absoluteFolder(folder))
+            status.extend((folderStat.st_mtime_ns, folderStat.st_ino))
+            hashFileName : str
+            for hashFileName in sorted(self.index.hashFiles.get(folder, set())):
+                hashFileStat : stat_result = stat(self.index.absoluteFolder(folder).joinpath(hashFileName))
+                status.extend((hashFileStat.st_mtime_ns, hashFileStat.st_size))
+        except OSError:
+            return ()
+        return tuple(status)
+
+    def addFolders(self, folders: set[str]) -> None:
+        folder : str
+        for folder in folders:
+            self.statuses[folder] = self.folderStatus(folder)
+
+    def removeFolders(self, folders: set[str]) -> None:
+        folder : str
+        for folder in folders:
+            self.statuses.pop(folder, None)
+
+    def waitChanges(self) -> set[str] | None:
+        """
+        Wait the poll interval and return the folders changed since the previous poll
+        """
+        time.sleep(self.interval)
+        changedFolders : set[str] = set()
+        folder : str
+        for folder in list(self.statuses):
+            status : tuple[int, ...] = self.folderStatus(folder)
+            if status != self.statuses[folder]:
+                self.statuses[folder] = status
+                changedFolders.add(folder)
+        return changedFolders
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+    Watcher of the changes of the folders of a tree index, notified by the Linux kernel through inotify(7), called by ctypes
+
+    Each folder has a watch. The notifications of a burst of changes are collected until no notification comes for SETTLE_TIME seconds,
+    so a sync of many files is processed at once. When the kernel drops notifications (its queue overflows) the tree must be scanned again.
+    """
+
+    def __init__(self, index: TreeIndex) -> None:
+        self.libc : ctypes.CDLL = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.libc.inotify_init1.argtypes = [ctypes.c_int]
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd : int = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise oserror()
+
+        self.index : TreeIndex = index
+        # each watch descriptor bound to its folder, and each folder bound to its watch descriptor
+        self.folders : dict[int, str] = {}
+        self.watches : dict[str, int] = {}
+        try:
+            self.addFolders(set(index.folders()))
+        except OSError:
+            self.close()
+            raise
+
+    def addFolders(self, folders: set[str]) -> None:
+        """
+        Add a watch to each folder
+
+        Raises
+        ------
+        OSError
+            if a watch can't be added, i.e. the limit of watches (fs.inotify.max_user_watches) is reached
+        """
+        logger : logging.Logger = logging.getLogger(__name__)
+
+        folder : str
+        for folder in folders:
+            watch : int = self.libc.inotify_add_watch(self.fd, fsencode(self.index.absoluteFolder(folder)), INOTIFY_FOLDER_MASK)
+            if watch < 0:
+                error : OSError = oserror()
+                # the folder can be removed before its watch is added, its parent folder is notified
+                if error.errno in (errno.ENOENT, errno.ENOTDIR):
+                    logger.debug(f"folder {folder} removed before watching it")
+                    continue
+                raise error
+            self.folders[watch] = folder
+            self.watches[folder] = watch
+
+    def removeFolders(self, folders: set[str]) -> None:
+        folder : str
+        for folder in folders:
+            watch : int | None = self.watches.pop(folder, None)
+            if watch is not None:
+                self.folders.pop(watch, None)
+                # the watch of a folder removed is already removed by the kernel
+                self.libc.inotify_rm_watch(self.fd, watch)
+
+    def readEvents(self, changedFolders: set[str]) -> bool:
+        """
+        Read the pending notifications, adding the folders changed to the set
+
+        Returns
+        -------
+        bool
+            False if the kernel dropped notifications, True otherwise
+        """
+        data : bytes
+        try:
+            data = read(self.fd, INOTIFY_BUFFER_SIZE)
+        except BlockingIOError:
+            return True
+
+        offset : int = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            watch : int
+            mask : int
+            cookie : int
+            nameLength : int
+            watch, mask, cookie, nameLength = INOTIFY_EVENT.unpack_from(data, offset)
+            offset = offset + INOTIFY_EVENT.size + nameLength
+
+            if mask & IN_Q_OVERFLOW:
+                return False
+            folder : str | None = self.folders.get(watch)
+            if mask & IN_IGNORED:
+                if folder is not None:
+                    self.folders.pop(watch, None)
+                    if self.watches.get(folder) == watch:
+                        self.watches.pop(folder)
+                continue
+            if folder is not None:
+                changedFolders.add(folder)
+        return True
+
+    def waitChanges(self) -> set[str] | None:
+        """
+        Wait for a burst of changes and return the folders changed, None if the kernel dropped notifications and the tree must be scanned again
+        """
+        changedFolders : set[str] = set()
+        select.select([self.fd], [], [])
+        burstStart : float = time.monotonic()
+        while True:
+            if not self.readEvents(changedFolders):
+                return None
+            if time.monotonic() - burstStart >= MAX_SETTLE_TIME:
+                break
+            readable : list[int]
+            readable, _, _ = select.select([self.fd], [], [], SETTLE_TIME)
+            if len(readable) == 0:
+                break
+        return changedFolders
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            close(self.fd)
+            self.fd = -1
+
+
+def oserror() -> OSError:
+    """
+    Return the error of the last call to the C library
+    """
+    code : int = ctypes.get_errno()
+    return OSError(code, strerror(code))
+
+
+def openWatcher(index: TreeIndex, pollInterval: float = DEFAULT_POLL_INTERVAL, polling: bool = False) -> "InotifyWatcher | PollingWatcher":
+    """
+    Open a watcher of the changes of the folders of a tree index: inotify where available, otherwise polling
+
+    Parameters
+    ----------
+    index : TreeIndex
+        The tree index to watch
+    pollInterval : float
+        The interval, in seconds, between two polls of the folders, when polling
+    polling : bool
+        True to poll the folders even where inotify is available
+
+    Returns
+    -------
+    InotifyWatcher | PollingWatcher
+        The watcher
+    """
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(index)
+        except (OSError, AttributeError) as ex:
+            # AttributeError if the C library doesn't have inotify, OSError if the limit of watches is reached
+            logger.warning(f"Can't watch the folders with inotify, polling them every {pollInterval} seconds: {ex}")
+
+    return PollingWatcher(index, pollInterval)
+
+
+def writeIndexState(filename: Path, index: TreeIndex) -> Exception | None:
+    """
+    Write the state of a tree index as a JSON file: the folders without hash files and the differences of each hash file
+
+    The state is written in a temporary file in the same folder, renamed to the state file only when complete, so a reader never reads a partially written file.
+
+    Returns
+    -------
+    Exception | None :
+        OSError in case of IO error writing the file
+        None in case of success (no error happens)
+    """
+
+    logger : logging.Logger = logging.getLogger(__name__)
+
+    error : Exception | None = None
+    temporaryFile : Path = filename.with_name(f".{filename.name}.tmp")
+
+    state : dict[str, Any] = {
+        "root": str(index.rootFolder),
+        "updated_at": time.time(),
+        "missing_hash_files": [str(folder) for folder in index.missingHashFileFolders()],
+        "differences": {str(hashFile): [{"status": MISSING_IN_DIR if side == ONLY_IN_FIRST else MISSING_IN_HASH_FILE, "path": str(filepath)} for side, filepath in differences] for hashFile, differences in index.hashFileDifferences().items()},
+    }
+
+    try:
+        temporaryFile.write_text(json.dumps(state, indent=2))
+        replace(temporaryFile, filename)
+    except OSError as ex:
+        error = ex
+        logger.exception(f"Error writing the state {filename}: {error}")
+
+    return error